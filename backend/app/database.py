@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, MetaData, Column, String, Text, Integer, Boolean, DateTime, Float, JSON
+from sqlalchemy import create_engine, MetaData, Column, String, Text, Integer, Boolean, DateTime, Float, JSON, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from databases import Database
@@ -81,6 +81,61 @@ class DocumentVersion(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     changes_summary = Column(String, default="")
 
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, nullable=False, index=True)
+    type = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True)
+    payload = Column(Text, nullable=False, default="{}")
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+class PrecomputedResult(Base):
+    __tablename__ = "precomputed_results"
+    
+    document_id = Column(String, primary_key=True)
+    version = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)
+    result = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class CachedAnalytics(Base):
+    __tablename__ = "document_analytics"
+    
+    document_id = Column(String, primary_key=True)
+    version = Column(Integer, primary_key=True)
+    algorithm_version = Column(Integer, nullable=False)
+    result = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class DocumentSignature(Base):
+    __tablename__ = "document_signatures"
+    
+    document_id = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ParagraphEmbedding(Base):
+    __tablename__ = "paragraph_embeddings"
+    
+    row = Column(Integer, primary_key=True, autoincrement=False)
+    document_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    start_offset = Column(Integer, nullable=False)
+    end_offset = Column(Integer, nullable=False)
+    content_hash = Column(String, nullable=False)
+
 async def init_db():
     """Initialize database tables"""
     try:
@@ -6,8 +6,18 @@ import os
 from dotenv import load_dotenv
 
 from app.routers import documents, ai_suggestions, analytics, auth
-from app.database import init_db, close_db
+from app.database import init_db, close_db, database
 from app.services.ollama_service import OllamaService
+from app.services.llm_scheduler import LLMScheduler
+from app.services.request_tracker import LatestRequestTracker
+from app.services.similarity_index import SimilarityIndex
+from app.services.semantic_index import SemanticIndex
+from app.services.job_queue import JobQueue
+from app.services.precompute import PrecomputeStore, DocumentPrecomputer
+from app.services.analytics_cache import AnalyticsCache
+from app.services.analytics_pool import AnalyticsPool
+from app.services.analytics_service import AnalyticsService, ANALYTICS_VERSION
+from app.models.job import AIJobType
 
 load_dotenv()
 
@@ -21,9 +31,89 @@ async def lifespan(app: FastAPI):
     await ollama_service.initialize()
     app.state.ollama_service = ollama_service
     
+    # Admission control and fair queuing in front of the model server
+    app.state.llm_scheduler = LLMScheduler(
+        max_concurrency=int(os.getenv("SCHEDULER_MAX_CONCURRENT_REQUESTS", "8")),
+        max_queue_depth=int(os.getenv("SCHEDULER_MAX_QUEUE_DEPTH", "100")),
+        max_queued_per_user=int(os.getenv("SCHEDULER_MAX_QUEUED_PER_USER", "10"))
+    )
+    
+    # Lets a newer request for the same document cancel the model work of an older one
+    app.state.request_tracker = LatestRequestTracker()
+    
+    # Local near-duplicate index used by the plagiarism check
+    similarity_index = SimilarityIndex(
+        database,
+        num_perm=int(os.getenv("SIMILARITY_NUM_PERM", "64")),
+        bands=int(os.getenv("SIMILARITY_BANDS", "32")),
+        window_shingles=int(os.getenv("SIMILARITY_WINDOW_SHINGLES", "200"))
+    )
+    await similarity_index.load()
+    app.state.similarity_index = similarity_index
+    
+    # Paragraph embeddings behind semantic search, kept up to date in the background
+    semantic_index = SemanticIndex(
+        database,
+        ollama_service.embed,
+        ollama_service.embedding_model,
+        directory=os.getenv("SEMANTIC_INDEX_DIR", "./semantic_index")
+    )
+    await semantic_index.load()
+    semantic_index.start()
+    app.state.semantic_index = semantic_index
+    
+    # Analytics per document version, served until the document is edited
+    analytics_cache = AnalyticsCache(
+        database,
+        ANALYTICS_VERSION,
+        gc_interval=float(os.getenv("ANALYTICS_CACHE_GC_SECONDS", "3600"))
+    )
+    analytics_cache.start()
+    app.state.analytics_cache = analytics_cache
+    
+    # Worker processes for NLTK/textstat work, so large documents do not stall the event loop;
+    # only paragraphs edited since the last analysis are sent to them
+    analytics_pool = AnalyticsPool(
+        AnalyticsService(paragraph_cache_size=int(os.getenv("ANALYTICS_PARAGRAPH_CACHE_SIZE", "20000"))),
+        workers=int(os.getenv("ANALYTICS_WORKERS", str(min(4, os.cpu_count() or 1)))),
+        task_timeout=float(os.getenv("ANALYTICS_TIMEOUT_SECONDS", "30")),
+        max_chars=int(os.getenv("ANALYTICS_MAX_CHARS", "2000000"))
+    )
+    analytics_pool.start()
+    app.state.analytics_pool = analytics_pool
+    
+    # Durable queue for AI work that runs outside the request
+    job_queue = JobQueue(
+        database,
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        max_pending=int(os.getenv("JOB_MAX_PENDING", "1000")),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        backoff_seconds=float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2")),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        retention_seconds=float(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600
+    )
+    ai_suggestions.register_job_handlers(job_queue)
+    await job_queue.start()
+    app.state.job_queue = job_queue
+    
+    # Opt-in: compute suggestions and analytics once an edited document settles
+    app.state.precompute_store = PrecomputeStore(database)
+    app.state.document_precomputer = DocumentPrecomputer(
+        job_queue,
+        AIJobType.PRECOMPUTE.value,
+        enabled=os.getenv("PRECOMPUTE_ON_SAVE", "false").lower() in ("1", "true", "yes"),
+        debounce_seconds=float(os.getenv("PRECOMPUTE_DEBOUNCE_SECONDS", "5"))
+    )
+    
     yield
     
     # Shutdown
+    await app.state.document_precomputer.stop()
+    await job_queue.stop()
+    await semantic_index.stop()
+    await analytics_cache.stop()
+    await analytics_pool.stop()
+    await ollama_service.close()
     await close_db()
 
 app = FastAPI(
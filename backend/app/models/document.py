@@ -56,6 +56,18 @@ class DocumentAnalytics(BaseModel):
     tone_analysis: Dict[str, float]
     writing_stats: Dict[str, Any]
     
+class BulkAnalyticsRequest(BaseModel):
+    # All of the user's documents when not given
+    document_ids: Optional[List[str]] = Field(None, max_length=10000)
+    batch_size: int = Field(200, ge=1, le=1000)
+
+class SemanticSearchResult(BaseModel):
+    document_id: str
+    title: str
+    score: float
+    position: Dict[str, int]
+    snippet: str
+
 class DocumentVersion(BaseModel):
     id: str
     document_id: str
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+from datetime import datetime
+from enum import Enum
+
+class AIJobType(str, Enum):
+    SUGGESTIONS = "suggestions"
+    TONE_ANALYSIS = "tone_analysis"
+    VOCABULARY_ENHANCEMENT = "vocabulary_enhancement"
+    PRECOMPUTE = "precompute"
+
+class AIJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class AIJobCreate(BaseModel):
+    type: AIJobType
+    payload: Dict[str, Any] = {}
+    max_attempts: Optional[int] = Field(None, ge=1, le=10)
+
+class AIJob(BaseModel):
+    id: str
+    user_id: str
+    type: AIJobType
+    status: AIJobStatus
+    payload: Dict[str, Any] = {}
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int
+    run_after: datetime
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
\ No newline at end of file
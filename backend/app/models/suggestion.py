@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
@@ -21,6 +21,41 @@ class TextPosition(BaseModel):
     start: int
     end: int
 
+class LLMSuggestion(BaseModel):
+    """Schema the model's structured (JSON) output must satisfy"""
+    type: SuggestionType
+    text: str = Field(..., min_length=1)
+    suggestion: str = Field(..., min_length=1)
+    explanation: str = Field(..., min_length=1)
+    severity: SeverityLevel = SeverityLevel.INFO
+    confidence: float = 80.0
+
+    @field_validator("type", mode="before")
+    @classmethod
+    def normalize_type(cls, value: Any) -> Any:
+        return value.strip().lower() if isinstance(value, str) else value
+
+    @field_validator("severity", mode="before")
+    @classmethod
+    def normalize_severity(cls, value: Any) -> Any:
+        # Unknown severities are not worth discarding a suggestion over
+        value = value.strip().lower() if isinstance(value, str) else value
+        return value if value in SeverityLevel._value2member_map_ else SeverityLevel.INFO
+
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def normalize_confidence(cls, value: Any) -> float:
+        if isinstance(value, str):
+            value = value.strip().rstrip('%')
+        try:
+            confidence = float(value)
+        except (TypeError, ValueError):
+            return 80.0
+        # Some models answer on a 0-1 scale
+        if 0 < confidence <= 1:
+            confidence *= 100
+        return max(0.0, min(100.0, confidence))
+
 class SuggestionCreate(BaseModel):
     document_id: str
     type: SuggestionType
@@ -52,6 +87,7 @@ class SuggestionResponse(BaseModel):
     suggestions: List[Suggestion]
     total_count: int
     processing_time: float
+    degraded: bool = False
 
 class BulkSuggestionRequest(BaseModel):
     document_id: str
@@ -63,4 +99,9 @@ class BulkSuggestionRequest(BaseModel):
         SuggestionType.STYLE,
         SuggestionType.CLARITY,
         SuggestionType.TONE
-    ]
\ No newline at end of file
+    ]
+
+class PlagiarismCheckRequest(BaseModel):
+    content: str = ""
+    document_id: Optional[str] = None
+    limit: int = Field(10, ge=1, le=100)
@@ -1,40 +1,89 @@
-from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, AsyncIterator, Dict, List, Tuple, Union
 import time
 import asyncio
 import json
 
 from app.models.suggestion import (
     Suggestion, SuggestionCreate, SuggestionResponse, 
-    BulkSuggestionRequest, SuggestionType
+    BulkSuggestionRequest, SuggestionType, PlagiarismCheckRequest
 )
+from app.models.job import AIJob, AIJobCreate, AIJobType
 from app.models.user import User
 from app.database import get_database
-from app.routers.auth import get_current_user
-from app.services.ollama_service import OllamaService
+from app.routers.auth import get_admin_user, get_current_user
+from app.services.ollama_service import OllamaService, LLMUnavailable
+from app.services.llm_scheduler import LLMScheduler, Priority, SchedulerOverloaded
+from app.services.analytics_service import AnalyticsService
+from app.services.rule_checker import RuleChecker, merge_suggestions
+from app.services.similarity_index import SimilarityIndex, shingle, overlapping_spans
+from app.services.semantic_index import SemanticIndex
+from app.routers.documents import get_similarity_index, get_precompute_store, get_document_precomputer, get_semantic_index, get_analytics_cache, get_analytics_pool
+from app.services.precompute import PrecomputeStore, DocumentPrecomputer, content_hash
+from app.services.analytics_cache import AnalyticsCache
+from app.services.analytics_pool import AnalyticsPool
+from app.services.job_queue import JobQueue, JobQueueFull
+from app.services.request_tracker import LatestRequestTracker, RequestCancelled, RequestSuperseded
 from databases import Database
 
 router = APIRouter()
+analytics_service = AnalyticsService()
+rule_checker = RuleChecker(analytics_service)
 
 async def get_ollama_service() -> OllamaService:
     """Get Ollama service from app state"""
     from app.main import app
     return app.state.ollama_service
 
+async def get_llm_scheduler() -> LLMScheduler:
+    """Get LLM scheduler from app state"""
+    from app.main import app
+    return app.state.llm_scheduler
+
+async def get_job_queue() -> JobQueue:
+    """Get AI job queue from app state"""
+    from app.main import app
+    return app.state.job_queue
+
+async def get_request_tracker() -> LatestRequestTracker:
+    """Get latest-request tracker from app state"""
+    from app.main import app
+    return app.state.request_tracker
+
+def cancelled_exception(error: RequestCancelled) -> HTTPException:
+    """Answer a request whose work was cancelled; nobody is waiting for the body"""
+    if isinstance(error, RequestSuperseded):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+    # 499 Client Closed Request, as logged by nginx
+    return HTTPException(status_code=499, detail=str(error))
+
+def queue_full_exception(error: Union[SchedulerOverloaded, JobQueueFull]) -> HTTPException:
+    """Translate scheduler or job queue admission rejection into a 429 response"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="AI service is busy, please retry later",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @router.post("/suggestions", response_model=SuggestionResponse)
 async def generate_suggestions(
     request: BulkSuggestionRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
     database: Database = Depends(get_database),
-    ollama_service: OllamaService = Depends(get_ollama_service)
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    llm_scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    precompute_store: PrecomputeStore = Depends(get_precompute_store),
+    request_tracker: LatestRequestTracker = Depends(get_request_tracker)
 ):
     """Generate AI-powered writing suggestions for a document"""
     start_time = time.time()
     
     try:
         # Verify document access
-        query = "SELECT user_id, writing_goal, language FROM documents WHERE id = :id"
+        query = "SELECT user_id, writing_goal, language, version FROM documents WHERE id = :id"
         doc_result = await database.fetch_one(query, {"id": request.document_id})
         
         if not doc_result:
@@ -54,50 +103,118 @@ async def generate_suggestions(
         writing_goal = request.writing_goal or document.get("writing_goal", "professional")
         language = request.language or document.get("language", "en-US")
         
-        # Generate suggestions using Ollama
-        suggestions_data = await ollama_service.generate_suggestions(
-            content=request.content,
-            writing_goal=writing_goal,
-            language=language
-        )
+        # Suggestions precomputed for the saved version are reused if the text still matches
+        precomputed = await precompute_store.get(request.document_id, document["version"], "suggestions")
+        if (
+            precomputed is not None
+            and precomputed["content_hash"] == content_hash(request.content)
+            and precomputed["writing_goal"] == writing_goal
+            and precomputed["language"] == language
+        ):
+            suggestions = [Suggestion(**suggestion_data) for suggestion_data in precomputed["suggestions"]]
+            return SuggestionResponse(
+                suggestions=suggestions,
+                total_count=len(suggestions),
+                processing_time=time.time() - start_time
+            )
+        
+        # Mechanical issues come from the local rules, deeper ones from Ollama
+        rule_suggestions = await check_rules(request.content)
+        degraded = False
+        # Queueing for a slot and every model call share one deadline
+        deadline = ollama_service.deadline()
+        
+        async def generate_llm_suggestions():
+            async with llm_scheduler.slot(current_user.id, Priority.INTERACTIVE, deadline=deadline):
+                return await ollama_service.generate_suggestions(
+                    content=request.content,
+                    writing_goal=writing_goal,
+                    language=language,
+                    document_id=request.document_id,
+                    shared_cache=shares_sentence_cache(current_user.preferences),
+                    deadline=deadline
+                )
+        
+        try:
+            # A newer request for this document, or the client leaving, cancels the generation
+            llm_suggestions = await request_tracker.run(
+                generate_llm_suggestions(),
+                http_request,
+                key=f"suggestions:{current_user.id}:{request.document_id}"
+            )
+        except (LLMUnavailable, asyncio.TimeoutError):
+            # Answer with what is known without the model instead of waiting on it
+            llm_suggestions = ollama_service.degraded_suggestions(request.content, writing_goal, language, request.document_id)
+            degraded = True
+        suggestions_data = merge_suggestions(rule_suggestions, llm_suggestions)
         
         # Convert to Suggestion objects and save to database
         suggestions = []
         for suggestion_data in suggestions_data:
-            suggestion_id = f"suggestion_{int(time.time() * 1000)}_{len(suggestions)}"
-            
-            suggestion = Suggestion(
-                id=suggestion_id,
-                document_id=request.document_id,
-                type=suggestion_data["type"],
-                text=suggestion_data["text"],
-                suggestion=suggestion_data["suggestion"],
-                explanation=suggestion_data["explanation"],
-                position=suggestion_data["position"],
-                severity=suggestion_data["severity"],
-                confidence=suggestion_data["confidence"],
-                created_at=time.time(),
-                is_applied=False,
-                is_dismissed=False
-            )
-            
+            suggestion = build_suggestion(request.document_id, suggestion_data, len(suggestions))
             suggestions.append(suggestion)
-            
-            # Save to database in background
-            background_tasks.add_task(
-                save_suggestion_to_db,
-                suggestion,
-                database
-            )
+        
+        await save_suggestions(suggestions, database)
         
         processing_time = time.time() - start_time
         
         return SuggestionResponse(
             suggestions=suggestions,
             total_count=len(suggestions),
-            processing_time=processing_time
+            processing_time=processing_time,
+            degraded=degraded
         )
         
+    except HTTPException:
+        raise
+    except SchedulerOverloaded as e:
+        raise queue_full_exception(e)
+    except RequestCancelled as e:
+        raise cancelled_exception(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate suggestions: {str(e)}"
+        )
+
+@router.post("/suggestions/quick", response_model=SuggestionResponse)
+async def quick_suggestions(
+    request: BulkSuggestionRequest,
+    current_user: User = Depends(get_current_user),
+    database: Database = Depends(get_database)
+):
+    """Return only the local rule-based suggestions, without waiting for the model"""
+    start_time = time.time()
+    
+    try:
+        # Verify document access
+        query = "SELECT user_id FROM documents WHERE id = :id"
+        doc_result = await database.fetch_one(query, {"id": request.document_id})
+        
+        if not doc_result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found"
+            )
+        
+        if doc_result["user_id"] != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        
+        suggestions = []
+        for suggestion_data in await check_rules(request.content):
+            suggestions.append(build_suggestion(request.document_id, suggestion_data, len(suggestions)))
+        
+        await save_suggestions(suggestions, database)
+        
+        return SuggestionResponse(
+            suggestions=suggestions,
+            total_count=len(suggestions),
+            processing_time=time.time() - start_time
+        )
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -106,30 +223,192 @@ async def generate_suggestions(
             detail=f"Failed to generate suggestions: {str(e)}"
         )
 
+@router.post("/suggestions/stream")
+async def stream_suggestions(
+    request: BulkSuggestionRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_user),
+    database: Database = Depends(get_database),
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    llm_scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    request_tracker: LatestRequestTracker = Depends(get_request_tracker)
+):
+    """Stream AI-powered writing suggestions as NDJSON (or SSE) while the model generates them"""
+    start_time = time.time()
+    
+    # Verify document access before the stream starts so errors keep their status code
+    query = "SELECT user_id, writing_goal, language FROM documents WHERE id = :id"
+    doc_result = await database.fetch_one(query, {"id": request.document_id})
+    
+    if not doc_result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    document = dict(doc_result)
+    if document["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    writing_goal = request.writing_goal or document.get("writing_goal", "professional")
+    language = request.language or document.get("language", "en-US")
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    # Admission happens before the response starts so a full queue is still a 429.
+    # Queueing for the slot and every model call share one deadline; a request
+    # that cannot get a slot in time streams only what is known without the model.
+    deadline = ollama_service.deadline()
+    try:
+        slot = await llm_scheduler.acquire(current_user.id, Priority.INTERACTIVE, deadline=deadline)
+    except SchedulerOverloaded as e:
+        raise queue_full_exception(e)
+    except asyncio.TimeoutError:
+        slot = None
+
+    def encode_event(event: dict) -> str:
+        payload = json.dumps(event, default=str)
+        return f"data: {payload}\n\n" if use_sse else f"{payload}\n"
+
+    async def event_stream():
+        count = 0
+        degraded = False
+        try:
+            # Rule-based suggestions go out first; the model's follow as it generates them
+            rule_suggestions = await check_rules(request.content)
+            covered = {(s["position"]["start"], s["position"]["end"]) for s in rule_suggestions}
+            for suggestion_data in rule_suggestions:
+                suggestion = build_suggestion(request.document_id, suggestion_data, count)
+                count += 1
+                yield encode_event({"event": "suggestion", "tier": "rules", "suggestion": json.loads(suggestion.json())})
+                await save_suggestion_to_db(suggestion, database)
+            
+            if slot is None:
+                llm_stream = iterate_list(ollama_service.degraded_suggestions(request.content, writing_goal, language, request.document_id))
+                degraded = True
+            else:
+                llm_stream = request_tracker.iterate(ollama_service.stream_suggestions(
+                    content=request.content,
+                    writing_goal=writing_goal,
+                    language=language,
+                    document_id=request.document_id,
+                    shared_cache=shares_sentence_cache(current_user.preferences),
+                    deadline=deadline
+                ), f"suggestions:{current_user.id}:{request.document_id}")
+            try:
+                async for suggestion_data in llm_stream:
+                    if (suggestion_data["position"]["start"], suggestion_data["position"]["end"]) in covered:
+                        continue
+                    suggestion = build_suggestion(request.document_id, suggestion_data, count)
+                    count += 1
+                    yield encode_event({"event": "suggestion", "tier": "llm", "suggestion": json.loads(suggestion.json())})
+                    await save_suggestion_to_db(suggestion, database)
+            except LLMUnavailable:
+                # Suggestions kept for unchanged paragraphs have already been sent
+                degraded = True
+            except RequestSuperseded as e:
+                yield encode_event({"event": "superseded", "total_count": count, "detail": str(e)})
+                return
+            
+            yield encode_event({
+                "event": "done",
+                "total_count": count,
+                "processing_time": time.time() - start_time,
+                "degraded": degraded
+            })
+        except Exception as e:
+            yield encode_event({"event": "error", "detail": f"Failed to generate suggestions: {str(e)}"})
+        finally:
+            if slot is not None:
+                slot.release()
+    
+    # The background task also releases the slot if the stream never starts
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        background=BackgroundTask(slot.release) if slot is not None else None
+    )
+
+async def iterate_list(items: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for item in items:
+        yield item
+
+async def check_rules(content: str) -> List[Dict[str, Any]]:
+    """Run the local rules in a thread; tokenizing a large document would otherwise stall the event loop"""
+    return await asyncio.to_thread(rule_checker.check, content)
+
+def shares_sentence_cache(preferences: Any) -> bool:
+    """Whether a user has opted in to the sentence cache shared across documents and users"""
+    if isinstance(preferences, str):
+        preferences = json.loads(preferences or "{}")
+    return bool((preferences or {}).get("shared_sentence_cache"))
+
+async def user_shares_sentence_cache(user_id: str, database: Database) -> bool:
+    row = await database.fetch_one("SELECT preferences FROM users WHERE id = :id", {"id": user_id})
+    return row is not None and shares_sentence_cache(row["preferences"])
+
+def build_suggestion(document_id: str, suggestion_data: dict, index: int) -> Suggestion:
+    """Create a Suggestion from service output"""
+    return Suggestion(
+        id=f"suggestion_{int(time.time() * 1000)}_{index}",
+        document_id=document_id,
+        type=suggestion_data["type"],
+        text=suggestion_data["text"],
+        suggestion=suggestion_data["suggestion"],
+        explanation=suggestion_data["explanation"],
+        position=suggestion_data["position"],
+        severity=suggestion_data["severity"],
+        confidence=suggestion_data["confidence"],
+        created_at=time.time(),
+        is_applied=False,
+        is_dismissed=False
+    )
+
+INSERT_SUGGESTION = """
+INSERT OR IGNORE INTO suggestions (id, document_id, type, text, suggestion, explanation, position, severity, confidence, created_at, is_applied, is_dismissed)
+VALUES (:id, :document_id, :type, :text, :suggestion, :explanation, :position, :severity, :confidence, :created_at, :is_applied, :is_dismissed)
+"""
+
+async def insert_suggestion(suggestion: Suggestion, database: Database):
+    """Insert a suggestion; a suggestion that is already stored is left as is"""
+    await database.execute(INSERT_SUGGESTION, suggestion_values(suggestion))
+
+def suggestion_values(suggestion: Suggestion) -> Dict[str, Any]:
+    return {
+        "id": suggestion.id,
+        "document_id": suggestion.document_id,
+        "type": suggestion.type,
+        "text": suggestion.text,
+        "suggestion": suggestion.suggestion,
+        "explanation": suggestion.explanation,
+        "position": json.dumps(suggestion.position.dict()),
+        "severity": suggestion.severity,
+        "confidence": suggestion.confidence,
+        "created_at": suggestion.created_at,
+        "is_applied": suggestion.is_applied,
+        "is_dismissed": suggestion.is_dismissed
+    }
+
 async def save_suggestion_to_db(suggestion: Suggestion, database: Database):
     """Save suggestion to database"""
     try:
-        query = """
-        INSERT INTO suggestions (id, document_id, type, text, suggestion, explanation, position, severity, confidence, created_at, is_applied, is_dismissed)
-        VALUES (:id, :document_id, :type, :text, :suggestion, :explanation, :position, :severity, :confidence, :created_at, :is_applied, :is_dismissed)
-        """
-        await database.execute(query, {
-            "id": suggestion.id,
-            "document_id": suggestion.document_id,
-            "type": suggestion.type,
-            "text": suggestion.text,
-            "suggestion": suggestion.suggestion,
-            "explanation": suggestion.explanation,
-            "position": json.dumps(suggestion.position.dict()),
-            "severity": suggestion.severity,
-            "confidence": suggestion.confidence,
-            "created_at": suggestion.created_at,
-            "is_applied": suggestion.is_applied,
-            "is_dismissed": suggestion.is_dismissed
-        })
+        await insert_suggestion(suggestion, database)
     except Exception as e:
         print(f"Failed to save suggestion to database: {e}")
 
+async def save_suggestions(suggestions: List[Suggestion], database: Database):
+    """Save a response's suggestions in one batch; the response is still sent if saving fails"""
+    if not suggestions:
+        return
+    
+    try:
+        async with database.transaction():
+            await database.execute_many(INSERT_SUGGESTION, [suggestion_values(suggestion) for suggestion in suggestions])
+    except Exception as e:
+        print(f"Failed to save suggestions to database: {e}")
+
 @router.get("/suggestions/{document_id}", response_model=List[Suggestion])
 async def get_document_suggestions(
     document_id: str,
@@ -290,8 +569,11 @@ async def dismiss_suggestion(
 @router.post("/tone-analysis")
 async def analyze_tone(
     request: dict,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
-    ollama_service: OllamaService = Depends(get_ollama_service)
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    llm_scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    request_tracker: LatestRequestTracker = Depends(get_request_tracker)
 ):
     """Analyze the tone of text content"""
     try:
@@ -302,16 +584,39 @@ async def analyze_tone(
                 detail="Content is required"
             )
         
-        tone_analysis = await ollama_service.analyze_tone(content)
+        degraded = False
+        
+        # Queueing for a slot and the model calls share one deadline
+        deadline = ollama_service.deadline()
+        
+        async def analyze():
+            async with llm_scheduler.slot(current_user.id, Priority.INTERACTIVE, deadline=deadline):
+                return await ollama_service.analyze_tone(content, deadline)
+        
+        document_id = request.get("document_id")
+        try:
+            tone_analysis = await request_tracker.run(
+                analyze(),
+                http_request,
+                key=f"tone:{current_user.id}:{document_id}" if document_id else None
+            )
+        except (LLMUnavailable, asyncio.TimeoutError):
+            tone_analysis = ollama_service.degraded_tone(content)
+            degraded = True
         
         return {
             "tone_analysis": tone_analysis,
             "content_length": len(content),
-            "analysis_timestamp": time.time()
+            "analysis_timestamp": time.time(),
+            "degraded": degraded
         }
         
     except HTTPException:
         raise
+    except SchedulerOverloaded as e:
+        raise queue_full_exception(e)
+    except RequestCancelled as e:
+        raise cancelled_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -320,24 +625,55 @@ async def analyze_tone(
 
 @router.post("/plagiarism-check")
 async def check_plagiarism(
-    request: dict,
+    request: PlagiarismCheckRequest,
     current_user: User = Depends(get_current_user),
-    ollama_service: OllamaService = Depends(get_ollama_service)
+    database: Database = Depends(get_database),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index)
 ):
-    """Check content for potential plagiarism"""
+    """Check content for overlap with stored documents"""
     try:
-        content = request.get("content", "")
+        content = request.content
         if not content:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Content is required"
             )
         
-        plagiarism_score = await ollama_service.check_plagiarism(content)
+        # The document being checked is in the index too, so leave it out
+        candidates = await similarity_index.find_similar(content, exclude=request.document_id, limit=request.limit)
+        
+        documents = {}
+        if candidates:
+            params = {f"id_{i}": document_id for i, (document_id, _) in enumerate(candidates)}
+            placeholders = ", ".join(f":{name}" for name in params)
+            query = f"SELECT id, title, content, user_id, is_public, collaborators FROM documents WHERE id IN ({placeholders})"
+            documents = {row["id"]: dict(row) for row in await database.fetch_all(query, params)}
+        
+        overlaps, plagiarism_score = await asyncio.to_thread(
+            find_overlaps, content, candidates, documents, similarity_index.shingle_size
+        )
+        
+        matches = []
+        for document_id, similarity, spans in overlaps:
+            document = documents[document_id]
+            
+            # Only reveal which document matched if the user could open it
+            accessible = (
+                document["user_id"] == current_user.id
+                or document["is_public"]
+                or current_user.email in json.loads(document["collaborators"] or "[]")
+            )
+            matches.append({
+                "document_id": document_id if accessible else None,
+                "title": document["title"] if accessible else None,
+                "similarity": round(similarity * 100, 1),
+                "spans": spans if accessible else [{"query": span["query"]} for span in spans]
+            })
         
         return {
             "plagiarism_score": plagiarism_score,
             "status": "original" if plagiarism_score < 5 else "similarities_found",
+            "matches": matches,
             "content_length": len(content),
             "check_timestamp": time.time()
         }
@@ -350,11 +686,40 @@ async def check_plagiarism(
             detail=f"Failed to check plagiarism: {str(e)}"
         )
 
+def find_overlaps(
+    content: str,
+    candidates: List[Tuple[str, float]],
+    documents: Dict[str, Dict[str, Any]],
+    shingle_size: int
+) -> Tuple[List[Tuple[str, float, List[Dict[str, Any]]]], float]:
+    """Overlapping spans with each candidate document, and the percentage of content they cover"""
+    query_shingles = shingle(content, shingle_size)
+    matched_shingles = set()
+    overlaps = []
+    for document_id, similarity in candidates:
+        document = documents.get(document_id)
+        if not document:
+            continue
+        
+        document_shingles = shingle(document["content"] or "", shingle_size)
+        spans = overlapping_spans(query_shingles, document_shingles)
+        if not spans:
+            continue
+        document_hashes = {item.hash for item in document_shingles}
+        matched_shingles.update(i for i, item in enumerate(query_shingles) if item.hash in document_hashes)
+        overlaps.append((document_id, similarity, spans))
+    
+    plagiarism_score = round(len(matched_shingles) / len(query_shingles) * 100, 1) if query_shingles else 0.0
+    return overlaps, plagiarism_score
+
 @router.post("/vocabulary-enhancement")
 async def enhance_vocabulary(
     request: dict,
+    http_request: Request,
     current_user: User = Depends(get_current_user),
-    ollama_service: OllamaService = Depends(get_ollama_service)
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    llm_scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    request_tracker: LatestRequestTracker = Depends(get_request_tracker)
 ):
     """Enhance vocabulary in text"""
     try:
@@ -367,19 +732,257 @@ async def enhance_vocabulary(
                 detail="Text is required"
             )
         
-        enhanced_text = await ollama_service.improve_vocabulary(text, target_level)
+        degraded = False
+        
+        deadline = ollama_service.deadline()
+        
+        async def enhance():
+            async with llm_scheduler.slot(current_user.id, Priority.INTERACTIVE, deadline=deadline):
+                return await ollama_service.improve_vocabulary(text, target_level, deadline)
+        
+        try:
+            enhanced_text = await request_tracker.run(enhance(), http_request)
+        except (LLMUnavailable, asyncio.TimeoutError):
+            enhanced_text = text
+            degraded = True
         
         return {
             "original_text": text,
             "enhanced_text": enhanced_text,
             "target_level": target_level,
-            "enhancement_timestamp": time.time()
+            "enhancement_timestamp": time.time(),
+            "degraded": degraded
         }
         
     except HTTPException:
         raise
+    except SchedulerOverloaded as e:
+        raise queue_full_exception(e)
+    except RequestCancelled as e:
+        raise cancelled_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to enhance vocabulary: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post("/jobs", response_model=AIJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    job_request: AIJobCreate,
+    current_user: User = Depends(get_current_user),
+    database: Database = Depends(get_database),
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """Queue an AI job to run outside the request; poll GET /jobs/{id} for the result"""
+    try:
+        payload = job_request.payload
+        
+        if job_request.type == AIJobType.SUGGESTIONS:
+            if not payload.get("document_id") or not payload.get("content"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="document_id and content are required"
+                )
+            
+            query = "SELECT user_id FROM documents WHERE id = :id"
+            doc_result = await database.fetch_one(query, {"id": payload["document_id"]})
+            
+            if not doc_result:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Document not found"
+                )
+            
+            if doc_result["user_id"] != current_user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Access denied"
+                )
+        elif job_request.type == AIJobType.TONE_ANALYSIS:
+            if not payload.get("content"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Content is required"
+                )
+        elif job_request.type == AIJobType.VOCABULARY_ENHANCEMENT:
+            if not payload.get("text"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Text is required"
+                )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Job type {job_request.type.value} cannot be queued directly"
+            )
+        
+        job_id = await job_queue.enqueue(job_request.type.value, current_user.id, payload, job_request.max_attempts)
+        return AIJob(**await job_queue.get(job_id))
+    
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        raise queue_full_exception(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to queue job: {str(e)}"
+        )
+
+@router.get("/jobs/{job_id}", response_model=AIJob)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """Get the status and, once finished, the result of an AI job"""
+    job = await job_queue.get(job_id)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if job["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    return AIJob(**job)
+
+async def run_suggestions_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    payload = job["payload"]
+    ollama_service = await get_ollama_service()
+    llm_scheduler = await get_llm_scheduler()
+    database = get_database()
+    
+    query = "SELECT writing_goal, language FROM documents WHERE id = :id"
+    doc_result = await database.fetch_one(query, {"id": payload["document_id"]})
+    if not doc_result:
+        raise ValueError("Document not found")
+    
+    document = dict(doc_result)
+    writing_goal = payload.get("writing_goal") or document.get("writing_goal", "professional")
+    language = payload.get("language") or document.get("language", "en-US")
+    
+    rule_suggestions = await check_rules(payload["content"])
+    async with llm_scheduler.slot(job["user_id"], Priority.BACKGROUND):
+        llm_suggestions = await ollama_service.generate_suggestions(
+            content=payload["content"],
+            writing_goal=writing_goal,
+            language=language,
+            document_id=payload["document_id"],
+            shared_cache=await user_shares_sentence_cache(job["user_id"], database)
+        )
+    
+    suggestions = []
+    for suggestion_data in merge_suggestions(rule_suggestions, llm_suggestions):
+        suggestion = build_suggestion(payload["document_id"], suggestion_data, len(suggestions))
+        await insert_suggestion(suggestion, database)
+        suggestions.append(json.loads(suggestion.json()))
+    
+    return {"suggestions": suggestions, "total_count": len(suggestions)}
+
+async def run_tone_analysis_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    ollama_service = await get_ollama_service()
+    llm_scheduler = await get_llm_scheduler()
+    
+    async with llm_scheduler.slot(job["user_id"], Priority.BACKGROUND):
+        tone_analysis = await ollama_service.analyze_tone(job["payload"]["content"])
+    
+    return {"tone_analysis": tone_analysis, "content_length": len(job["payload"]["content"])}
+
+async def run_vocabulary_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    ollama_service = await get_ollama_service()
+    llm_scheduler = await get_llm_scheduler()
+    text = job["payload"]["text"]
+    target_level = job["payload"].get("target_level", "advanced")
+    
+    async with llm_scheduler.slot(job["user_id"], Priority.BACKGROUND):
+        enhanced_text = await ollama_service.improve_vocabulary(text, target_level)
+    
+    return {"original_text": text, "enhanced_text": enhanced_text, "target_level": target_level}
+
+async def run_precompute_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute suggestions and analytics for a saved document version ahead of the panels opening"""
+    payload = job["payload"]
+    ollama_service = await get_ollama_service()
+    llm_scheduler = await get_llm_scheduler()
+    precompute_store = await get_precompute_store()
+    analytics_cache = await get_analytics_cache()
+    analytics_pool = await get_analytics_pool()
+    database = get_database()
+    
+    query = "SELECT content, writing_goal, language, version FROM documents WHERE id = :id"
+    doc_result = await database.fetch_one(query, {"id": payload["document_id"]})
+    if not doc_result or doc_result["version"] != payload["version"]:
+        # Deleted or edited again since the job was queued; the newer save has its own job
+        return {"skipped": True}
+    
+    document = dict(doc_result)
+    content = document["content"] or ""
+    writing_goal = document.get("writing_goal") or "professional"
+    language = document.get("language") or "en-US"
+    
+    analytics = await analytics_pool.analyze_document(content, payload["document_id"])
+    await analytics_cache.set(payload["document_id"], document["version"], json.loads(analytics.json()))
+    
+    rule_suggestions = await check_rules(content)
+    async with llm_scheduler.slot(job["user_id"], Priority.BACKGROUND):
+        llm_suggestions = await ollama_service.generate_suggestions(
+            content=content,
+            writing_goal=writing_goal,
+            language=language,
+            document_id=payload["document_id"],
+            shared_cache=await user_shares_sentence_cache(job["user_id"], database)
+        )
+    
+    suggestions = []
+    for suggestion_data in merge_suggestions(rule_suggestions, llm_suggestions):
+        suggestion = build_suggestion(payload["document_id"], suggestion_data, len(suggestions))
+        await insert_suggestion(suggestion, database)
+        suggestions.append(json.loads(suggestion.json()))
+    
+    await precompute_store.set(payload["document_id"], document["version"], "suggestions", {
+        "content_hash": content_hash(content),
+        "writing_goal": writing_goal,
+        "language": language,
+        "suggestions": suggestions
+    })
+    
+    return {"version": document["version"], "total_count": len(suggestions)}
+
+def register_job_handlers(job_queue: JobQueue):
+    job_queue.register(AIJobType.SUGGESTIONS.value, run_suggestions_job)
+    job_queue.register(AIJobType.TONE_ANALYSIS.value, run_tone_analysis_job)
+    job_queue.register(AIJobType.VOCABULARY_ENHANCEMENT.value, run_vocabulary_job)
+    job_queue.register(AIJobType.PRECOMPUTE.value, run_precompute_job)
+
+@router.get("/stats")
+async def get_ai_stats(
+    admin_user: User = Depends(get_admin_user),
+    ollama_service: OllamaService = Depends(get_ollama_service),
+    llm_scheduler: LLMScheduler = Depends(get_llm_scheduler),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index),
+    job_queue: JobQueue = Depends(get_job_queue),
+    precompute_store: PrecomputeStore = Depends(get_precompute_store),
+    document_precomputer: DocumentPrecomputer = Depends(get_document_precomputer),
+    semantic_index: SemanticIndex = Depends(get_semantic_index),
+    request_tracker: LatestRequestTracker = Depends(get_request_tracker),
+    analytics_cache: AnalyticsCache = Depends(get_analytics_cache),
+    analytics_pool: AnalyticsPool = Depends(get_analytics_pool)
+):
+    """Get AI service runtime statistics, across all users; admins only"""
+    return {
+        **ollama_service.get_stats(),
+        "scheduler": llm_scheduler.stats(),
+        "cancellation": request_tracker.stats(),
+        "similarity_index": similarity_index.stats(),
+        "semantic_index": semantic_index.stats(),
+        "jobs": await job_queue.stats(),
+        "precompute": {**document_precomputer.stats(), **precompute_store.stats()},
+        "analytics_cache": analytics_cache.stats(),
+        "analytics_pool": analytics_pool.stats()
+    }
\ No newline at end of file
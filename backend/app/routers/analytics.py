@@ -1,36 +1,47 @@
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any
+import asyncio
 import json
+import time
 
-from app.models.document import DocumentAnalytics
+from app.models.document import DocumentAnalytics, BulkAnalyticsRequest
 from app.models.user import User
 from app.database import get_database
 from app.routers.auth import get_current_user
 from app.services.analytics_service import AnalyticsService
+from app.services.analytics_cache import AnalyticsCache
+from app.services.analytics_pool import AnalyticsPool, AnalyticsTooLarge, AnalyticsTimeout
+from app.routers.documents import get_analytics_cache, get_analytics_pool
 from databases import Database
 
 router = APIRouter()
 analytics_service = AnalyticsService()
 
+def analytics_exception(error: Exception) -> HTTPException:
+    """Answer a request whose text the analytics pool would not or could not finish"""
+    if isinstance(error, AnalyticsTooLarge):
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(error))
+    return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(error))
+
 @router.get("/document/{document_id}", response_model=DocumentAnalytics)
 async def get_document_analytics(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    analytics_cache: AnalyticsCache = Depends(get_analytics_cache),
+    analytics_pool: AnalyticsPool = Depends(get_analytics_pool)
 ):
     """Get comprehensive analytics for a document"""
     try:
-        # Verify document access
-        query = "SELECT * FROM documents WHERE id = :id"
-        doc_result = await database.fetch_one(query, {"id": document_id})
+        # Verify document access; analytics stored for this version come with it
+        document = await analytics_cache.lookup(document_id)
         
-        if not doc_result:
+        if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Document not found"
             )
         
-        document = dict(doc_result)
         if document["user_id"] != current_user.id:
             # Check if user is a collaborator
             collaborators = json.loads(document.get("collaborators", "[]"))
@@ -40,13 +51,19 @@ async def get_document_analytics(
                     detail="Access denied"
                 )
         
-        # Generate analytics
-        analytics = analytics_service.analyze_document(document["content"], document_id)
+        if document["analytics"] is not None:
+            return DocumentAnalytics(**document["analytics"])
+        
+        # Generate analytics and keep them until the document changes
+        analytics = await analytics_pool.analyze_document(document["content"], document_id)
+        await analytics_cache.set(document_id, document["version"], json.loads(analytics.json()))
         
         return analytics
         
     except HTTPException:
         raise
+    except (AnalyticsTooLarge, AnalyticsTimeout) as e:
+        raise analytics_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -57,7 +74,8 @@ async def get_document_analytics(
 async def get_readability_score(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    analytics_pool: AnalyticsPool = Depends(get_analytics_pool)
 ):
     """Get detailed readability analysis"""
     try:
@@ -78,18 +96,17 @@ async def get_readability_score(
                 detail="Access denied"
             )
         
-        content = document["content"]
-        readability_score = analytics_service._calculate_readability(content)
+        readability = await analytics_pool.readability(document["content"])
         
         return {
-            "readability_score": readability_score,
-            "grade_level": analytics_service._calculate_grade_level(content),
-            "reading_time": analytics_service.calculate_reading_time(content),
-            "recommendations": analytics_service._get_readability_recommendations(readability_score)
+            **readability,
+            "recommendations": analytics_service._get_readability_recommendations(readability["readability_score"])
         }
         
     except HTTPException:
         raise
+    except (AnalyticsTooLarge, AnalyticsTimeout) as e:
+        raise analytics_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -101,7 +118,8 @@ async def get_document_keywords(
     document_id: str,
     limit: int = 10,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    analytics_pool: AnalyticsPool = Depends(get_analytics_pool)
 ):
     """Extract keywords from document content"""
     try:
@@ -122,7 +140,7 @@ async def get_document_keywords(
                 detail="Access denied"
             )
         
-        keywords = analytics_service.extract_keywords(document["content"], limit)
+        keywords = await analytics_pool.extract_keywords(document["content"], limit)
         
         return {
             "keywords": keywords,
@@ -132,6 +150,8 @@ async def get_document_keywords(
         
     except HTTPException:
         raise
+    except (AnalyticsTooLarge, AnalyticsTimeout) as e:
+        raise analytics_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -187,7 +207,8 @@ async def compare_document_versions(
     document_id: str,
     request: Dict[str, Any],
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    analytics_pool: AnalyticsPool = Depends(get_analytics_pool)
 ):
     """Compare analytics between two versions of a document"""
     try:
@@ -216,9 +237,11 @@ async def compare_document_versions(
                 detail="Access denied"
             )
         
-        # Analyze both versions
-        analytics1 = analytics_service.analyze_document(version1_content, f"{document_id}_v1")
-        analytics2 = analytics_service.analyze_document(version2_content, f"{document_id}_v2")
+        # Analyze both versions side by side in the pool
+        analytics1, analytics2 = await asyncio.gather(
+            analytics_pool.analyze_document(version1_content, f"{document_id}_v1"),
+            analytics_pool.analyze_document(version2_content, f"{document_id}_v2")
+        )
         
         # Calculate improvements
         improvements = {
@@ -238,8 +261,89 @@ async def compare_document_versions(
         
     except HTTPException:
         raise
+    except (AnalyticsTooLarge, AnalyticsTimeout) as e:
+        raise analytics_exception(e)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to compare versions: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+BULK_SCORES = ("readability_score", "clarity_score", "vocabulary_score")
+
+@router.post("/bulk")
+async def bulk_document_analytics(
+    request: BulkAnalyticsRequest,
+    current_user: User = Depends(get_current_user),
+    analytics_cache: AnalyticsCache = Depends(get_analytics_cache),
+    analytics_pool: AnalyticsPool = Depends(get_analytics_pool)
+):
+    """Stream readability, clarity, vocabulary diversity and reading time for many documents as NDJSON"""
+    start_time = time.time()
+
+    def encode_event(event: dict) -> str:
+        return json.dumps(event, default=str) + "\n"
+
+    async def result_stream():
+        count = 0
+        after = ""
+        remaining = set(request.document_ids) if request.document_ids is not None else None
+        try:
+            while True:
+                documents = await analytics_cache.lookup_page(current_user.id, after, request.batch_size, request.document_ids)
+                if not documents:
+                    break
+                after = documents[-1]["id"]
+                
+                # Documents without stored analytics are scored together
+                pending = [
+                    document for document in documents
+                    if document["analytics"] is None and len(document["content"] or "") <= analytics_pool.max_chars
+                ]
+                stats = await analytics_pool.documents_stats([document["content"] or "" for document in pending])
+                scores = analytics_service.batch_scores(stats)
+                computed = {
+                    document["id"]: {name: values[index].item() for name, values in scores.items()}
+                    for index, document in enumerate(pending)
+                }
+                
+                for document in documents:
+                    if remaining is not None:
+                        remaining.discard(document["id"])
+                    
+                    if document["analytics"] is not None:
+                        result = {name: document["analytics"][name] for name in BULK_SCORES}
+                    elif document["id"] in computed:
+                        result = computed[document["id"]]
+                    else:
+                        yield encode_event({
+                            "event": "error",
+                            "document_id": document["id"],
+                            "detail": f"Text is over the {analytics_pool.max_chars} characters analytics accept"
+                        })
+                        continue
+                    
+                    count += 1
+                    yield encode_event({
+                        "event": "analytics",
+                        "document_id": document["id"],
+                        "title": document["title"],
+                        "version": document["version"],
+                        **result,
+                        # Kept current on every save, stored analytics or not
+                        "reading_time": document["reading_time"],
+                        "stored": document["analytics"] is not None
+                    })
+            
+            for document_id in sorted(remaining or ()):
+                yield encode_event({"event": "error", "document_id": document_id, "detail": "Document not found"})
+            
+            yield encode_event({
+                "event": "done",
+                "total_count": count,
+                "processing_time": time.time() - start_time
+            })
+        except Exception as e:
+            yield encode_event({"event": "error", "detail": f"Failed to compute analytics: {str(e)}"})
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
\ No newline at end of file
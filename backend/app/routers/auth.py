@@ -5,7 +5,9 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 import os
-from typing import Optional
+import json
+import uuid
+from typing import Any, Dict, Optional
 
 from app.models.user import UserCreate, UserLogin, User, Token, TokenData
 from app.database import get_db, get_database, User as UserModel
@@ -18,6 +20,8 @@ security = HTTPBearer()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# Users allowed to read service internals such as /api/ai/stats
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -63,10 +67,22 @@ async def get_current_user(
         if not user_data:
             raise credentials_exception
         
-        return User(**dict(user_data))
+        user = dict(user_data)
+        if isinstance(user["preferences"], str):
+            user["preferences"] = json.loads(user["preferences"] or "{}")
+        return User(**user)
     except Exception:
         raise credentials_exception
 
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """The current user, if their email is listed in ADMIN_EMAILS"""
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
 @router.post("/register", response_model=Token)
 async def register(user: UserCreate, database: Database = Depends(get_database)):
     # Check if user already exists
@@ -83,10 +99,12 @@ async def register(user: UserCreate, database: Database = Depends(get_database))
     
     try:
         query = """
-        INSERT INTO users (email, full_name, hashed_password, created_at, updated_at, is_active, subscription_tier, preferences)
-        VALUES (:email, :full_name, :hashed_password, :created_at, :updated_at, :is_active, :subscription_tier, :preferences)
+        INSERT INTO users (id, email, full_name, hashed_password, created_at, updated_at, is_active, subscription_tier, preferences)
+        VALUES (:id, :email, :full_name, :hashed_password, :created_at, :updated_at, :is_active, :subscription_tier, :preferences)
         """
+        # The model's uuid default only applies to ORM inserts, not to raw SQL
         await database.execute(query, {
+            "id": str(uuid.uuid4()),
             "email": user.email,
             "full_name": user.full_name,
             "hashed_password": hashed_password,
@@ -150,6 +168,27 @@ async def login(user_credentials: UserLogin, database: Database = Depends(get_da
 async def get_current_user_profile(current_user: User = Depends(get_current_user)):
     return current_user
 
+@router.put("/me/preferences", response_model=User)
+async def update_preferences(
+    preferences: Dict[str, Any],
+    current_user: User = Depends(get_current_user),
+    database: Database = Depends(get_database)
+):
+    """Merge the given keys into the user's preferences"""
+    merged = {**current_user.preferences, **preferences}
+    try:
+        await database.execute(
+            "UPDATE users SET preferences = :preferences, updated_at = :updated_at WHERE id = :id",
+            {"preferences": json.dumps(merged), "updated_at": datetime.utcnow(), "id": current_user.id}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update preferences: {str(e)}"
+        )
+    
+    return current_user.copy(update={"preferences": merged})
+
 @router.post("/logout")
 async def logout():
     # In a real implementation, you might want to blacklist the token
@@ -4,21 +4,70 @@ from datetime import datetime
 import uuid
 import json
 
-from app.models.document import Document, DocumentCreate, DocumentUpdate, DocumentVersion
+from app.models.document import Document, DocumentCreate, DocumentUpdate, DocumentVersion, SemanticSearchResult
 from app.models.user import User
 from app.database import get_database
 from app.routers.auth import get_current_user
 from app.services.analytics_service import AnalyticsService
+from app.services.similarity_index import SimilarityIndex
+from app.services.precompute import PrecomputeStore, DocumentPrecomputer
+from app.services.semantic_index import SemanticIndex
+from app.services.analytics_cache import AnalyticsCache
+from app.services.analytics_pool import AnalyticsPool
+from app.services.ollama_service import LLMUnavailable
 from databases import Database
 
 router = APIRouter()
 analytics_service = AnalyticsService()
 
+async def get_similarity_index() -> SimilarityIndex:
+    """Get similarity index from app state"""
+    from app.main import app
+    return app.state.similarity_index
+
+async def get_precompute_store() -> PrecomputeStore:
+    """Get precomputed result store from app state"""
+    from app.main import app
+    return app.state.precompute_store
+
+async def get_document_precomputer() -> DocumentPrecomputer:
+    """Get document precomputer from app state"""
+    from app.main import app
+    return app.state.document_precomputer
+
+async def get_semantic_index() -> SemanticIndex:
+    """Get semantic index from app state"""
+    from app.main import app
+    return app.state.semantic_index
+
+async def get_analytics_cache() -> AnalyticsCache:
+    """Get analytics cache from app state"""
+    from app.main import app
+    return app.state.analytics_cache
+
+async def get_analytics_pool() -> AnalyticsPool:
+    """Get analytics worker pool from app state"""
+    from app.main import app
+    return app.state.analytics_pool
+
+async def update_similarity_index(similarity_index: SimilarityIndex, document_id: str, version: int, content: Optional[str]):
+    """Keep the plagiarism index in step with stored documents without failing the request"""
+    try:
+        if content is None:
+            await similarity_index.remove_document(document_id)
+        else:
+            await similarity_index.index_document(document_id, version, content)
+    except Exception as e:
+        print(f"Failed to update similarity index: {e}")
+
 @router.post("/", response_model=Document)
 async def create_document(
     document: DocumentCreate,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index),
+    document_precomputer: DocumentPrecomputer = Depends(get_document_precomputer),
+    semantic_index: SemanticIndex = Depends(get_semantic_index)
 ):
     document_id = str(uuid.uuid4())
     word_count = len(document.content.split()) if document.content else 0
@@ -57,6 +106,11 @@ async def create_document(
                 detail="Failed to create document"
             )
         
+        await update_similarity_index(similarity_index, document_id, 1, document.content)
+        if document.content:
+            document_precomputer.schedule(document_id, current_user.id, 1)
+            semantic_index.schedule(document_id)
+        
         doc_data = dict(result)
         doc_data["tags"] = json.loads(doc_data["tags"])
         doc_data["collaborators"] = json.loads(doc_data["collaborators"])
@@ -106,6 +160,64 @@ async def get_documents(
             detail=f"Failed to fetch documents: {str(e)}"
         )
 
+@router.get("/semantic-search", response_model=List[SemanticSearchResult])
+async def semantic_search(
+    q: str = Query(..., min_length=1, max_length=2000),
+    limit: int = Query(10, ge=1, le=50),
+    min_score: float = Query(0.0, ge=-1.0, le=1.0),
+    current_user: User = Depends(get_current_user),
+    database: Database = Depends(get_database),
+    semantic_index: SemanticIndex = Depends(get_semantic_index)
+):
+    """Find the user's documents whose paragraphs are closest in meaning to the query"""
+    if not semantic_index.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Semantic search is disabled"
+        )
+    
+    try:
+        query_vector = (await semantic_index.embed([q]))[0]
+        matches = semantic_index.search(current_user.id, query_vector, limit=limit, min_score=min_score)
+        if not matches:
+            return []
+        
+        params = {f"id_{i}": match.document_id for i, match in enumerate(matches)}
+        params["user_id"] = current_user.id
+        placeholders = ", ".join(f":id_{i}" for i in range(len(matches)))
+        rows = await database.fetch_all(
+            f"SELECT id, title, content FROM documents WHERE user_id = :user_id AND id IN ({placeholders})",
+            params
+        )
+        documents = {row["id"]: row for row in rows}
+        
+        # Documents deleted since they were indexed are dropped here
+        results = []
+        for match in matches:
+            document = documents.get(match.document_id)
+            if document is None:
+                continue
+            results.append(SemanticSearchResult(
+                document_id=match.document_id,
+                title=document["title"],
+                score=round(match.score, 4),
+                position={"start": match.start, "end": match.end},
+                snippet=(document["content"] or "")[match.start:match.end][:300]
+            ))
+        return results
+    
+    except LLMUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)} if e.retry_after else None
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to search documents: {str(e)}"
+        )
+
 @router.get("/{document_id}", response_model=Document)
 async def get_document(
     document_id: str,
@@ -151,7 +263,10 @@ async def update_document(
     document_id: str,
     document_update: DocumentUpdate,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index),
+    document_precomputer: DocumentPrecomputer = Depends(get_document_precomputer),
+    semantic_index: SemanticIndex = Depends(get_semantic_index)
 ):
     try:
         # First, get the existing document
@@ -223,6 +338,11 @@ async def update_document(
             )
         
         doc_data = dict(result)
+        if document_update.content is not None:
+            await update_similarity_index(similarity_index, document_id, doc_data["version"], doc_data["content"])
+            document_precomputer.schedule(document_id, current_user.id, doc_data["version"])
+            semantic_index.schedule(document_id)
+        
         doc_data["tags"] = json.loads(doc_data["tags"])
         doc_data["collaborators"] = json.loads(doc_data["collaborators"])
         
@@ -240,7 +360,12 @@ async def update_document(
 async def delete_document(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index),
+    document_precomputer: DocumentPrecomputer = Depends(get_document_precomputer),
+    precompute_store: PrecomputeStore = Depends(get_precompute_store),
+    semantic_index: SemanticIndex = Depends(get_semantic_index),
+    analytics_cache: AnalyticsCache = Depends(get_analytics_cache)
 ):
     try:
         # Check if document exists and user has permission
@@ -262,6 +387,11 @@ async def delete_document(
         # Delete the document
         query = "DELETE FROM documents WHERE id = :id"
         await database.execute(query, {"id": document_id})
+        await update_similarity_index(similarity_index, document_id, 0, None)
+        document_precomputer.cancel(document_id)
+        await precompute_store.delete(document_id)
+        await analytics_cache.delete(document_id)
+        semantic_index.schedule(document_id)
         
         return {"message": "Document deleted successfully"}
         
@@ -277,7 +407,9 @@ async def delete_document(
 async def duplicate_document(
     document_id: str,
     current_user: User = Depends(get_current_user),
-    database: Database = Depends(get_database)
+    database: Database = Depends(get_database),
+    similarity_index: SimilarityIndex = Depends(get_similarity_index),
+    semantic_index: SemanticIndex = Depends(get_semantic_index)
 ):
     try:
         # Get original document
@@ -335,6 +467,9 @@ async def duplicate_document(
                 detail="Failed to duplicate document"
             )
         
+        await update_similarity_index(similarity_index, new_document_id, 1, original_doc["content"])
+        semantic_index.schedule(new_document_id)
+        
         doc_data = dict(result)
         doc_data["tags"] = json.loads(doc_data["tags"])
         doc_data["collaborators"] = json.loads(doc_data["collaborators"])
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from databases import Database
+
+# Document ids sent in one IN list, under the 999 parameters older SQLite builds allow
+ID_BATCH_SIZE = 500
+
+class AnalyticsCache:
+    """Document analytics stored per document version and analytics algorithm version
+    
+    A stored result is served only while the document is still at the version
+    it was computed for. Results for older versions are dropped when a newer
+    one is stored, and a periodic sweep removes those of edited or deleted
+    documents and of earlier algorithm versions.
+    """
+
+    def __init__(self, database: Database, algorithm_version: int, gc_interval: float = 3600.0):
+        self.database = database
+        self.algorithm_version = algorithm_version
+        self.gc_interval = gc_interval
+        
+        self._gc_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.collected = 0
+
+    def start(self):
+        self._gc_task = asyncio.create_task(self._gc_loop())
+
+    async def stop(self):
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            await asyncio.gather(self._gc_task, return_exceptions=True)
+            self._gc_task = None
+
+    async def lookup(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """The document's owner, collaborators and version with its stored analytics, in one query
+        
+        "analytics" is None when nothing is stored for the current version, and
+        only then is the document's content read.
+        """
+        row = await self.database.fetch_one(
+            """
+            SELECT d.user_id, d.collaborators, d.version, a.result AS analytics,
+                   CASE WHEN a.result IS NULL THEN d.content END AS content
+            FROM documents d
+            LEFT JOIN document_analytics a
+                ON a.document_id = d.id AND a.version = d.version AND a.algorithm_version = :algorithm_version
+            WHERE d.id = :document_id
+            """,
+            {"document_id": document_id, "algorithm_version": self.algorithm_version}
+        )
+        if row is None:
+            return None
+        
+        document = dict(row)
+        if document["analytics"] is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            document["analytics"] = json.loads(document["analytics"])
+        return document
+
+    async def lookup_page(
+        self,
+        user_id: str,
+        after: str,
+        limit: int,
+        document_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """The next page of a user's documents ordered by id, each with its stored analytics or its content
+        
+        With document_ids, only the ids after the page start are sent, at most
+        ID_BATCH_SIZE per query, so a long id list stays under SQLite's
+        parameter limit and is not sent again for every page.
+        """
+        if document_ids is None:
+            return self._decode_page(await self._fetch_page(user_id, after, limit))
+        
+        pending = sorted(document_id for document_id in set(document_ids) if document_id > after)
+        rows = []
+        # Ids are sorted, so each batch's rows come after the previous batch's
+        for start in range(0, len(pending), ID_BATCH_SIZE):
+            if len(rows) >= limit:
+                break
+            rows.extend(await self._fetch_page(user_id, after, limit - len(rows), pending[start:start + ID_BATCH_SIZE]))
+        return self._decode_page(rows)
+
+    async def _fetch_page(self, user_id: str, after: str, limit: int, document_ids: Optional[List[str]] = None) -> List[Any]:
+        values = {"user_id": user_id, "after": after, "limit": limit, "algorithm_version": self.algorithm_version}
+        id_filter = ""
+        if document_ids is not None:
+            placeholders = []
+            for index, document_id in enumerate(document_ids):
+                values[f"id_{index}"] = document_id
+                placeholders.append(f":id_{index}")
+            id_filter = f"AND d.id IN ({', '.join(placeholders)})"
+        
+        return await self.database.fetch_all(
+            f"""
+            SELECT d.id, d.title, d.version, d.reading_time, a.result AS analytics,
+                   CASE WHEN a.result IS NULL THEN d.content END AS content
+            FROM documents d
+            LEFT JOIN document_analytics a
+                ON a.document_id = d.id AND a.version = d.version AND a.algorithm_version = :algorithm_version
+            WHERE d.user_id = :user_id AND d.id > :after {id_filter}
+            ORDER BY d.id
+            LIMIT :limit
+            """,
+            values
+        )
+
+    def _decode_page(self, rows: List[Any]) -> List[Dict[str, Any]]:
+        documents = []
+        for row in rows:
+            document = dict(row)
+            if document["analytics"] is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                document["analytics"] = json.loads(document["analytics"])
+            documents.append(document)
+        return documents
+
+    async def set(self, document_id: str, version: int, result: Dict[str, Any]):
+        await self.database.execute(
+            "DELETE FROM document_analytics WHERE document_id = :document_id AND version < :version",
+            {"document_id": document_id, "version": version}
+        )
+        await self.database.execute(
+            """
+            INSERT OR REPLACE INTO document_analytics (document_id, version, algorithm_version, result, created_at)
+            VALUES (:document_id, :version, :algorithm_version, :result, :created_at)
+            """,
+            {
+                "document_id": document_id,
+                "version": version,
+                "algorithm_version": self.algorithm_version,
+                "result": json.dumps(result, default=str),
+                "created_at": datetime.utcnow()
+            }
+        )
+
+    async def delete(self, document_id: str):
+        await self.database.execute(
+            "DELETE FROM document_analytics WHERE document_id = :document_id",
+            {"document_id": document_id}
+        )
+
+    async def collect_garbage(self) -> int:
+        """Delete results that can no longer be served; returns how many were removed"""
+        stale = """
+            FROM document_analytics
+            WHERE algorithm_version != :algorithm_version
+                OR NOT EXISTS (
+                    SELECT 1 FROM documents
+                    WHERE documents.id = document_analytics.document_id
+                        AND documents.version = document_analytics.version
+                )
+        """
+        values = {"algorithm_version": self.algorithm_version}
+        count = await self.database.fetch_val(f"SELECT COUNT(*) {stale}", values)
+        if count:
+            await self.database.execute(f"DELETE {stale}", values)
+            self.collected += count
+        return count
+
+    async def _gc_loop(self):
+        while True:
+            try:
+                await self.collect_garbage()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Analytics cache cleanup failed: {e}")
+            await asyncio.sleep(self.gc_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "collected": self.collected,
+            "algorithm_version": self.algorithm_version
+        }
\ No newline at end of file
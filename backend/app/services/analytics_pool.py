@@ -0,0 +1,203 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models.document import DocumentAnalytics
+from app.services.analytics_service import AnalyticsService, TextStats
+from app.services.paragraph_state import Paragraph, split_paragraphs
+
+class AnalyticsTooLarge(Exception):
+    """Raised when a text is over the size analytics will take on"""
+
+class AnalyticsTimeout(Exception):
+    """Raised when analytics for a text did not finish within the task timeout"""
+
+# Each worker process builds its own service once, in _init_worker. Paragraph
+# stats are cached by the pool's service in the API process, not here.
+_service: Optional[AnalyticsService] = None
+
+def _init_worker():
+    global _service
+    _service = AnalyticsService(paragraph_cache_size=0)
+    # Load the punkt model and stopwords now rather than on the first request
+    _service.analyze_document("Warm up the tokenizers. They load lazily.", "")
+
+def _started() -> bool:
+    return True
+
+def _worker_service() -> AnalyticsService:
+    global _service
+    if _service is None:
+        _service = AnalyticsService(paragraph_cache_size=0)
+    return _service
+
+def paragraph_stats(texts: List[str]) -> List[TextStats]:
+    service = _worker_service()
+    return [service.text_stats(text) for text in texts]
+
+class AnalyticsPool:
+    """Run CPU-bound analytics in worker processes so they never block the event loop
+    
+    Documents are analyzed paragraph by paragraph: stats for paragraphs the
+    service has seen before come from its cache, and only new or edited
+    paragraphs are sent to the workers, spread across them.
+    
+    Tasks are handed to the pool only when a worker is free and its workers
+    have started, so task_timeout covers the computation itself. A task still
+    running after task_timeout seconds is stopped by replacing the pool,
+    since a running process task cannot be cancelled on its own. Other tasks
+    caught in the replaced pool are retried once on the new one.
+    
+    With workers set to 0 analytics run in a thread of the API process, which
+    keeps the event loop free but shares the GIL with it; the timeout then
+    only stops the wait.
+    """
+
+    def __init__(self, service: AnalyticsService, workers: int = 2, task_timeout: float = 30.0, max_chars: int = 2_000_000):
+        self.service = service
+        self.workers = workers
+        self.task_timeout = task_timeout
+        self.max_chars = max_chars
+        
+        self._executor: Optional[Executor] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self._generation = 0
+        
+        self.tasks = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.recycled = 0
+
+    def start(self):
+        if self.workers > 0:
+            self._executor = self._new_executor()
+
+    async def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def analyze_document(self, content: str, document_id: str) -> DocumentAnalytics:
+        stats = await self.document_stats(content)
+        return self.service.analyze_document(content, document_id, stats=stats)
+
+    async def extract_keywords(self, content: str, limit: int = 10) -> List[str]:
+        stats = await self.document_stats(content)
+        return self.service.extract_keywords(content, limit, stats=stats)
+
+    async def readability(self, content: str) -> Dict[str, Any]:
+        stats = await self.document_stats(content)
+        return self.service.readability(content, stats=stats)
+
+    async def document_stats(self, content: str) -> TextStats:
+        """Combined stats of content's paragraphs, computing only those not cached"""
+        return (await self.documents_stats([content]))[0]
+
+    async def documents_stats(self, contents: List[str]) -> List[TextStats]:
+        """Stats of several documents, computing the uncached paragraphs of all of them in one go"""
+        for content in contents:
+            if len(content) > self.max_chars:
+                self.rejected += 1
+                raise AnalyticsTooLarge(f"Text is {len(content)} characters; analytics accept at most {self.max_chars}")
+        
+        documents = [split_paragraphs(content) for content in contents]
+        stats = [self.service.cached_stats(paragraphs) for paragraphs in documents]
+        
+        # Paragraphs shared between documents are computed once
+        missing: Dict[str, Paragraph] = {}
+        for paragraphs, cached in zip(documents, stats):
+            for paragraph, cached_stats in zip(paragraphs, cached):
+                if cached_stats is None:
+                    missing.setdefault(paragraph.hash, paragraph)
+        pending = list(missing.values())
+        
+        # One task per worker at most, each taking a contiguous run of paragraphs
+        batch_size = -(-len(pending) // max(1, self.workers)) or 1
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        results = await asyncio.gather(*[
+            self.run(paragraph_stats, [paragraph.text for paragraph in batch])
+            for batch in batches
+        ])
+        
+        computed: Dict[str, TextStats] = {}
+        for batch, batch_stats in zip(batches, results):
+            for paragraph, computed_stats in zip(batch, batch_stats):
+                computed[paragraph.hash] = computed_stats
+                self.service.remember(paragraph, computed_stats)
+        
+        return [
+            TextStats.combine(
+                cached if cached is not None else computed[paragraph.hash]
+                for paragraph, cached in zip(paragraphs, document_stats)
+            )
+            for paragraphs, document_stats in zip(documents, stats)
+        ]
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Call function(*args) in the pool within the task timeout"""
+        self.tasks += 1
+        if self._executor is None:
+            return await self._wait(asyncio.to_thread(function, *args), None)
+        
+        async with self._slots:
+            for attempt in range(2):
+                await self._ready
+                generation = self._generation
+                future = asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+                try:
+                    return await self._wait(future, generation)
+                except BrokenProcessPool:
+                    # The pool was replaced under this task (another task timed out or a worker died)
+                    if attempt == 1:
+                        raise
+                    if generation == self._generation:
+                        self._recycle()
+
+    async def _wait(self, future: Any, generation: Optional[int]) -> Any:
+        try:
+            return await asyncio.wait_for(future, self.task_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if generation is not None and generation == self._generation:
+                self._recycle()
+            raise AnalyticsTimeout(f"Analytics did not finish within {self.task_timeout}s")
+
+    def _new_executor(self) -> Executor:
+        # Spawned workers start clean instead of inheriting the server's threads and connections
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+        # Start every worker now; tasks wait for this before their timeout starts
+        self._ready = asyncio.gather(
+            *[asyncio.wrap_future(executor.submit(_started)) for _ in range(self.workers)],
+            return_exceptions=True
+        )
+        return executor
+
+    def _recycle(self):
+        """Replace the pool, killing its workers and whatever they are running"""
+        executor = self._executor
+        self._executor = self._new_executor()
+        self._generation += 1
+        self.recycled += 1
+        
+        for process in list(getattr(executor, "_processes", {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "task_timeout_seconds": self.task_timeout,
+            "max_chars": self.max_chars,
+            "tasks": self.tasks,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "recycled": self.recycled,
+            **self.service.stats()
+        }
\ No newline at end of file
@@ -1,11 +1,14 @@
 import textstat
 import re
-from typing import Dict, Any, List
-from collections import Counter
+import numpy as np
+from functools import cached_property, lru_cache
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
+from collections import Counter, OrderedDict
 import nltk
 from nltk.tokenize import sent_tokenize, word_tokenize
 from nltk.corpus import stopwords
 from app.models.document import DocumentAnalytics
+from app.services.paragraph_state import Paragraph, split_paragraphs
 
 # Download required NLTK data
 try:
@@ -18,26 +21,239 @@ try:
 except LookupError:
     nltk.download('stopwords')
 
+# Bump when a scoring change should invalidate analytics stored for unchanged documents
+ANALYTICS_VERSION = 2
+
+# word_tokenize rewrites double quotes, so map them back when aligning tokens to the text
+QUOTE_TOKENS = {'``': '"', "''": '"'}
+
+class Token(NamedTuple):
+    start: int
+    end: int
+    text: str
+
+class SentenceTokens(NamedTuple):
+    start: int
+    end: int
+    text: str
+    words: List[Token]
+
+# textstat's sentence pattern; readability scores count sentences (and words) its way
+READABILITY_SENTENCE = re.compile(r'\b[^.!?]+[.!?]*', re.UNICODE)
+
+PASSIVE_INDICATORS = {'was', 'were', 'been', 'being', 'is', 'are', 'am'}
+ACTIVE_INDICATORS = ['we', 'you', 'I', 'they']
+TRANSITIONS = ['however', 'therefore', 'moreover', 'furthermore', 'additionally']
+
+def legacy_round(value, points: int):
+    """Round half away from zero to points decimals, as textstat rounds; takes floats or arrays"""
+    scale = 10 ** points
+    return np.floor(value * scale + np.copysign(0.5, value)) / scale
+
+@lru_cache(maxsize=65536)
+def syllable_count(word: str) -> int:
+    """Syllables in one word, cached across documents"""
+    return textstat.syllable_count(word)
+
+class TextProfile:
+    """A text tokenized once for every count analytics need
+    
+    Sentence and word tokenization happen up front; lowercased forms and
+    syllable-based counts are computed on first use and kept.
+    """
+
+    def __init__(self, content: str, sentences: List[SentenceTokens], words: List[str], sentence_count: int):
+        self.content = content
+        self.sentences = sentences
+        # Every token, including any that could not be placed in the text
+        self.words = words
+        self.sentence_count = sentence_count
+
+    @cached_property
+    def lower_content(self) -> str:
+        return self.content.lower()
+
+    @cached_property
+    def lower_words(self) -> List[str]:
+        return [word.lower() for word in self.words]
+
+    @cached_property
+    def alpha_words(self) -> List[str]:
+        """Lowercased tokens made only of letters"""
+        return [lower for word, lower in zip(self.words, self.lower_words) if word.isalpha()]
+
+    @cached_property
+    def word_count(self) -> int:
+        """Whitespace-separated words, as shown to users"""
+        return len(self.content.split())
+
+    @cached_property
+    def complex_word_count(self) -> int:
+        """Tokens of three or more syllables"""
+        return sum(1 for word in self.lower_words if syllable_count(word) >= 3)
+
+class TextStats:
+    """The counts behind every analytics score, for a paragraph or a whole document
+    
+    Counts of separate paragraphs add up to those of the text holding them,
+    so a document's scores can be rebuilt from its paragraphs' stats and only
+    edited paragraphs need tokenizing again.
+    """
+
+    COUNTS = (
+        "word_count",              # whitespace-separated words
+        "words",                   # NLTK tokens
+        "sentences",               # NLTK sentences
+        "clarity_sentences",       # sentences located in the text
+        "clarity_sentence_words",  # whitespace-separated words of those sentences
+        "complex_words",           # tokens of three or more syllables
+        "passive_words",
+        "adverbs",
+        "questions",
+        "active_indicators",
+        "transitions",
+        "plain_words",             # words as textstat counts them
+        "readability_sentences",   # sentences as textstat counts them
+        "syllable_words",
+        "syllables"
+    )
+
+    def __init__(self, terms: Optional[Counter] = None, **counts: int):
+        for name in self.COUNTS:
+            setattr(self, name, counts.get(name, 0))
+        # Lowercased alphabetic tokens and how often each occurs
+        self.terms = terms if terms is not None else Counter()
+
+    def add(self, other: "TextStats"):
+        for name in self.COUNTS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.terms.update(other.terms)
+
+    @classmethod
+    def combine(cls, parts: Iterable["TextStats"]) -> "TextStats":
+        total = cls()
+        for part in parts:
+            total.add(part)
+        return total
+
 class AnalyticsService:
-    def __init__(self):
+    def __init__(self, paragraph_cache_size: int = 20000):
         self.stop_words = set(stopwords.words('english'))
+        # Paragraph hash -> stats, so unchanged paragraphs are not tokenized again
+        self.paragraph_cache_size = paragraph_cache_size
+        self._paragraph_stats: "OrderedDict[str, TextStats]" = OrderedDict()
+        self.paragraph_hits = 0
+        self.paragraph_misses = 0
+
+    def profile(self, content: str) -> TextProfile:
+        """Tokenize content once into sentences and words with their character offsets"""
+        sentences = []
+        words = []
+        position = 0
+        raw_sentences = sent_tokenize(content)
+        
+        for sentence in raw_sentences:
+            # The text is already split into sentences, so tokenize each as one line
+            tokens = word_tokenize(sentence, preserve_line=True)
+            words.extend(tokens)
+            
+            start = content.find(sentence, position)
+            if start == -1:
+                continue
+            position = start + len(sentence)
+            
+            sentence_words = []
+            cursor = start
+            for token in tokens:
+                token = QUOTE_TOKENS.get(token, token)
+                token_start = content.find(token, cursor, position)
+                if token_start == -1:
+                    continue
+                cursor = token_start + len(token)
+                sentence_words.append(Token(token_start, cursor, token))
+            
+            sentences.append(SentenceTokens(start, position, sentence, sentence_words))
+        
+        return TextProfile(content, sentences, words, len(raw_sentences))
+
+    def tokenize(self, content: str) -> List[SentenceTokens]:
+        """Sentence and word tokens with their character offsets in content"""
+        return self.profile(content).sentences
+
+    def text_stats(self, content: str) -> TextStats:
+        """Count everything the scores need in one piece of text"""
+        profile = self.profile(content)
+        lower_content = profile.lower_content
+        lower_words = profile.lower_words
+        
+        readability_sentences = READABILITY_SENTENCE.findall(content)
+        ignored = sum(1 for sentence in readability_sentences if textstat.lexicon_count(sentence) <= 2)
+        syllable_words = textstat.remove_punctuation(lower_content).split()
+        
+        return TextStats(
+            terms=Counter(profile.alpha_words),
+            word_count=profile.word_count,
+            words=len(profile.words),
+            sentences=profile.sentence_count,
+            clarity_sentences=len(profile.sentences),
+            clarity_sentence_words=sum(len(sentence.text.split()) for sentence in profile.sentences),
+            complex_words=profile.complex_word_count,
+            passive_words=sum(1 for word in lower_words if word in PASSIVE_INDICATORS),
+            adverbs=sum(1 for word in lower_words if word.endswith('ly') and len(word) > 3),
+            questions=content.count('?'),
+            active_indicators=sum(lower_content.count(word) for word in ACTIVE_INDICATORS),
+            transitions=sum(lower_content.count(word) for word in TRANSITIONS),
+            plain_words=textstat.lexicon_count(content),
+            readability_sentences=len(readability_sentences) - ignored,
+            syllable_words=len(syllable_words),
+            syllables=sum(syllable_count(word) for word in syllable_words)
+        )
+
+    def cached_stats(self, paragraphs: List[Paragraph]) -> List[Optional[TextStats]]:
+        """Stats kept for each paragraph, or None for paragraphs not seen before"""
+        cached = []
+        for paragraph in paragraphs:
+            stats = self._paragraph_stats.get(paragraph.hash)
+            if stats is None:
+                self.paragraph_misses += 1
+            else:
+                self.paragraph_hits += 1
+                self._paragraph_stats.move_to_end(paragraph.hash)
+            cached.append(stats)
+        return cached
+
+    def remember(self, paragraph: Paragraph, stats: TextStats):
+        if self.paragraph_cache_size <= 0:
+            return
+        
+        self._paragraph_stats[paragraph.hash] = stats
+        self._paragraph_stats.move_to_end(paragraph.hash)
+        while len(self._paragraph_stats) > self.paragraph_cache_size:
+            self._paragraph_stats.popitem(last=False)
+
+    def document_stats(self, content: str) -> TextStats:
+        """Stats of a whole document, tokenizing only paragraphs not seen before"""
+        paragraphs = split_paragraphs(content)
+        stats = self.cached_stats(paragraphs)
+        for index, paragraph in enumerate(paragraphs):
+            if stats[index] is None:
+                stats[index] = self.text_stats(paragraph.text)
+                self.remember(paragraph, stats[index])
+        return TextStats.combine(stats)
     
-    def analyze_document(self, content: str, document_id: str) -> DocumentAnalytics:
+    def analyze_document(self, content: str, document_id: str, stats: Optional[TextStats] = None) -> DocumentAnalytics:
         """Comprehensive document analysis"""
-        
-        # Basic metrics
-        word_count = len(content.split())
-        sentence_count = len(sent_tokenize(content))
+        stats = stats or self.document_stats(content)
         
         # Readability scores
-        readability_score = self._calculate_readability(content)
-        clarity_score = self._calculate_clarity(content)
-        engagement_score = self._calculate_engagement(content)
-        vocabulary_score = self._calculate_vocabulary_diversity(content)
-        grade_level = textstat.flesch_kincaid_grade(content)
+        readability_score = self._calculate_readability(stats)
+        clarity_score = self._calculate_clarity(stats)
+        engagement_score = self._calculate_engagement(stats)
+        vocabulary_score = self._calculate_vocabulary_diversity(stats)
+        grade_level = self._calculate_grade_level(stats)
         
         # Writing statistics
-        writing_stats = self._calculate_writing_stats(content)
+        writing_stats = self._calculate_writing_stats(stats)
         
         # Tone analysis (placeholder - would use AI service)
         tone_analysis = {
@@ -59,107 +275,176 @@ class AnalyticsService:
             writing_stats=writing_stats
         )
     
-    def _calculate_readability(self, content: str) -> float:
+    def _readability_averages(self, stats: TextStats):
+        """Words per sentence and syllables per word, rounded as textstat rounds them
+        
+        The counts are summed over paragraphs, which matches textstat on the
+        whole text except for a paragraph ending without . ! or ? (a heading
+        or list item): textstat runs it into the next paragraph's first
+        sentence, while here it is a sentence of its own.
+        """
+        sentence_length = legacy_round(stats.plain_words / max(1, stats.readability_sentences), 1)
+        syllables_per_word = 0.0
+        if stats.syllable_words:
+            syllables_per_word = legacy_round(stats.syllables / stats.syllable_words, 1)
+        return sentence_length, syllables_per_word
+
+    def _calculate_readability(self, stats: TextStats) -> float:
         """Calculate readability score using multiple metrics"""
         try:
-            flesch_score = textstat.flesch_reading_ease(content)
+            # Flesch reading ease
+            sentence_length, syllables_per_word = self._readability_averages(stats)
+            flesch_score = legacy_round(206.835 - 1.015 * sentence_length - 84.6 * syllables_per_word, 2)
             # Convert to 0-100 scale where higher is better
             return max(0, min(100, flesch_score))
         except:
             return 75.0
     
-    def _calculate_clarity(self, content: str) -> float:
+    def _calculate_grade_level(self, stats: TextStats) -> float:
+        """Flesch-Kincaid grade level"""
+        sentence_length, syllables_per_word = self._readability_averages(stats)
+        return legacy_round(0.39 * sentence_length + 11.8 * syllables_per_word - 15.59, 1)
+
+    def _get_readability_recommendations(self, readability_score: float) -> List[str]:
+        """Advice for raising a Flesch reading ease score"""
+        if readability_score >= 70:
+            return ["Readability is good; keep sentences short and words plain."]
+
+        recommendations = [
+            "Shorten long sentences or split them in two.",
+            "Prefer shorter, everyday words to long or technical ones."
+        ]
+        if readability_score < 50:
+            recommendations.append("Break dense paragraphs up and explain one idea at a time.")
+        if readability_score < 30:
+            recommendations.append("Consider rewriting for a general audience; the text reads at a graduate level.")
+        return recommendations
+
+    def _calculate_clarity(self, stats: TextStats) -> float:
         """Calculate clarity score based on sentence structure and word choice"""
-        sentences = sent_tokenize(content)
-        if not sentences:
+        if not stats.clarity_sentences:
             return 0.0
         
         # Average sentence length
-        avg_sentence_length = sum(len(sentence.split()) for sentence in sentences) / len(sentences)
+        avg_sentence_length = stats.clarity_sentence_words / stats.clarity_sentences
         
         # Penalty for very long sentences
         length_score = max(0, 100 - (avg_sentence_length - 15) * 2)
         
         # Count complex words (3+ syllables)
-        words = word_tokenize(content.lower())
-        complex_words = sum(1 for word in words if textstat.syllable_count(word) >= 3)
-        complexity_ratio = complex_words / len(words) if words else 0
+        complexity_ratio = stats.complex_words / stats.words if stats.words else 0
         complexity_score = max(0, 100 - complexity_ratio * 200)
         
         return (length_score + complexity_score) / 2
     
-    def _calculate_engagement(self, content: str) -> float:
+    def _calculate_engagement(self, stats: TextStats) -> float:
         """Calculate engagement score based on various factors"""
         score = 50.0  # Base score
         
-        # Check for questions
-        question_count = content.count('?')
-        score += min(question_count * 5, 20)
-        
-        # Check for active voice indicators
-        active_indicators = ['we', 'you', 'I', 'they']
-        active_count = sum(content.lower().count(word) for word in active_indicators)
-        score += min(active_count * 2, 15)
-        
-        # Check for transition words
-        transitions = ['however', 'therefore', 'moreover', 'furthermore', 'additionally']
-        transition_count = sum(content.lower().count(word) for word in transitions)
-        score += min(transition_count * 3, 15)
+        # Questions, active voice indicators and transition words
+        score += min(stats.questions * 5, 20)
+        score += min(stats.active_indicators * 2, 15)
+        score += min(stats.transitions * 3, 15)
         
         return min(100, score)
     
-    def _calculate_vocabulary_diversity(self, content: str) -> float:
+    def _calculate_vocabulary_diversity(self, stats: TextStats) -> float:
         """Calculate vocabulary diversity using type-token ratio"""
-        words = [word.lower() for word in word_tokenize(content) if word.isalpha()]
-        if not words:
+        total_words = sum(stats.terms.values())
+        if not total_words:
             return 0.0
         
-        unique_words = set(words)
-        diversity_ratio = len(unique_words) / len(words)
+        diversity_ratio = len(stats.terms) / total_words
         
         # Convert to 0-100 scale
         return min(100, diversity_ratio * 200)
     
-    def _calculate_writing_stats(self, content: str) -> Dict[str, Any]:
+    def _calculate_writing_stats(self, stats: TextStats) -> Dict[str, Any]:
         """Calculate detailed writing statistics"""
-        sentences = sent_tokenize(content)
-        words = word_tokenize(content)
+        words = stats.words
         
         # Average sentence length
-        avg_sentence_length = len(words) / len(sentences) if sentences else 0
+        avg_sentence_length = words / stats.sentences if stats.sentences else 0
         
-        # Passive voice detection (simplified)
-        passive_indicators = ['was', 'were', 'been', 'being', 'is', 'are', 'am']
-        passive_count = sum(1 for word in words if word.lower() in passive_indicators)
-        passive_percentage = (passive_count / len(words)) * 100 if words else 0
-        
-        # Adverb usage (words ending in -ly)
-        adverbs = [word for word in words if word.lower().endswith('ly') and len(word) > 3]
-        adverb_percentage = (len(adverbs) / len(words)) * 100 if words else 0
+        # Passive voice detection (simplified) and adverb usage (words ending in -ly)
+        passive_percentage = (stats.passive_words / words) * 100 if words else 0
+        adverb_percentage = (stats.adverbs / words) * 100 if words else 0
         
         # Most common words (excluding stop words)
-        content_words = [word.lower() for word in words if word.lower() not in self.stop_words and word.isalpha()]
-        word_freq = Counter(content_words)
+        word_freq = Counter({word: count for word, count in stats.terms.items() if word not in self.stop_words})
         
         return {
             'average_sentence_length': round(avg_sentence_length, 1),
             'passive_voice_percentage': round(passive_percentage, 1),
             'adverb_percentage': round(adverb_percentage, 1),
-            'total_sentences': len(sentences),
-            'total_words': len(words),
-            'unique_words': len(set(content_words)),
+            'total_sentences': stats.sentences,
+            'total_words': words,
+            'unique_words': len(word_freq),
             'most_common_words': word_freq.most_common(10)
         }
     
-    def calculate_reading_time(self, content: str, wpm: int = 200) -> int:
+    def calculate_reading_time(self, content: str, wpm: int = 200, stats: Optional[TextStats] = None) -> int:
         """Calculate estimated reading time in minutes"""
-        word_count = len(content.split())
+        word_count = stats.word_count if stats is not None else len(content.split())
         return max(1, round(word_count / wpm))
     
-    def extract_keywords(self, content: str, limit: int = 10) -> List[str]:
+    def extract_keywords(self, content: str, limit: int = 10, stats: Optional[TextStats] = None) -> List[str]:
         """Extract key terms from content"""
-        words = [word.lower() for word in word_tokenize(content) 
-                if word.isalpha() and word.lower() not in self.stop_words and len(word) > 3]
+        stats = stats or self.document_stats(content)
+        word_freq = Counter({
+            word: count for word, count in stats.terms.items()
+            if word not in self.stop_words and len(word) > 3
+        })
+        return [word for word, _ in word_freq.most_common(limit)]
+
+    def readability(self, content: str, stats: Optional[TextStats] = None) -> Dict[str, Any]:
+        """Readability score, grade level and reading time"""
+        stats = stats or self.document_stats(content)
+        return {
+            "readability_score": self._calculate_readability(stats),
+            "grade_level": self._calculate_grade_level(stats),
+            "reading_time": self.calculate_reading_time(content, stats=stats)
+        }
+
+    def batch_scores(self, stats: List[TextStats]) -> Dict[str, np.ndarray]:
+        """Readability, clarity and vocabulary diversity for many documents at once
         
-        word_freq = Counter(words)
-        return [word for word, _ in word_freq.most_common(limit)]
\ No newline at end of file
+        The same formulas as the single-document scores, computed over arrays
+        of the documents' counts.
+        """
+        def counts(name: str) -> np.ndarray:
+            return np.array([getattr(document, name) for document in stats], dtype=np.float64)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            plain_words = counts("plain_words")
+            sentence_length = legacy_round(plain_words / np.maximum(1, counts("readability_sentences")), 1)
+            syllable_words = counts("syllable_words")
+            syllables_per_word = np.where(syllable_words > 0, legacy_round(counts("syllables") / syllable_words, 1), 0.0)
+            flesch = legacy_round(206.835 - 1.015 * sentence_length - 84.6 * syllables_per_word, 2)
+            readability = np.clip(flesch, 0, 100)
+            
+            clarity_sentences = counts("clarity_sentences")
+            words = counts("words")
+            length_score = np.maximum(0, 100 - (counts("clarity_sentence_words") / clarity_sentences - 15) * 2)
+            complexity_ratio = np.where(words > 0, counts("complex_words") / words, 0)
+            complexity_score = np.maximum(0, 100 - complexity_ratio * 200)
+            clarity = np.where(clarity_sentences > 0, (length_score + complexity_score) / 2, 0.0)
+            
+            unique_terms = np.array([len(document.terms) for document in stats], dtype=np.float64)
+            total_terms = np.array([sum(document.terms.values()) for document in stats], dtype=np.float64)
+            vocabulary = np.where(total_terms > 0, np.minimum(100, unique_terms / total_terms * 200), 0.0)
+        
+        return {
+            "readability_score": readability,
+            "clarity_score": clarity,
+            "vocabulary_score": vocabulary
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.paragraph_hits + self.paragraph_misses
+        return {
+            "cached_paragraphs": len(self._paragraph_stats),
+            "paragraph_hits": self.paragraph_hits,
+            "paragraph_misses": self.paragraph_misses,
+            "paragraph_hit_rate": round(self.paragraph_hits / total, 3) if total else 0.0
+        }
\ No newline at end of file
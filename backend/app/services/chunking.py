@@ -0,0 +1,113 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from app.services.paragraph_state import split_paragraphs
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+CHUNK_SEPARATOR = "\n\n"
+
+def context_char_budget(num_ctx: int, reserved_tokens: int, chars_per_token: int = 4) -> int:
+    """Number of text characters that fit in the model context after the prompt and output reserve"""
+    return max(500, (num_ctx - reserved_tokens) * chars_per_token)
+
+class Chunk(NamedTuple):
+    text: str
+    # (offset in chunk text, start in document, end in document) for each contiguous piece
+    pieces: List[Tuple[int, int, int]]
+
+    def document_spans(self) -> List[Tuple[int, int]]:
+        return [(doc_start, doc_end) for _, doc_start, doc_end in self.pieces]
+
+    def to_document_span(self, start: int, end: int) -> Optional[Tuple[int, int]]:
+        """Translate a span in the chunk text to document offsets, or None if it crosses pieces"""
+        for offset, doc_start, doc_end in self.pieces:
+            piece_end = offset + (doc_end - doc_start)
+            if offset <= start and end <= piece_end:
+                return doc_start + (start - offset), doc_start + (end - offset)
+        return None
+
+def split_segments(content: str, max_chars: int, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Split content[start:end] into spans on paragraph, then sentence boundaries, each at most max_chars"""
+    end = len(content) if end is None else end
+    segments = []
+    
+    for paragraph in split_paragraphs(content[start:end]):
+        paragraph_start = start + paragraph.start
+        paragraph_end = start + paragraph.end
+        if paragraph_end - paragraph_start <= max_chars:
+            segments.append((paragraph_start, paragraph_end))
+            continue
+        
+        # Paragraph too long for one chunk: fall back to sentences
+        sentence_start = paragraph_start
+        for match in SENTENCE_BOUNDARY.finditer(content, paragraph_start, paragraph_end):
+            segments.extend(_split_long_span(content, sentence_start, match.start(), max_chars))
+            sentence_start = match.end()
+        segments.extend(_split_long_span(content, sentence_start, paragraph_end, max_chars))
+    
+    return segments
+
+def split_sentences(content: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """Spans of the sentences in content[start:end], trimmed of surrounding whitespace"""
+    spans = []
+    sentence_start = start
+    for match in SENTENCE_BOUNDARY.finditer(content, start, end):
+        spans.append((sentence_start, match.start()))
+        sentence_start = match.end()
+    spans.append((sentence_start, end))
+    
+    trimmed = []
+    for span_start, span_end in spans:
+        text = content[span_start:span_end]
+        if text.strip():
+            span_start += len(text) - len(text.lstrip())
+            trimmed.append((span_start, span_start + len(text.strip())))
+    return trimmed
+
+def _split_long_span(content: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """Hard-split a run-on sentence at whitespace so no span exceeds max_chars"""
+    spans = []
+    while end - start > max_chars:
+        cut = content.rfind(" ", start + 1, start + max_chars)
+        if cut == -1:
+            cut = start + max_chars
+        spans.append((start, cut))
+        start = cut
+        while start < end and content[start].isspace():
+            start += 1
+    if start < end:
+        spans.append((start, end))
+    return spans
+
+def plan_chunks(content: str, segments: List[Tuple[int, int]], max_chars: int) -> List[Chunk]:
+    """Pack consecutive segments into chunks of at most max_chars"""
+    chunks = []
+    text = ""
+    pieces = []
+    last_end = None
+    
+    for seg_start, seg_end in segments:
+        gap = content[last_end:seg_start] if last_end is not None and last_end <= seg_start else None
+        contiguous = gap is not None and not gap.strip()
+        joiner = gap if contiguous else CHUNK_SEPARATOR
+        
+        if pieces and len(text) + len(joiner) + (seg_end - seg_start) > max_chars:
+            chunks.append(Chunk(text, pieces))
+            text, pieces = "", []
+        
+        if pieces and contiguous:
+            # Keep the original whitespace so the chunk stays a slice of the document
+            text += joiner + content[seg_start:seg_end]
+            offset, doc_start, _ = pieces[-1]
+            pieces[-1] = (offset, doc_start, seg_end)
+        else:
+            if pieces:
+                text += CHUNK_SEPARATOR
+            pieces.append((len(text), seg_start, seg_end))
+            text += content[seg_start:seg_end]
+        last_end = seg_end
+    
+    if pieces:
+        chunks.append(Chunk(text, pieces))
+    
+    return chunks
\ No newline at end of file
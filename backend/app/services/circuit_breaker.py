@@ -0,0 +1,75 @@
+import time
+from typing import Any, Dict, Optional
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency that keeps failing; retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Circuit open, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Fail fast after failure_threshold consecutive failures
+    
+    Once open, calls are rejected for reset_seconds. After that a single
+    trial call is let through (half-open): success closes the circuit and
+    failure opens it again. A trial that never reports back, for example
+    because its caller was cancelled, is replaced after another reset_seconds.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        
+        self.rejected = 0
+        self.opened = 0
+
+    def check(self):
+        """Raise CircuitOpen unless a call may go ahead now"""
+        if self.state == self.CLOSED:
+            return
+        
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._trial_started = None
+        
+        if self.state == self.HALF_OPEN and (self._trial_started is None or now - self._trial_started >= self.reset_seconds):
+            self._trial_started = now
+            return
+        
+        self.rejected += 1
+        raise CircuitOpen(max(1, int(self._opened_at + self.reset_seconds - now + 0.999)))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._trial_started = None
+
+    def record_failure(self):
+        self._consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._trial_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
\ No newline at end of file
@@ -0,0 +1,80 @@
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+class ContextSession:
+    """Ollama context tokens from a document's last call and the endpoint that holds them"""
+    
+    __slots__ = ("tokens", "endpoint", "last_used")
+
+    def __init__(self, tokens: Sequence[int], endpoint: Optional[str]):
+        # Stored as a compact int array; Ollama contexts run to thousands of tokens
+        self.tokens = array("i", tokens)
+        self.endpoint = endpoint
+        self.last_used = time.monotonic()
+
+    def context(self) -> List[int]:
+        return self.tokens.tolist()
+
+class ContextSessionStore:
+    """Per-paragraph Ollama contexts of documents, expired after ttl_seconds and capped in count and total tokens"""
+
+    def __init__(self, max_sessions: int = 500, max_total_tokens: int = 1000000, ttl_seconds: float = 600.0):
+        self.max_sessions = max_sessions
+        self.max_total_tokens = max_total_tokens
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ContextSession]" = OrderedDict()
+        self._total_tokens = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(document_id: str, writing_goal: str, language: str, model_name: str, scope: str = "") -> str:
+        return f"{document_id}|{model_name}|{writing_goal}|{language}|{scope}"
+
+    def get(self, key: str) -> Optional[ContextSession]:
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        
+        if time.monotonic() - session.last_used > self.ttl_seconds:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(key)
+        return session
+
+    def set(self, key: str, tokens: Optional[Sequence[int]], endpoint: Optional[str] = None):
+        if key in self._sessions:
+            self._remove(key)
+        if not tokens or self.max_sessions <= 0 or len(tokens) > self.max_total_tokens:
+            return
+        
+        session = ContextSession(tokens, endpoint)
+        self._sessions[key] = session
+        self._total_tokens += len(session.tokens)
+        
+        while len(self._sessions) > self.max_sessions or self._total_tokens > self.max_total_tokens:
+            self._remove(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def discard(self, key: str):
+        if key in self._sessions:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        session = self._sessions.pop(key)
+        self._total_tokens -= len(session.tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "tokens": self._total_tokens,
+            "max_sessions": self.max_sessions,
+            "max_total_tokens": self.max_total_tokens,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
\ No newline at end of file
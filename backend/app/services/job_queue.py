@@ -0,0 +1,342 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from databases import Database
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are waiting; retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class JobQueue:
+    """Durable job queue stored in the ai_jobs table, drained by a pool of async workers
+    
+    Several processes may drain the same table: a job is claimed by a single
+    conditional UPDATE, so only one of them runs it. A running job holds a
+    lease that its worker renews every lease_seconds / 3; jobs whose lease ran
+    out, because their process died, are queued again, so work accepted by
+    the API is not lost. Jobs running at a clean shutdown are queued again
+    right away. Failed attempts are retried with exponential backoff until
+    max_attempts is reached, and finished jobs are deleted after
+    retention_seconds.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        workers: int = 4,
+        max_pending: int = 1000,
+        max_attempts: int = 3,
+        backoff_seconds: float = 2.0,
+        max_backoff_seconds: float = 300.0,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+        retention_seconds: float = 86400.0,
+        sweep_interval: float = 60.0
+    ):
+        self.database = database
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.sweep_interval = sweep_interval
+        
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._handler_tasks: Dict[str, asyncio.Task] = {}
+        # Attempt number of each job this process is running, for lease renewal and shutdown
+        self._running: Dict[str, int] = {}
+        
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.reclaimed = 0
+        self.deleted = 0
+
+    def register(self, job_type: str, handler: JobHandler):
+        """Handle jobs of job_type with handler(job), where job carries id, user_id and payload"""
+        self._handlers[job_type] = handler
+
+    async def start(self):
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+
+    async def stop(self):
+        # Only handlers are cancelled; workers finish their current query and
+        # exit, since a query cancelled mid-way can leak its connection
+        self._stopping.set()
+        self._wakeup.set()
+        for task in self._handler_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        # Interrupted jobs can run again at once instead of waiting for their lease to expire
+        running, self._running = self._running, {}
+        for job_id, attempts in running.items():
+            await self.database.execute(
+                """
+                UPDATE ai_jobs SET status = 'queued', updated_at = :now
+                WHERE id = :id AND status = 'running' AND attempts = :attempts
+                """,
+                {"now": datetime.utcnow(), "id": job_id, "attempts": attempts}
+            )
+
+    async def enqueue(self, job_type: str, user_id: str, payload: Dict[str, Any], max_attempts: Optional[int] = None) -> str:
+        """Persist a job and wake a worker; raises JobQueueFull when the backlog is too long"""
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        
+        pending = await self.database.fetch_val(
+            "SELECT COUNT(*) FROM ai_jobs WHERE status IN ('queued', 'running')"
+        )
+        if pending >= self.max_pending:
+            raise JobQueueFull(max(1, int(pending / max(1, self.workers))))
+        
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        await self.database.execute(
+            """
+            INSERT INTO ai_jobs (id, user_id, type, status, payload, attempts, max_attempts, run_after, created_at, updated_at)
+            VALUES (:id, :user_id, :type, 'queued', :payload, 0, :max_attempts, :run_after, :created_at, :updated_at)
+            """,
+            {
+                "id": job_id,
+                "user_id": user_id,
+                "type": job_type,
+                "payload": json.dumps(payload, default=str),
+                "max_attempts": max_attempts or self.max_attempts,
+                "run_after": now,
+                "created_at": now,
+                "updated_at": now
+            }
+        )
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.database.fetch_one("SELECT * FROM ai_jobs WHERE id = :id", {"id": job_id})
+        if not row:
+            return None
+        
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    async def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Failed to claim job: {e}")
+                job = None
+            
+            if job is None:
+                # Sleep until a new job arrives, a retry becomes due or the queue stops
+                self._wakeup.clear()
+                timeout = await self._idle_timeout()
+                if self._stopping.is_set():
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            await self._run(job)
+
+    async def _idle_timeout(self) -> float:
+        try:
+            next_run = await self.database.fetch_val("SELECT MIN(run_after) FROM ai_jobs WHERE status = 'queued'")
+        except Exception:
+            return self.poll_interval
+        if next_run is None:
+            return self.poll_interval
+        if isinstance(next_run, str):
+            next_run = datetime.fromisoformat(next_run)
+        return max(0.01, min(self.poll_interval, (next_run - datetime.utcnow()).total_seconds()))
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        # One statement picks and marks the job; if another process claimed
+        # it first, the status guard matches no row and nothing is returned
+        now = datetime.utcnow()
+        row = await self.database.fetch_one(
+            """
+            UPDATE ai_jobs
+            SET status = 'running', attempts = attempts + 1, started_at = :now, updated_at = :now
+            WHERE status = 'queued' AND id = (
+                SELECT id FROM ai_jobs
+                WHERE status = 'queued' AND run_after <= :now
+                ORDER BY run_after, created_at
+                LIMIT 1
+            )
+            RETURNING *
+            """,
+            {"now": now}
+        )
+        if not row:
+            return None
+        
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"] or "{}")
+        return job
+
+    async def _run(self, job: Dict[str, Any]):
+        handler = self._handlers.get(job["type"])
+        self._running[job["id"]] = job["attempts"]
+        if self._stopping.is_set():
+            # Claimed as the queue was stopping; stop() queues it again
+            return
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job type: {job['type']}")
+            task = self._handler_tasks[job["id"]] = asyncio.create_task(handler(job))
+            try:
+                result = await task
+            finally:
+                self._handler_tasks.pop(job["id"], None)
+        except asyncio.CancelledError:
+            if not self._stopping.is_set():
+                raise
+            # Shutting down: stop() queues the job again
+            return
+        except Exception as e:
+            self._running.pop(job["id"], None)
+            await self._record_failure(job, e)
+            return
+        
+        self._running.pop(job["id"], None)
+        now = datetime.utcnow()
+        await self.database.execute(
+            """
+            UPDATE ai_jobs
+            SET status = 'succeeded', result = :result, error = NULL, finished_at = :now, updated_at = :now
+            WHERE id = :id AND status = 'running' AND attempts = :attempts
+            """,
+            {"result": json.dumps(result, default=str), "now": now, "id": job["id"], "attempts": job["attempts"]}
+        )
+        self.succeeded += 1
+
+    async def _record_failure(self, job: Dict[str, Any], error: Exception):
+        now = datetime.utcnow()
+        if job["attempts"] < job["max_attempts"]:
+            # Exponential backoff with jitter so retries of a shared failure spread out
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (job["attempts"] - 1))
+            delay *= random.uniform(0.5, 1.5)
+            retry_after = getattr(error, "retry_after", None)
+            if retry_after:
+                delay = max(delay, retry_after)
+            
+            await self.database.execute(
+                """
+                UPDATE ai_jobs
+                SET status = 'queued', error = :error, run_after = :run_after, updated_at = :now
+                WHERE id = :id AND status = 'running' AND attempts = :attempts
+                """,
+                {"error": str(error), "run_after": now + timedelta(seconds=delay), "now": now, "id": job["id"], "attempts": job["attempts"]}
+            )
+            self.retried += 1
+            return
+        
+        await self.database.execute(
+            """
+            UPDATE ai_jobs
+            SET status = 'failed', error = :error, finished_at = :now, updated_at = :now
+            WHERE id = :id AND status = 'running' AND attempts = :attempts
+            """,
+            {"error": str(error), "now": now, "id": job["id"], "attempts": job["attempts"]}
+        )
+        self.failed += 1
+        print(f"Job {job['id']} ({job['type']}) failed: {error}")
+
+    async def _maintenance(self):
+        """Renew the leases of running jobs, reclaim expired ones and delete old finished jobs"""
+        last_sweep = 0.0
+        while not self._stopping.is_set():
+            try:
+                await self.renew_leases()
+                await self.reclaim_expired()
+                if time.monotonic() - last_sweep >= self.sweep_interval:
+                    await self.delete_finished()
+                    last_sweep = time.monotonic()
+            except Exception as e:
+                print(f"Job queue maintenance failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.lease_seconds / 3)
+            except asyncio.TimeoutError:
+                pass
+
+    async def renew_leases(self):
+        now = datetime.utcnow()
+        for job_id, attempts in list(self._running.items()):
+            await self.database.execute(
+                "UPDATE ai_jobs SET updated_at = :now WHERE id = :id AND status = 'running' AND attempts = :attempts",
+                {"now": now, "id": job_id, "attempts": attempts}
+            )
+
+    async def reclaim_expired(self) -> int:
+        """Queue again the running jobs whose lease expired, or fail them if out of attempts"""
+        now = datetime.utcnow()
+        values = {"cutoff": now - timedelta(seconds=self.lease_seconds), "now": now}
+        expired = "status = 'running' AND updated_at < :cutoff"
+        count = await self.database.fetch_val(f"SELECT COUNT(*) FROM ai_jobs WHERE {expired}", {"cutoff": values["cutoff"]})
+        if not count:
+            return 0
+        
+        await self.database.execute(
+            f"""
+            UPDATE ai_jobs
+            SET status = 'failed', error = 'Worker stopped responding', finished_at = :now, updated_at = :now
+            WHERE {expired} AND attempts >= max_attempts
+            """,
+            values
+        )
+        await self.database.execute(
+            f"UPDATE ai_jobs SET status = 'queued', run_after = :now, updated_at = :now WHERE {expired}",
+            values
+        )
+        self.reclaimed += count
+        self._wakeup.set()
+        return count
+
+    async def delete_finished(self) -> int:
+        """Delete succeeded and failed jobs that finished more than retention_seconds ago"""
+        values = {"cutoff": datetime.utcnow() - timedelta(seconds=self.retention_seconds)}
+        finished = "status IN ('succeeded', 'failed') AND finished_at < :cutoff"
+        count = await self.database.fetch_val(f"SELECT COUNT(*) FROM ai_jobs WHERE {finished}", values)
+        if count:
+            await self.database.execute(f"DELETE FROM ai_jobs WHERE {finished}", values)
+            self.deleted += count
+        return count
+
+    async def stats(self) -> Dict[str, Any]:
+        rows = await self.database.fetch_all("SELECT status, COUNT(*) AS count FROM ai_jobs GROUP BY status")
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "by_status": {row["status"]: row["count"] for row in rows},
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "reclaimed": self.reclaimed,
+            "deleted": self.deleted,
+            "lease_seconds": self.lease_seconds,
+            "retention_seconds": self.retention_seconds
+        }
\ No newline at end of file
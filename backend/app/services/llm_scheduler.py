@@ -0,0 +1,177 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, Optional
+
+class Priority(IntEnum):
+    """Scheduling classes; lower values are served first"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+class SchedulerOverloaded(Exception):
+    """Raised when the queue is full; retry_after is a hint in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class SchedulerSlot:
+    """A granted unit of model capacity; release() is safe to call more than once"""
+
+    def __init__(self, scheduler: "LLMScheduler"):
+        self._scheduler = scheduler
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._scheduler._release(time.monotonic() - self._acquired_at)
+
+class LLMScheduler:
+    """Global concurrency cap with per-user fair queuing and priority classes"""
+
+    def __init__(self, max_concurrency: int = 8, max_queue_depth: int = 100, max_queued_per_user: int = 10):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_queued_per_user = max_queued_per_user
+        
+        self._active = 0
+        self._depth = 0
+        # One round-robin ring of per-user queues for each priority class
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        
+        self.granted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self._max_wait = 0.0
+        self._avg_service_time = 1.0
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, priority: Priority = Priority.INTERACTIVE, deadline: Optional[float] = None):
+        """Hold one unit of model capacity for the duration of the block"""
+        granted_slot = await self.acquire(user_id, priority, deadline)
+        try:
+            yield granted_slot
+        finally:
+            granted_slot.release()
+
+    async def acquire(self, user_id: str, priority: Priority = Priority.INTERACTIVE, deadline: Optional[float] = None) -> SchedulerSlot:
+        """Wait for capacity; raises SchedulerOverloaded when the queue is full
+        
+        With a deadline (a time.monotonic() value), raises asyncio.TimeoutError
+        if no capacity is granted by then.
+        """
+        enqueued_at = time.monotonic()
+        
+        if self._active < self.max_concurrency and self._depth == 0:
+            self._active += 1
+            self._record_wait(0.0)
+            return SchedulerSlot(self)
+        
+        user_queue = self._queues[priority].get(user_id)
+        if self._depth >= self.max_queue_depth or (user_queue and len(user_queue) >= self.max_queued_per_user):
+            self.rejected += 1
+            raise SchedulerOverloaded(self._retry_after())
+        
+        future = asyncio.get_running_loop().create_future()
+        if user_queue is None:
+            user_queue = self._queues[priority][user_id] = deque()
+        user_queue.append(future)
+        self._depth += 1
+        
+        try:
+            if deadline is None:
+                await future
+            else:
+                await asyncio.wait_for(future, max(0.0, deadline - time.monotonic()))
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+            if future.cancelled():
+                self._remove_waiter(priority, user_id, future)
+            else:
+                # Capacity was granted just as the caller gave up: pass it on
+                self._release(0.0)
+            raise
+        
+        self._record_wait(time.monotonic() - enqueued_at)
+        return SchedulerSlot(self)
+
+    def _remove_waiter(self, priority: Priority, user_id: str, future: asyncio.Future):
+        user_queue = self._queues[priority].get(user_id)
+        if user_queue and future in user_queue:
+            user_queue.remove(future)
+            self._depth -= 1
+            if not user_queue:
+                del self._queues[priority][user_id]
+
+    def _release(self, service_time: float):
+        self._active -= 1
+        if service_time:
+            self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * service_time
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free capacity to waiters: highest priority first, round-robin across users"""
+        while self._active < self.max_concurrency:
+            future = self._next_waiter()
+            if future is None:
+                return
+            self._active += 1
+            future.set_result(None)
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in Priority:
+            users = self._queues[priority]
+            while users:
+                user_id, user_queue = next(iter(users.items()))
+                future = user_queue.popleft()
+                self._depth -= 1
+                
+                # Move this user to the back of the ring so others get the next turn
+                if user_queue:
+                    users.move_to_end(user_id)
+                else:
+                    del users[user_id]
+                
+                if not future.done():
+                    return future
+        return None
+
+    def _record_wait(self, wait: float):
+        self.granted += 1
+        self._recent_waits.append(wait)
+        self._max_wait = max(self._max_wait, wait)
+
+    def _retry_after(self) -> int:
+        """Estimate how long until the current queue drains"""
+        waves = (self._depth + 1) / max(1, self.max_concurrency)
+        return max(1, math.ceil(waves * self._avg_service_time))
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._recent_waits)
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self._depth,
+            "max_queue_depth": self.max_queue_depth,
+            "queue_depth_by_priority": {
+                priority.name.lower(): sum(len(queue) for queue in self._queues[priority].values())
+                for priority in Priority
+            },
+            "queued_users": sum(len(users) for users in self._queues.values()),
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 1)
+        }
\ No newline at end of file
@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+class MicroBatcher:
+    """Gather items submitted within a short window and process them as one batch"""
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        window_seconds: float = 0.025,
+        max_batch_weight: Optional[int] = None
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window_seconds = window_seconds
+        self.max_batch_weight = max_batch_weight
+        
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._pending_weight = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        
+        self.batches = 0
+        self.items = 0
+        self.abandoned = 0
+
+    async def submit(self, item: Any, weight: int = 1) -> Any:
+        """Queue an item and wait for its share of the batch result"""
+        loop = asyncio.get_running_loop()
+        
+        # Keep each batch within the weight budget (e.g. the prompt size)
+        if self._pending and self.max_batch_weight and self._pending_weight + weight > self.max_batch_weight:
+            self._flush()
+        
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self._pending_weight += weight
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        
+        batch = self._pending
+        self._pending = []
+        self._pending_weight = 0
+        
+        task = asyncio.ensure_future(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        # Callers that gave up while waiting are left out of the batch
+        live = [(item, future) for item, future in batch if not future.done()]
+        if not live:
+            return
+        
+        self.batches += 1
+        self.items += len(live)
+        work = asyncio.ensure_future(self.process_batch([item for item, _ in live]))
+        
+        def abandon(_):
+            # Stop the batch (and its model call) once every caller has given up
+            if all(future.done() for _, future in live) and not work.done():
+                self.abandoned += 1
+                work.cancel()
+        
+        for _, future in live:
+            future.add_done_callback(abandon)
+        
+        try:
+            results = await work
+        except asyncio.CancelledError:
+            if work.cancelled() and all(future.done() for _, future in live):
+                return
+            work.cancel()
+            raise
+        except Exception as e:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for index, (_, future) in enumerate(live):
+            if future.done():
+                continue
+            result = results[index] if index < len(results) else ValueError("No result returned for batch item")
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "abandoned": self.abandoned,
+            "average_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": round(self.window_seconds * 1000, 1)
+        }
\ No newline at end of file
@@ -0,0 +1,339 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+import ollama
+
+class NoHealthyEndpoint(Exception):
+    """Raised when every endpoint in the pool is ejected"""
+
+class OllamaEndpoint:
+    """One Ollama server and its load and health counters"""
+
+    def __init__(self, url: str, client: Optional[Any] = None):
+        self.url = url
+        self.client = client or ollama.AsyncClient(host=url)
+        self.models: Optional[Set[str]] = None
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    @property
+    def available(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+    def serves(self, model: str) -> bool:
+        # Until the first health check lists its models an endpoint may serve anything
+        return self.models is None or model in self.models
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "available": self.available,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "models": sorted(self.models) if self.models is not None else None
+        }
+
+class OllamaPool:
+    """Ollama endpoints balanced by least outstanding requests, with health-based ejection
+    
+    An endpoint is ejected for ejection_seconds after failure_threshold
+    consecutive failed calls or a failed health check. Ejected endpoints are
+    probed by the periodic health check and return once they answer again.
+    """
+
+    def __init__(
+        self,
+        endpoints: Iterable[OllamaEndpoint],
+        health_interval: float = 10.0,
+        health_timeout: float = 5.0,
+        failure_threshold: int = 3,
+        ejection_seconds: float = 30.0
+    ):
+        self.endpoints: List[OllamaEndpoint] = list(endpoints)
+        if not self.endpoints:
+            raise ValueError("At least one Ollama endpoint is required")
+        
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.failure_threshold = failure_threshold
+        self.ejection_seconds = ejection_seconds
+        
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+        
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_urls(cls, urls: Iterable[str], **kwargs) -> "OllamaPool":
+        return cls([OllamaEndpoint(url.strip().rstrip("/")) for url in urls if url.strip()], **kwargs)
+
+    async def start(self):
+        await self.check_health()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    async def ensure_models(self, models: Iterable[str]):
+        """Pull any model an available endpoint does not have yet"""
+        for endpoint in self.endpoints:
+            if not endpoint.available or endpoint.models is None:
+                continue
+            for model in models:
+                if model not in endpoint.models:
+                    print(f"Pulling {model} model on {endpoint.url}...")
+                    await endpoint.client.pull(model)
+                    endpoint.models.add(model)
+
+    def pick(self, model: str, exclude: Iterable[OllamaEndpoint] = (), prefer: Optional[str] = None) -> OllamaEndpoint:
+        """The available endpoint serving model with the fewest requests in flight
+        
+        A preferred endpoint (one holding the caller's cached prompt prefix) is
+        chosen unless it is carrying more than one request above the least loaded.
+        """
+        exclude = set(exclude)
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint.available and endpoint.serves(model) and endpoint not in exclude
+        ]
+        if not candidates:
+            raise NoHealthyEndpoint(f"No available Ollama endpoint serves {model}")
+        
+        # Rotate the starting point so ties spread across endpoints
+        self._next = (self._next + 1) % len(candidates)
+        rotated = candidates[self._next:] + candidates[:self._next]
+        least_loaded = min(rotated, key=lambda endpoint: endpoint.outstanding)
+        
+        for endpoint in candidates:
+            if endpoint.url == prefer and endpoint.outstanding <= least_loaded.outstanding + 1:
+                return endpoint
+        return least_loaded
+
+    async def generate(self, model: str, prefer: Optional[str] = None, **kwargs) -> Any:
+        """Call generate on the least loaded endpoint; streams are returned as async iterators
+        
+        The response (the final part, for streams) carries the URL of the
+        endpoint that answered under "endpoint".
+        """
+        endpoint = self.pick(model, prefer=prefer)
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        
+        if kwargs.get("stream"):
+            try:
+                stream = await endpoint.client.generate(model=model, **kwargs)
+            except Exception as e:
+                endpoint.outstanding -= 1
+                self._record_failure(endpoint, e)
+                raise
+            return self._track_stream(endpoint, stream)
+        
+        return await self._call(endpoint, model, **kwargs)
+
+    async def hedged_generate(self, model: str, hedge_after: float, prefer: Optional[str] = None, **kwargs) -> Any:
+        """Non-streaming generate that also asks a second endpoint if the first is slow or fails
+        
+        The backup request starts once hedge_after seconds pass without an
+        answer, or straight away if the first endpoint fails. Whichever answers
+        first wins and the other request is cancelled.
+        """
+        primary_endpoint = self.pick(model, prefer=prefer)
+        primary_endpoint.outstanding += 1
+        primary_endpoint.requests += 1
+        primary = asyncio.ensure_future(self._call(primary_endpoint, model, **kwargs))
+        
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            error = None
+            if done:
+                if primary.exception() is None:
+                    return primary.result()
+                error = primary.exception()
+            
+            try:
+                backup_endpoint = self.pick(model, exclude=[primary_endpoint])
+            except NoHealthyEndpoint:
+                if error is not None:
+                    raise error
+                return await primary
+            
+            self.hedged += 1
+            backup_endpoint.outstanding += 1
+            backup_endpoint.requests += 1
+            backup = asyncio.ensure_future(self._call(backup_endpoint, model, **kwargs))
+            pending.add(backup)
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def embeddings(self, model: str, prompt: str, **kwargs) -> List[float]:
+        """Embed one text on the least loaded endpoint serving the embedding model"""
+        endpoint = self.pick(model)
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        try:
+            response = await endpoint.client.embeddings(model=model, prompt=prompt, **kwargs)
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+        
+        endpoint.consecutive_failures = 0
+        return response["embedding"]
+
+    async def _call(self, endpoint: OllamaEndpoint, model: str, **kwargs) -> Any:
+        """Run a non-streaming generate on an endpoint already counted as outstanding"""
+        try:
+            response = await endpoint.client.generate(model=model, **kwargs)
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+        
+        endpoint.consecutive_failures = 0
+        return {**response, "endpoint": endpoint.url}
+
+    async def _track_stream(self, endpoint: OllamaEndpoint, stream: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async for part in stream:
+                if part.get("done"):
+                    part = {**part, "endpoint": endpoint.url}
+                yield part
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        else:
+            endpoint.consecutive_failures = 0
+        finally:
+            endpoint.outstanding -= 1
+
+    def _record_failure(self, endpoint: OllamaEndpoint, error: Exception):
+        # Errors about the request itself (bad model, bad options) say nothing about the server's health
+        if isinstance(error, ollama.ResponseError) and 0 < error.status_code < 500:
+            return
+        
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= self.failure_threshold:
+            self._eject(endpoint, error)
+
+    def _eject(self, endpoint: OllamaEndpoint, reason: Any):
+        if endpoint.available:
+            endpoint.ejections += 1
+            print(f"Ejecting Ollama endpoint {endpoint.url} for {self.ejection_seconds}s: {reason}")
+        endpoint.ejected_until = time.monotonic() + self.ejection_seconds
+        endpoint.consecutive_failures = 0
+
+    async def check_health(self):
+        await asyncio.gather(*[self._check_endpoint(endpoint) for endpoint in self.endpoints])
+
+    async def _check_endpoint(self, endpoint: OllamaEndpoint):
+        try:
+            listing = await asyncio.wait_for(endpoint.client.list(), self.health_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._eject(endpoint, e)
+            return
+        
+        # Ollama lists "llama3:latest"; requests may use either form
+        models = set()
+        for model in listing.get("models", []):
+            name = model["name"]
+            models.add(name)
+            if name.endswith(":latest"):
+                models.add(name[:-len(":latest")])
+        endpoint.models = models
+        
+        if not endpoint.available:
+            print(f"Ollama endpoint {endpoint.url} is healthy again")
+        endpoint.ejected_until = 0.0
+        endpoint.consecutive_failures = 0
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Ollama health check failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+            "available": sum(1 for endpoint in self.endpoints if endpoint.available),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins
+        }
+
+class ModelRouter:
+    """Choose the model for each task, with an optional small model for short texts"""
+
+    def __init__(
+        self,
+        default_model: str,
+        task_models: Optional[Dict[str, str]] = None,
+        short_text_model: Optional[str] = None,
+        short_text_chars: int = 0
+    ):
+        self.default_model = default_model
+        self.task_models = {task: model for task, model in (task_models or {}).items() if model}
+        self.short_text_model = short_text_model
+        self.short_text_chars = short_text_chars
+        self.routed: Dict[str, int] = {}
+
+    def model_for(self, task: str, text_length: Optional[int] = None) -> str:
+        """Route a request and count it towards the model's stats"""
+        model = self.resolve(task, text_length)
+        self.routed[model] = self.routed.get(model, 0) + 1
+        return model
+
+    def resolve(self, task: str, text_length: Optional[int] = None) -> str:
+        """The model a request would be routed to, without counting it"""
+        model = self.task_models.get(task, self.default_model)
+        if self.short_text_model and text_length is not None and text_length <= self.short_text_chars:
+            model = self.short_text_model
+        return model
+
+    def models(self) -> Set[str]:
+        models = {self.default_model, *self.task_models.values()}
+        if self.short_text_model:
+            models.add(self.short_text_model)
+        return models
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.default_model,
+            "tasks": dict(self.task_models),
+            "short_text_model": self.short_text_model,
+            "short_text_chars": self.short_text_chars,
+            "requests_by_model": dict(self.routed)
+        }
\ No newline at end of file
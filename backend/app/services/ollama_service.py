@@ -1,177 +1,957 @@
-import ollama
 import asyncio
-from typing import List, Dict, Any, Optional
-from langchain.llms import Ollama
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain.schema import BaseOutputParser
+import bisect
+import copy
+import hashlib
 import json
+import os
 import re
-from app.models.suggestion import Suggestion, SuggestionType, SeverityLevel, TextPosition
+import time
+from contextlib import asynccontextmanager
+from pydantic import ValidationError
+from app.models.suggestion import Suggestion, SuggestionType, SeverityLevel, TextPosition, LLMSuggestion
+from app.services.suggestion_cache import SuggestionCache
+from app.services.paragraph_state import Paragraph, ParagraphStateStore, split_paragraphs, shift_suggestion
+from app.services.chunking import Chunk, context_char_budget, split_segments, split_sentences, plan_chunks
+from app.services.position_resolver import PositionResolver
+from app.services.single_flight import SingleFlight
+from app.services.micro_batcher import MicroBatcher
+from app.services.ollama_pool import OllamaPool, ModelRouter
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpen
+from app.services.context_sessions import ContextSession, ContextSessionStore
 
-class SuggestionOutputParser(BaseOutputParser):
-    def parse(self, text: str) -> List[Dict[str, Any]]:
-        try:
-            # Try to parse as JSON first
-            if text.strip().startswith('['):
-                return json.loads(text)
-            
-            # Fallback to regex parsing
-            suggestions = []
-            lines = text.strip().split('\n')
-            current_suggestion = {}
+# "3: Formal: 75, Confident: 80, ..." lines in batched tone answers
+TONE_LINE = re.compile(r'^\s*\[?(\d+)\]?\s*[:.)-]\s*(.*)$')
+TONE_SCORE = re.compile(r'([A-Za-z][A-Za-z ]*?)\s*:\s*(-?\d+(?:\.\d+)?)')
+
+# Served when the model cannot score the tone and nothing is cached
+DEFAULT_TONE = {'formal': 75, 'confident': 80, 'optimistic': 65, 'analytical': 90}
+
+# Tokens kept free in the context window for the prompt template and the model's answer
+SUGGESTION_RESERVED_TOKENS = 1024
+TONE_RESERVED_TOKENS = 256
+
+# Tokens kept free for the answer when a context session is continued; the
+# follow-up prompt itself is counted from its text
+SUGGESTION_ANSWER_TOKENS = 512
+
+# Rough token estimate for plain prose, matching the chunk budget
+CHARS_PER_TOKEN = 4
+
+SUGGESTION_PROMPT = PromptTemplate(
+    input_variables=["content", "writing_goal", "language"],
+    template="""
+You are an expert writing assistant. Analyze the following text and provide specific suggestions for improvement.
+
+Text to analyze: "{content}"
+Writing goal: {writing_goal}
+Language: {language}
+
+Respond with a JSON object of this form:
+
+{{"suggestions": [
+  {{
+    "type": "grammar" | "style" | "clarity" | "tone" | "vocabulary",
+    "text": "the problematic text, copied exactly from the text to analyze",
+    "suggestion": "your suggested replacement",
+    "explanation": "brief explanation of why this is better",
+    "severity": "error" | "warning" | "info",
+    "confidence": number from 0 to 100
+  }}
+]}}
+
+Focus on:
+1. Grammar errors
+2. Style improvements for {writing_goal} writing
+3. Clarity and readability
+4. Tone consistency
+5. Vocabulary enhancement
+
+Repeated words, common misspellings, passive voice, overlong sentences and adverb overuse are checked separately, so do not report them.
+
+Provide up to 10 most important suggestions.
+"""
+)
+
+# Sent instead of SUGGESTION_PROMPT when the document's previous exchange is
+# passed as context, so the instructions are not repeated
+SUGGESTION_FOLLOW_UP_PROMPT = PromptTemplate(
+    input_variables=["content", "writing_goal", "language"],
+    template="""
+Analyze this next text from the same document in the same way and respond with a JSON object of the same form.
+
+Text to analyze: "{content}"
+Writing goal: {writing_goal}
+Language: {language}
+"""
+)
+
+def session_scopes(content: str, chunks: List[Chunk]) -> List[str]:
+    """Context session scope of each chunk: the paragraph it starts in, numbered when several chunks start in one
+    
+    An edited paragraph is sent again under the same scope, so its chunk
+    continues the session of the previous analysis of that paragraph.
+    """
+    starts = [paragraph.start for paragraph in split_paragraphs(content)]
+    counts: Dict[int, int] = {}
+    scopes = []
+    for chunk in chunks:
+        paragraph = max(0, bisect.bisect_right(starts, chunk.pieces[0][1]) - 1)
+        counts[paragraph] = counts.get(paragraph, 0) + 1
+        scopes.append(f"{paragraph}.{counts[paragraph]}")
+    return scopes
+
+def parse_tone_scores(answer: str, count: int) -> List[Optional[Dict[str, float]]]:
+    """Split a batched tone answer into the scores of each of count texts, None where missing
+    
+    Lines numbered "1:", "[1]" or "1." go to that text. Lines of scores
+    without a number, as models often answer for a single text, fill the
+    texts left without scores in order; for a single text they are merged,
+    since it may be scored one aspect per line.
+    """
+    numbered = {}
+    bare = []
+    for line in answer.split('\n'):
+        match = TONE_LINE.match(line)
+        index, scores_text = (int(match.group(1)), match.group(2)) if match else (None, line)
+        
+        tone_scores = {key.strip().lower(): float(value) for key, value in TONE_SCORE.findall(scores_text)}
+        if not tone_scores:
+            continue
+        if index is None:
+            bare.append(tone_scores)
+        elif 1 <= index <= count:
+            numbered.setdefault(index, tone_scores)
+    
+    if count == 1 and len(bare) > 1:
+        bare = [{key: value for tone_scores in reversed(bare) for key, value in tone_scores.items()}]
+    
+    unscored = iter(bare)
+    return [numbered.get(i) or next(unscored, None) for i in range(1, count + 1)]
+
+class LLMUnavailable(Exception):
+    """The model could not answer in time; callers fall back to degraded results"""
+
+    def __init__(self, reason: str, retry_after: Optional[int] = None):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class JsonSuggestionStreamParser:
+    """Incrementally extract suggestion objects from streaming JSON output
+
+    Every object that is an element of an array (the "suggestions" list, or a
+    bare top-level list) is returned as soon as its closing brace arrives, so
+    suggestions can be validated before the completion has finished.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._containers = []
+        self._object_start = None
+        self._in_string = False
+        self._escaped = False
+        self._emitted = 0
+        self._text = []
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a piece of model output and return the objects it completed"""
+        completed = []
+        for char in text:
+            self._text.append(char)
+            if self._object_start is not None:
+                self._buffer.append(char)
             
-            for line in lines:
-                line = line.strip()
-                if line.startswith('Type:'):
-                    if current_suggestion:
-                        suggestions.append(current_suggestion)
-                    current_suggestion = {'type': line.split(':', 1)[1].strip().lower()}
-                elif line.startswith('Text:'):
-                    current_suggestion['text'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Suggestion:'):
-                    current_suggestion['suggestion'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Explanation:'):
-                    current_suggestion['explanation'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Severity:'):
-                    current_suggestion['severity'] = line.split(':', 1)[1].strip().lower()
-                elif line.startswith('Confidence:'):
-                    try:
-                        current_suggestion['confidence'] = float(line.split(':', 1)[1].strip().replace('%', ''))
-                    except:
-                        current_suggestion['confidence'] = 80.0
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
             
-            if current_suggestion:
-                suggestions.append(current_suggestion)
-                
-            return suggestions
-        except Exception as e:
-            print(f"Error parsing suggestions: {e}")
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if char == '{' and self._object_start is None and self._containers and self._containers[-1] == '[':
+                    self._object_start = len(self._containers)
+                    self._buffer = [char]
+                self._containers.append(char)
+            elif char in '}]' and self._containers:
+                self._containers.pop()
+                if char == '}' and self._object_start == len(self._containers):
+                    completed.extend(self._decode(''.join(self._buffer)))
+                    self._object_start = None
+                    self._buffer = []
+        return completed
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Handle output that never contained a list, such as a single bare suggestion"""
+        if self._emitted:
+            return []
+        try:
+            value = json.loads(''.join(self._text))
+        except ValueError:
             return []
+        return [value] if isinstance(value, dict) and 'text' in value else []
+
+    def _decode(self, raw: str) -> List[Dict[str, Any]]:
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return []
+        if not isinstance(value, dict):
+            return []
+        self._emitted += 1
+        return [value]
 
 class OllamaService:
     def __init__(self):
-        self.client = None
-        self.llm = None
-        self.model_name = "llama3"
-        self.base_url = "http://localhost:11434"
+        self.pool = None
+        self.model_name = os.getenv("OLLAMA_MODEL", "llama3")
+        self.base_urls = os.getenv("OLLAMA_BASE_URLS") or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        
+        # Full suggestions use the main model; tone and short texts can go to a smaller one
+        self.model_router = ModelRouter(
+            self.model_name,
+            task_models={
+                "tone": os.getenv("OLLAMA_TONE_MODEL"),
+                "vocabulary": os.getenv("OLLAMA_VOCABULARY_MODEL")
+            },
+            short_text_model=os.getenv("OLLAMA_SHORT_TEXT_MODEL"),
+            short_text_chars=int(os.getenv("OLLAMA_SHORT_TEXT_CHARS", "500"))
+        )
+        self.suggestion_cache = SuggestionCache(
+            max_entries=int(os.getenv("SUGGESTION_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("SUGGESTION_CACHE_TTL_SECONDS", "600"))
+        )
+        self.paragraph_state = ParagraphStateStore(
+            max_documents=int(os.getenv("PARAGRAPH_STATE_MAX_DOCUMENTS", "1000"))
+        )
+        self.tone_cache = SuggestionCache(
+            max_entries=int(os.getenv("SUGGESTION_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("SUGGESTION_CACHE_TTL_SECONDS", "600"))
+        )
+        # Model findings per sentence, shared by every document and user that opts in
+        self.sentence_cache = SuggestionCache(
+            max_entries=int(os.getenv("SENTENCE_CACHE_SIZE", "20000")),
+            ttl_seconds=float(os.getenv("SENTENCE_CACHE_TTL_SECONDS", "86400"))
+        )
+        self.sentences_reused = 0
+        self.sentences_analyzed = 0
+        self.paragraphs_analyzed = 0
+        self.paragraphs_reused = 0
+        self.prompt_chars_sent = 0
+        self.suggestions_accepted = 0
+        self.suggestions_rejected = 0
+        
+        # Chunk sizing follows the model context window; fan-out is bounded per service
+        self.num_ctx = int(os.getenv("OLLAMA_NUM_CTX", "2048"))
+        self.chunk_chars = context_char_budget(self.num_ctx, SUGGESTION_RESERVED_TOKENS)
+        self.tone_chunk_chars = context_char_budget(self.num_ctx, TONE_RESERVED_TOKENS)
+        self.llm_semaphore = asyncio.Semaphore(int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")))
+        self.single_flight = SingleFlight()
         
+        # Bound how long a model call, and a whole request including its queueing,
+        # may take, and stop calling a failing model at all
+        self.call_timeout = float(os.getenv("OLLAMA_CALL_TIMEOUT_SECONDS", "30"))
+        self.request_timeout = float(os.getenv("OLLAMA_REQUEST_TIMEOUT_SECONDS", "60"))
+        self.hedge_after = float(os.getenv("OLLAMA_HEDGE_AFTER_SECONDS", "0"))
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("OLLAMA_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("OLLAMA_BREAKER_RESET_SECONDS", "30"))
+        )
+        self.timeouts = 0
+        
+        # Follow-up calls on a document continue its previous Ollama context, so
+        # the model keeps the instructions in its cache instead of re-reading them
+        self.context_reuse = os.getenv("OLLAMA_CONTEXT_REUSE", "true").lower() in ("1", "true", "yes")
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+        self.context_sessions = ContextSessionStore(
+            max_sessions=int(os.getenv("OLLAMA_CONTEXT_SESSIONS", "500")),
+            max_total_tokens=int(os.getenv("OLLAMA_CONTEXT_MAX_TOKENS", "1000000")),
+            ttl_seconds=float(os.getenv("OLLAMA_CONTEXT_TTL_SECONDS", "600"))
+        )
+        # Paragraph embeddings for semantic search; an empty model name turns them off
+        self.embedding_model = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+        self.embedding_batch_size = int(os.getenv("OLLAMA_EMBEDDING_BATCH_SIZE", "16"))
+        self.texts_embedded = 0
+        
+        self.context_reuses = 0
+        self.context_tokens_reused = 0
+        self.prefix_tokens_saved = 0
+        self.prompt_eval_tokens = 0
+        
+        # Tone requests arriving close together share one model call
+        self.tone_batcher = MicroBatcher(
+            self._analyze_tone_batch,
+            max_batch_size=int(os.getenv("TONE_BATCH_MAX_SIZE", "8")),
+            window_seconds=float(os.getenv("TONE_BATCH_WINDOW_MS", "25")) / 1000,
+            max_batch_weight=self.tone_chunk_chars
+        )
+
     async def initialize(self):
-        """Initialize Ollama client and ensure model is available"""
+        """Connect to the Ollama endpoints and ensure the routed models are available"""
         try:
-            self.client = ollama.AsyncClient(host=self.base_url)
-            self.llm = Ollama(
-                model=self.model_name,
-                base_url=self.base_url,
-                temperature=0.3
+            self.pool = OllamaPool.from_urls(
+                self.base_urls.split(","),
+                health_interval=float(os.getenv("OLLAMA_HEALTH_CHECK_SECONDS", "10")),
+                failure_threshold=int(os.getenv("OLLAMA_EJECT_AFTER_FAILURES", "3")),
+                ejection_seconds=float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))
             )
+            await self.pool.start()
+            models = self.model_router.models()
+            if self.embedding_model:
+                models.add(self.embedding_model)
+            await self.pool.ensure_models(models)
             
-            # Check if model is available
-            models = await self.client.list()
-            model_names = [model['name'] for model in models['models']]
-            
-            if self.model_name not in model_names:
-                print(f"Pulling {self.model_name} model...")
-                await self.client.pull(self.model_name)
-                
-            print(f"Ollama service initialized with model: {self.model_name}")
+            print(f"Ollama service initialized with models {sorted(models)} on {len(self.pool.endpoints)} endpoint(s)")
             
         except Exception as e:
             print(f"Failed to initialize Ollama service: {e}")
             raise
 
-    async def generate_suggestions(self, content: str, writing_goal: str = "professional", language: str = "en-US") -> List[Dict[str, Any]]:
-        """Generate writing suggestions using Llama3"""
+    async def generate_suggestions(
+        self,
+        content: str,
+        writing_goal: str = "professional",
+        language: str = "en-US",
+        document_id: Optional[str] = None,
+        shared_cache: bool = False,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate writing suggestions using Llama3
         
-        prompt_template = PromptTemplate(
-            input_variables=["content", "writing_goal", "language"],
-            template="""
-You are an expert writing assistant. Analyze the following text and provide specific suggestions for improvement.
+        Every chunk of the request goes to the model routed for the whole
+        content, and cached results are keyed by that model. With shared_cache,
+        sentences whose findings are already in the cross-document sentence
+        cache are not sent to the model. Waiting for a model slot and every
+        call must end by deadline (from self.deadline()), or LLMUnavailable is
+        raised; it defaults to request_timeout from now.
+        """
+        deadline = deadline or self.deadline()
+        
+        # Serve repeated requests for identical content from the cache
+        model = self.model_router.resolve("suggestions", len(content))
+        cache_key = SuggestionCache.make_key(content, writing_goal, language, model)
+        cached_suggestions = self.suggestion_cache.get(cache_key)
+        if cached_suggestions is not None:
+            return cached_suggestions
+        
+        try:
+            # Identical requests already in flight share one generation
+            processed_suggestions = await self.single_flight.do(
+                f"suggestions|{document_id or ''}|{int(shared_cache)}|{cache_key}",
+                lambda: self._generate_uncached(content, writing_goal, language, model, document_id, cache_key, shared_cache, deadline)
+            )
+            return copy.deepcopy(processed_suggestions)
+            
+        except Exception as e:
+            error = self._unavailable(e)
+            print(f"Error generating suggestions: {error}")
+            raise error
 
-Text to analyze: "{content}"
-Writing goal: {writing_goal}
-Language: {language}
+    def degraded_suggestions(self, content: str, writing_goal: str = "professional", language: str = "en-US", document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Model suggestions available without calling the model: a cached result, or those of unchanged paragraphs"""
+        model = self.model_router.resolve("suggestions", len(content))
+        cached_suggestions = self.suggestion_cache.get(SuggestionCache.make_key(content, writing_goal, language, model))
+        if cached_suggestions is not None:
+            return cached_suggestions
+        if not document_id:
+            return []
+        
+        state = self.paragraph_state.get(ParagraphStateStore.make_key(document_id, writing_goal, language, model))
+        suggestions = self._merge_paragraph_suggestions(split_paragraphs(content), state)
+        for i, suggestion in enumerate(suggestions):
+            suggestion['id'] = f"suggestion_{i}"
+        return suggestions
 
-Please provide suggestions in the following format for each issue found:
+    def _unavailable(self, error: Exception) -> "LLMUnavailable":
+        if isinstance(error, LLMUnavailable):
+            return error
+        if isinstance(error, CircuitOpen):
+            return LLMUnavailable("AI model is temporarily unavailable", error.retry_after)
+        if isinstance(error, asyncio.TimeoutError):
+            return LLMUnavailable("AI model did not answer in time")
+        return LLMUnavailable(f"AI model request failed: {error}")
 
-Type: [grammar|style|clarity|tone|vocabulary]
-Text: [the problematic text]
-Suggestion: [your suggested replacement]
-Explanation: [brief explanation of why this is better]
-Severity: [error|warning|info]
-Confidence: [percentage from 0-100]
+    def deadline(self) -> float:
+        """A request deadline request_timeout seconds from now, as a time.monotonic() value"""
+        return time.monotonic() + self.request_timeout
 
-Focus on:
-1. Grammar and spelling errors
-2. Style improvements for {writing_goal} writing
-3. Clarity and readability
-4. Tone consistency
-5. Vocabulary enhancement
+    async def _generate_uncached(self, content: str, writing_goal: str, language: str, model: str, document_id: Optional[str], cache_key: str, shared_cache: bool, deadline: float) -> List[Dict[str, Any]]:
+        # Routing is counted once per request that reaches the model
+        self.model_router.model_for("suggestions", len(content))
+        if document_id:
+            processed_suggestions = await self._generate_incremental(content, writing_goal, language, model, document_id, shared_cache, deadline)
+        else:
+            segments = split_segments(content, self.chunk_chars)
+            processed_suggestions = await self._suggest_segments(content, segments, writing_goal, language, model, deadline, shared_cache=shared_cache)
+        
+        for i, suggestion in enumerate(processed_suggestions):
+            suggestion['id'] = f"suggestion_{i}"
+        
+        self.suggestion_cache.set(cache_key, processed_suggestions)
+        return processed_suggestions
 
-Provide up to 10 most important suggestions.
-"""
-        )
+    async def stream_suggestions(
+        self,
+        content: str,
+        writing_goal: str = "professional",
+        language: str = "en-US",
+        document_id: Optional[str] = None,
+        shared_cache: bool = False,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield validated suggestions as soon as the model completes each one, within deadline"""
+        deadline = deadline or self.deadline()
+        model = self.model_router.resolve("suggestions", len(content))
+        cache_key = SuggestionCache.make_key(content, writing_goal, language, model)
+        cached_suggestions = self.suggestion_cache.get(cache_key)
+        if cached_suggestions is not None:
+            for suggestion in cached_suggestions:
+                yield suggestion
+            return
         
-        try:
-            chain = LLMChain(llm=self.llm, prompt=prompt_template)
-            response = await chain.arun(
-                content=content[:2000],  # Limit content length
-                writing_goal=writing_goal,
-                language=language
-            )
+        # Routing is counted once per request that reaches the model
+        self.model_router.model_for("suggestions", len(content))
+        emitted = 0
+        if document_id:
+            state_key = ParagraphStateStore.make_key(document_id, writing_goal, language, model)
+            paragraphs, new_state, changed_paragraphs = self._diff_paragraphs(content, state_key)
+            segments = self._paragraph_segments(content, changed_paragraphs)
             
-            parser = SuggestionOutputParser()
-            suggestions = parser.parse(response)
+            # Suggestions kept from unchanged paragraphs are available right away
+            for suggestion in self._merge_paragraph_suggestions(paragraphs, new_state):
+                suggestion['id'] = f"suggestion_{emitted}"
+                emitted += 1
+                yield suggestion
+        else:
+            segments = split_segments(content, self.chunk_chars)
+        
+        fresh_suggestions = []
+        seen = set()
+        sentences = []
+        if shared_cache:
+            # Findings of sentences seen before, in any document, need no model call
+            cached_findings, sentences = self._cached_sentence_findings(content, segments, writing_goal, language, model)
+            segments = sentences
+            for suggestion in cached_findings:
+                seen.add((suggestion['position']['start'], suggestion['position']['end'], suggestion['suggestion']))
+                fresh_suggestions.append(suggestion)
+                yield dict(suggestion, id=f"suggestion_{emitted}")
+                emitted += 1
+        
+        queue = asyncio.Queue()
+        chunks = plan_chunks(content, segments, self.chunk_chars)
+        tasks = [
+            asyncio.create_task(self._stream_chunk(content, chunk, writing_goal, language, model, deadline, queue, document_id, scope))
+            for chunk, scope in zip(chunks, session_scopes(content, chunks))
+        ]
+        
+        try:
+            remaining = len(tasks)
+            while remaining:
+                suggestion = await queue.get()
+                if suggestion is None:
+                    remaining -= 1
+                    continue
+                
+                key = (suggestion['position']['start'], suggestion['position']['end'], suggestion['suggestion'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                fresh_suggestions.append(suggestion)
+                
+                streamed = dict(suggestion, id=f"suggestion_{emitted}")
+                emitted += 1
+                yield streamed
+        finally:
+            # Stop generating if the consumer goes away early
+            for task in tasks:
+                task.cancel()
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            print(f"Error streaming suggestions: {errors[0]}")
+            raise self._unavailable(errors[0])
+        
+        # Record the completed run exactly like the non-streaming path
+        fresh_suggestions.sort(key=lambda s: (s['position']['start'], s['position']['end']))
+        if shared_cache:
+            self._record_sentence_findings(content, sentences, fresh_suggestions, writing_goal, language, model)
+        if document_id:
+            self._record_paragraph_suggestions(new_state, changed_paragraphs, fresh_suggestions)
+            self.paragraph_state.set(state_key, new_state)
+            final_suggestions = self._merge_paragraph_suggestions(paragraphs, new_state)
+        else:
+            final_suggestions = fresh_suggestions
+        
+        for i, suggestion in enumerate(final_suggestions):
+            suggestion['id'] = f"suggestion_{i}"
+        self.suggestion_cache.set(cache_key, final_suggestions)
+
+    async def _stream_chunk(self, content: str, chunk: Chunk, writing_goal: str, language: str, model: str, deadline: float, queue: asyncio.Queue, document_id: Optional[str] = None, scope: str = ""):
+        """Stream one chunk's completion, queueing each suggestion once it is complete"""
+        try:
+            prompt, session_key, session = self._suggestion_prompt(chunk.text, writing_goal, language, model, document_id, scope)
+            parser = JsonSuggestionStreamParser()
+            spans = chunk.document_spans()
+            resolver = PositionResolver(content, scope=(spans[0][0], spans[-1][1]))
+            index = 0
             
-            # Process and validate suggestions
-            processed_suggestions = []
-            for i, suggestion in enumerate(suggestions):
-                if self._validate_suggestion(suggestion, content):
-                    processed_suggestions.append(self._format_suggestion(suggestion, content, i))
+            async with self._model_slot(deadline):
+                stream = await self._generate(prompt, model=model, format='json', stream=True, session=session, deadline=deadline)
+                async for part in stream:
+                    if part.get('done'):
+                        self._remember_context(session_key, part)
+                    for suggestion in self._locate_batch(self._validate_batch(parser.feed(part.get('response', ''))), chunk, resolver, index):
+                        index += 1
+                        queue.put_nowait(suggestion)
             
-            return processed_suggestions
+            for suggestion in self._locate_batch(self._validate_batch(parser.close()), chunk, resolver, index):
+                queue.put_nowait(suggestion)
             
+            self.prompt_chars_sent += len(chunk.text)
+        finally:
+            queue.put_nowait(None)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.stop()
+
+    async def _generate(
+        self,
+        prompt: str,
+        task: str = "suggestions",
+        text_length: Optional[int] = None,
+        format: str = '',
+        stream: bool = False,
+        model: Optional[str] = None,
+        session: Optional[ContextSession] = None,
+        deadline: Optional[float] = None
+    ):
+        """Call the Ollama generate API on the pool with the task's model and the service's options
+        
+        Each call must finish within call_timeout seconds (for streams, the
+        whole stream) and by the request deadline, if given, and is refused
+        outright while the circuit breaker is open. Only calls that outlast
+        call_timeout count as failures of the model. A context session's tokens
+        are passed as context, preferably to the endpoint that produced them.
+        """
+        self.circuit_breaker.check()
+        model = model or self.model_router.model_for(task, text_length)
+        kwargs = {
+            'prompt': prompt,
+            'format': format,
+            'options': {'temperature': 0.3, 'num_ctx': self.num_ctx},
+            'prefer': session.endpoint if session is not None else None
+        }
+        if self.keep_alive:
+            kwargs['keep_alive'] = self.keep_alive
+        if session is not None:
+            kwargs['context'] = session.context()
+        
+        call_deadline = time.monotonic() + self.call_timeout
+        if deadline is not None:
+            call_deadline = min(call_deadline, deadline)
+        if stream:
+            return self._guarded_stream(model, kwargs, call_deadline, call_deadline == deadline)
+        
+        try:
+            if self.hedge_after > 0:
+                call = self.pool.hedged_generate(model, self.hedge_after, **kwargs)
+            else:
+                call = self.pool.generate(model, **kwargs)
+            response = await asyncio.wait_for(call, max(0.0, call_deadline - time.monotonic()))
         except Exception as e:
-            print(f"Error generating suggestions: {e}")
-            return []
+            self._record_call_failure(e, call_deadline == deadline)
+            raise
+        
+        self.circuit_breaker.record_success()
+        self.prompt_eval_tokens += response.get('prompt_eval_count') or 0
+        return response
+
+    async def _guarded_stream(self, model: str, kwargs: Dict[str, Any], deadline: float, request_bound: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            stream = await asyncio.wait_for(self.pool.generate(model, stream=True, **kwargs), max(0.0, deadline - time.monotonic()))
+            parts = stream.__aiter__()
+            while True:
+                try:
+                    part = await asyncio.wait_for(parts.__anext__(), max(0.0, deadline - time.monotonic()))
+                except StopAsyncIteration:
+                    break
+                if part.get('done'):
+                    self.prompt_eval_tokens += part.get('prompt_eval_count') or 0
+                yield part
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self._record_call_failure(e, request_bound)
+            raise
+        
+        self.circuit_breaker.record_success()
+
+    def _suggestion_prompt(self, text: str, writing_goal: str, language: str, model: str, document_id: Optional[str], scope: str = "") -> Tuple[str, Optional[str], Optional[ContextSession]]:
+        """Prompt, session key and session for one chunk of a document
+        
+        Each chunk continues the session of its scope (see session_scopes), so
+        the chunks of one request never share a session. The session is
+        continued with the short follow-up prompt while the window still holds
+        its tokens, the follow-up and SUGGESTION_ANSWER_TOKENS of answer;
+        otherwise a fresh session starts with the full prompt.
+        """
+        full_prompt = SUGGESTION_PROMPT.format(content=text, writing_goal=writing_goal, language=language)
+        if not document_id or not self.context_reuse:
+            return full_prompt, None, None
+        
+        session_key = ContextSessionStore.make_key(document_id, writing_goal, language, model, scope)
+        session = self.context_sessions.get(session_key)
+        if session is None:
+            return full_prompt, session_key, None
+        
+        follow_up = SUGGESTION_FOLLOW_UP_PROMPT.format(content=text, writing_goal=writing_goal, language=language)
+        if len(session.tokens) + len(follow_up) // CHARS_PER_TOKEN + SUGGESTION_ANSWER_TOKENS > self.num_ctx:
+            self.context_sessions.discard(session_key)
+            return full_prompt, session_key, None
+        
+        self.context_reuses += 1
+        self.context_tokens_reused += len(session.tokens)
+        self.prefix_tokens_saved += (len(full_prompt) - len(follow_up)) // CHARS_PER_TOKEN
+        return follow_up, session_key, session
+
+    def _remember_context(self, session_key: Optional[str], response: Dict[str, Any]):
+        if session_key is not None:
+            self.context_sessions.set(session_key, response.get('context'), response.get('endpoint'))
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the embedding model, sending embedding_batch_size requests at a time
+        
+        Raises LLMUnavailable if embeddings are turned off, the circuit breaker
+        is open, or any request fails or outlasts call_timeout. Failures count
+        towards the breaker like those of generate calls.
+        """
+        if not self.embedding_model:
+            raise LLMUnavailable("Embeddings are disabled")
+        
+        vectors = []
+        for start in range(0, len(texts), self.embedding_batch_size):
+            batch = texts[start:start + self.embedding_batch_size]
+            try:
+                self.circuit_breaker.check()
+            except CircuitOpen as e:
+                raise self._unavailable(e)
+            try:
+                vectors.extend(await asyncio.wait_for(
+                    asyncio.gather(*[
+                        self.pool.embeddings(self.embedding_model, text, keep_alive=self.keep_alive or None)
+                        for text in batch
+                    ]),
+                    self.call_timeout
+                ))
+            except Exception as e:
+                self._record_call_failure(e)
+                raise self._unavailable(e)
+            self.circuit_breaker.record_success()
+            self.texts_embedded += len(batch)
+        return vectors
+
+    def _record_call_failure(self, error: Exception, request_bound: bool = False):
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+            if request_bound:
+                # The request ran out of time, possibly while queued; the model did not fail
+                return
+        self.circuit_breaker.record_failure()
+
+    @asynccontextmanager
+    async def _model_slot(self, deadline: Optional[float] = None):
+        """Hold llm_semaphore, waiting for it no later than deadline"""
+        if deadline is None:
+            await self.llm_semaphore.acquire()
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.wait_for(self.llm_semaphore.acquire(), remaining)
+        try:
+            yield
+        finally:
+            self.llm_semaphore.release()
+
+    async def _suggest_segments(
+        self,
+        content: str,
+        segments: List[Tuple[int, int]],
+        writing_goal: str,
+        language: str,
+        model: str,
+        deadline: float,
+        document_id: Optional[str] = None,
+        shared_cache: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Run the suggestion prompt over content segments concurrently and merge the results"""
+        cached_findings = []
+        if shared_cache:
+            cached_findings, segments = self._cached_sentence_findings(content, segments, writing_goal, language, model)
+        
+        chunks = plan_chunks(content, segments, self.chunk_chars)
+        chunk_results = await asyncio.gather(*[
+            self._suggest_chunk(chunk, writing_goal, language, model, deadline, document_id, scope)
+            for chunk, scope in zip(chunks, session_scopes(content, chunks))
+        ])
+        
+        # Index every suggested text in one pass over the document
+        resolver = PositionResolver(content)
+        resolver.index(suggestion.text for result in chunk_results for suggestion in result)
+        
+        # Merge in document order, dropping suggestions reported twice for the same span
+        located = []
+        for chunk, result in zip(chunks, chunk_results):
+            located.extend(self._locate_batch(result, chunk, resolver, len(located)))
+        if shared_cache:
+            self._record_sentence_findings(content, segments, located, writing_goal, language, model)
+            located.extend(cached_findings)
+        
+        merged_suggestions = []
+        seen = set()
+        for suggestion in sorted(located, key=lambda s: (s['position']['start'], s['position']['end'])):
+            key = (suggestion['position']['start'], suggestion['position']['end'], suggestion['suggestion'])
+            if key not in seen:
+                seen.add(key)
+                merged_suggestions.append(suggestion)
+        
+        return merged_suggestions
 
-    def _validate_suggestion(self, suggestion: Dict[str, Any], content: str) -> bool:
-        """Validate that suggestion has required fields and text exists in content"""
-        required_fields = ['type', 'text', 'suggestion', 'explanation']
+    def _cached_sentence_findings(self, content: str, segments: List[Tuple[int, int]], writing_goal: str, language: str, model: str) -> Tuple[List[Dict[str, Any]], List[Tuple[int, int]]]:
+        """Cached findings of the segments' sentences at their offsets here, and the sentences still to analyze"""
+        findings = []
+        misses = []
+        for segment_start, segment_end in segments:
+            for start, end in split_sentences(content, segment_start, segment_end):
+                cached = self.sentence_cache.get(SuggestionCache.make_key(content[start:end], writing_goal, language, model))
+                if cached is None:
+                    misses.append((start, end))
+                    continue
+                findings.extend(shift_suggestion(finding, start) for finding in cached)
+                self.sentences_reused += 1
+        return findings, misses
+
+    def _record_sentence_findings(self, content: str, sentences: List[Tuple[int, int]], suggestions: List[Dict[str, Any]], writing_goal: str, language: str, model: str):
+        """Cache fresh suggestions under the sentence they fall in, relative to the sentence start
+        
+        Sentences touched by a suggestion that spans more than one sentence are
+        not cached, since a hit would come back without that suggestion.
+        """
+        starts = [start for start, _ in sentences]
+        findings = {index: [] for index in range(len(sentences))}
+        for suggestion in suggestions:
+            position = suggestion['position']
+            index = bisect.bisect_right(starts, position['start']) - 1
+            if index >= 0 and position['end'] <= sentences[index][1]:
+                if index in findings:
+                    findings[index].append(shift_suggestion(suggestion, -sentences[index][0]))
+                continue
+            for other, (start, end) in enumerate(sentences):
+                if start < position['end'] and position['start'] < end:
+                    findings.pop(other, None)
+        
+        for index, sentence_findings in findings.items():
+            start, end = sentences[index]
+            self.sentence_cache.set(SuggestionCache.make_key(content[start:end], writing_goal, language, model), sentence_findings)
+        self.sentences_analyzed += len(sentences)
+
+    async def _suggest_chunk(self, chunk: Chunk, writing_goal: str, language: str, model: str, deadline: float, document_id: Optional[str] = None, scope: str = "") -> List[LLMSuggestion]:
+        """Generate and validate suggestions for one chunk"""
+        prompt, session_key, session = self._suggestion_prompt(chunk.text, writing_goal, language, model, document_id, scope)
+        async with self._model_slot(deadline):
+            response = await self._generate(prompt, model=model, format='json', session=session, deadline=deadline)
+        self._remember_context(session_key, response)
+        self.prompt_chars_sent += len(chunk.text)
         
-        for field in required_fields:
-            if field not in suggestion or not suggestion[field]:
-                return False
+        parser = JsonSuggestionStreamParser()
+        return self._validate_batch(parser.feed(response.get('response', '')) + parser.close())
+
+    def _validate_batch(self, raw_suggestions: List[Dict[str, Any]]) -> List[LLMSuggestion]:
+        validated_suggestions = []
+        for raw_suggestion in raw_suggestions:
+            validated = self._validate_suggestion(raw_suggestion)
+            if validated is None:
+                self.suggestions_rejected += 1
+            else:
+                validated_suggestions.append(validated)
+        return validated_suggestions
+
+    def _locate_batch(self, suggestions: List[LLMSuggestion], chunk: Chunk, resolver: PositionResolver, start_index: int) -> List[Dict[str, Any]]:
+        """Position suggestions at the document occurrence nearest the chunk they came from"""
+        resolver.index(suggestion.text for suggestion in suggestions)
+        anchors = chunk.document_spans()
         
-        # Check if the suggested text exists in content
-        if suggestion['text'] not in content:
-            return False
+        located = []
+        for suggestion in suggestions:
+            span = resolver.resolve(suggestion.text, anchors)
+            if span is None:
+                self.suggestions_rejected += 1
+                continue
             
-        return True
+            self.suggestions_accepted += 1
+            located.append(self._format_suggestion(suggestion, span, start_index + len(located)))
+        
+        return located
+
+    async def _generate_incremental(self, content: str, writing_goal: str, language: str, model: str, document_id: str, shared_cache: bool, deadline: float) -> List[Dict[str, Any]]:
+        """Re-run the model only on paragraphs that changed since the last run for this document"""
+        state_key = ParagraphStateStore.make_key(document_id, writing_goal, language, model)
+        paragraphs, new_state, changed_paragraphs = self._diff_paragraphs(content, state_key)
+        
+        if changed_paragraphs:
+            segments = self._paragraph_segments(content, changed_paragraphs)
+            suggestions = await self._suggest_segments(content, segments, writing_goal, language, model, deadline, document_id, shared_cache)
+            self._record_paragraph_suggestions(new_state, changed_paragraphs, suggestions)
+        
+        self.paragraph_state.set(state_key, new_state)
+        return self._merge_paragraph_suggestions(paragraphs, new_state)
 
-    def _format_suggestion(self, suggestion: Dict[str, Any], content: str, index: int) -> Dict[str, Any]:
+    def _diff_paragraphs(self, content: str, state_key: str) -> Tuple[List[Paragraph], Dict[str, List[Dict[str, Any]]], List[Paragraph]]:
+        """Split content into paragraphs and separate unchanged ones from those needing analysis"""
+        previous_state = self.paragraph_state.get(state_key)
+        paragraphs = split_paragraphs(content)
+        
+        new_state = {}
+        changed_paragraphs = []
+        seen_hashes = set()
+        for paragraph in paragraphs:
+            # Repeated paragraphs share one analysis
+            if paragraph.hash in seen_hashes:
+                continue
+            seen_hashes.add(paragraph.hash)
+            
+            if paragraph.hash in previous_state:
+                new_state[paragraph.hash] = previous_state[paragraph.hash]
+                self.paragraphs_reused += 1
+            else:
+                changed_paragraphs.append(paragraph)
+        
+        return paragraphs, new_state, changed_paragraphs
+
+    def _paragraph_segments(self, content: str, paragraphs: List[Paragraph]) -> List[Tuple[int, int]]:
+        segments = []
+        for paragraph in paragraphs:
+            segments.extend(split_segments(content, self.chunk_chars, paragraph.start, paragraph.end))
+        return segments
+
+    def _record_paragraph_suggestions(self, new_state: Dict[str, List[Dict[str, Any]]], changed_paragraphs: List[Paragraph], suggestions: List[Dict[str, Any]]):
+        """Attribute fresh suggestions to their paragraph, relative to the paragraph start"""
+        for paragraph in changed_paragraphs:
+            new_state[paragraph.hash] = []
+        
+        for suggestion in suggestions:
+            position = suggestion['position']
+            for paragraph in changed_paragraphs:
+                if paragraph.start <= position['start'] and position['end'] <= paragraph.end:
+                    new_state[paragraph.hash].append(shift_suggestion(suggestion, -paragraph.start))
+                    break
+        
+        self.paragraphs_analyzed += len(changed_paragraphs)
+
+    def _merge_paragraph_suggestions(self, paragraphs: List[Paragraph], state: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Place recorded paragraph suggestions at the paragraphs' current document offsets"""
+        merged_suggestions = []
+        for paragraph in paragraphs:
+            for suggestion in state.get(paragraph.hash, []):
+                merged_suggestions.append(shift_suggestion(suggestion, paragraph.start))
+        return merged_suggestions
+
+    def _validate_suggestion(self, suggestion: Dict[str, Any]) -> Optional[LLMSuggestion]:
+        """Check a raw suggestion against the output schema"""
+        try:
+            return LLMSuggestion(**suggestion)
+        except (ValidationError, TypeError):
+            return None
+
+    def _format_suggestion(self, suggestion: LLMSuggestion, span: Tuple[int, int], index: int) -> Dict[str, Any]:
         """Format suggestion with proper types and position"""
-        text = suggestion['text']
-        start_pos = content.find(text)
-        end_pos = start_pos + len(text) if start_pos != -1 else 0
+        start_pos, end_pos = span
         
         return {
             'id': f"suggestion_{index}",
-            'type': suggestion.get('type', 'style'),
-            'text': text,
-            'suggestion': suggestion['suggestion'],
-            'explanation': suggestion['explanation'],
+            'type': suggestion.type.value,
+            'text': suggestion.text,
+            'suggestion': suggestion.suggestion,
+            'explanation': suggestion.explanation,
             'position': {'start': start_pos, 'end': end_pos},
-            'severity': suggestion.get('severity', 'info'),
-            'confidence': suggestion.get('confidence', 80.0)
+            'severity': suggestion.severity.value,
+            'confidence': suggestion.confidence
         }
 
-    async def analyze_tone(self, content: str) -> Dict[str, float]:
-        """Analyze the tone of the text"""
+    async def analyze_tone(self, content: str, deadline: Optional[float] = None) -> Dict[str, float]:
+        """Analyze the tone of the text, within deadline (request_timeout from now by default)"""
+        deadline = deadline or self.deadline()
+        tone_key = self._tone_key(content)
+        tone_scores = await self.single_flight.do(
+            f"tone|{tone_key}",
+            lambda: self._analyze_tone_uncached(content, deadline)
+        )
+        self.tone_cache.set(tone_key, tone_scores)
+        return dict(tone_scores)
+
+    def degraded_tone(self, content: str) -> Dict[str, float]:
+        """Tone scores available without the model: the cached result for this content, or neutral defaults"""
+        cached_scores = self.tone_cache.get(self._tone_key(content))
+        return cached_scores if cached_scores is not None else dict(DEFAULT_TONE)
+
+    def _tone_key(self, content: str) -> str:
+        """Tone results are keyed by the content and the model tone analysis is routed to"""
+        return f"{self.model_router.resolve('tone')}|{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+    async def _analyze_tone_uncached(self, content: str, deadline: float) -> Dict[str, float]:
+        segments = split_segments(content, self.tone_chunk_chars)
+        chunks = plan_chunks(content, segments, self.tone_chunk_chars)
+        
+        results = await asyncio.gather(
+            *[self._analyze_tone_chunk(chunk.text, deadline) for chunk in chunks],
+            return_exceptions=True
+        )
+        
+        # Combine chunk scores weighted by chunk length
+        totals = {}
+        weights = {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                print(f"Error analyzing tone: {result}")
+                continue
+            for key, value in result.items():
+                totals[key] = totals.get(key, 0.0) + value * len(chunk.text)
+                weights[key] = weights.get(key, 0) + len(chunk.text)
+        
+        if not totals:
+            errors = [result for result in results if isinstance(result, Exception)]
+            raise self._unavailable(errors[0]) if errors else LLMUnavailable("No tone scores returned")
+        
+        return {key: round(totals[key] / weights[key], 1) for key in totals}
+
+    async def _analyze_tone_chunk(self, text: str, deadline: float) -> Dict[str, float]:
+        """Score the tone of a single chunk of text, batched with concurrent requests
+        
+        The caller stops waiting at its own deadline; the batch it joined runs
+        until the latest deadline of its texts.
+        """
+        return await asyncio.wait_for(
+            self.tone_batcher.submit((text, deadline), weight=len(text)),
+            max(0.0, deadline - time.monotonic())
+        )
+
+    async def _analyze_tone_batch(self, items: List[Tuple[str, float]]) -> List[Any]:
+        """Score several texts with one structured prompt and split the scores per text"""
+        texts = [text for text, _ in items]
+        deadline = max(deadline for _, deadline in items)
+        numbered_texts = "\n\n".join(f'[{i}] "{text}"' for i, text in enumerate(texts, 1))
         prompt = f"""
-Analyze the tone of the following text and provide scores (0-100) for each aspect:
+Analyze the tone of each of the following numbered texts and provide scores (0-100) for each aspect:
 
-Text: "{content[:1000]}"
+{numbered_texts}
 
 Provide scores for:
 - Formal (how formal vs casual)
@@ -179,50 +959,74 @@ Provide scores for:
 - Optimistic (how positive vs negative)
 - Analytical (how analytical vs emotional)
 
-Format as: Formal: 75, Confident: 80, Optimistic: 65, Analytical: 90
+Answer with exactly one line per text, in order, formatted as:
+1: Formal: 75, Confident: 80, Optimistic: 65, Analytical: 90
 """
         
-        try:
-            response = await self.llm.agenerate([prompt])
-            result = response.generations[0][0].text
-            
-            # Parse tone scores
-            tone_scores = {}
-            for line in result.split(','):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    try:
-                        tone_scores[key.strip().lower()] = float(value.strip())
-                    except:
-                        pass
-            
-            return tone_scores
-            
-        except Exception as e:
-            print(f"Error analyzing tone: {e}")
-            return {'formal': 75, 'confident': 80, 'optimistic': 65, 'analytical': 90}
-
-    async def check_plagiarism(self, content: str) -> float:
-        """Basic plagiarism check (placeholder - would integrate with real service)"""
-        # This is a placeholder - in production, you'd integrate with a real plagiarism detection service
-        # For now, return a mock score based on content uniqueness
-        
-        common_phrases = [
-            "the quick brown fox",
-            "lorem ipsum",
-            "to be or not to be",
-            "it was the best of times"
-        ]
+        async with self._model_slot(deadline):
+            response = await self._generate(prompt, task="tone", deadline=deadline)
+        result = response.get('response', '')
         
-        plagiarism_score = 0.0
-        for phrase in common_phrases:
-            if phrase.lower() in content.lower():
-                plagiarism_score += 10.0
-        
-        return min(plagiarism_score, 100.0)
+        return [
+            tone_scores or ValueError(f"No tone scores returned for text {i}")
+            for i, tone_scores in enumerate(parse_tone_scores(result, len(texts)), 1)
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Runtime counters for monitoring"""
+        return {
+            "model": self.model_name,
+            "models": self.model_router.stats(),
+            "pool": self.pool.stats() if self.pool is not None else None,
+            "suggestion_cache": self.suggestion_cache.stats(),
+            "incremental": {
+                **self.paragraph_state.stats(),
+                "paragraphs_analyzed": self.paragraphs_analyzed,
+                "paragraphs_reused": self.paragraphs_reused,
+                "prompt_chars_sent": self.prompt_chars_sent
+            },
+            "structured_output": {
+                "suggestions_accepted": self.suggestions_accepted,
+                "suggestions_rejected": self.suggestions_rejected
+            },
+            "single_flight": self.single_flight.stats(),
+            "resilience": {
+                "call_timeout_seconds": self.call_timeout,
+                "request_timeout_seconds": self.request_timeout,
+                "hedge_after_seconds": self.hedge_after,
+                "timeouts": self.timeouts,
+                "circuit_breaker": self.circuit_breaker.stats()
+            },
+            "context_reuse": {
+                **self.context_sessions.stats(),
+                "enabled": self.context_reuse,
+                "keep_alive": self.keep_alive,
+                "reuses": self.context_reuses,
+                "context_tokens_reused": self.context_tokens_reused,
+                "prefix_tokens_saved": self.prefix_tokens_saved,
+                "prompt_eval_tokens": self.prompt_eval_tokens
+            },
+            "embeddings": {
+                "model": self.embedding_model or None,
+                "batch_size": self.embedding_batch_size,
+                "texts_embedded": self.texts_embedded
+            },
+            "sentence_cache": {
+                **self.sentence_cache.stats(),
+                "sentences_reused": self.sentences_reused,
+                "sentences_analyzed": self.sentences_analyzed
+            },
+            "tone_batching": self.tone_batcher.stats(),
+            "chunking": {
+                "num_ctx": self.num_ctx,
+                "suggestion_chunk_chars": self.chunk_chars,
+                "tone_chunk_chars": self.tone_chunk_chars
+            }
+        }
 
-    async def improve_vocabulary(self, text: str, target_level: str = "advanced") -> str:
-        """Suggest vocabulary improvements"""
+    async def improve_vocabulary(self, text: str, target_level: str = "advanced", deadline: Optional[float] = None) -> str:
+        """Suggest vocabulary improvements, within deadline (request_timeout from now by default)"""
+        deadline = deadline or self.deadline()
         prompt = f"""
 Improve the vocabulary in the following text to make it more {target_level}:
 
@@ -232,8 +1036,10 @@ Provide an improved version with more sophisticated vocabulary while maintaining
 """
         
         try:
-            response = await self.llm.agenerate([prompt])
-            return response.generations[0][0].text.strip()
+            async with self._model_slot(deadline):
+                response = await self._generate(prompt, task="vocabulary", text_length=len(text), deadline=deadline)
+            return response.get('response', '').strip()
         except Exception as e:
-            print(f"Error improving vocabulary: {e}")
-            return text
\ No newline at end of file
+            error = self._unavailable(e)
+            print(f"Error improving vocabulary: {error}")
+            raise error
\ No newline at end of file
@@ -0,0 +1,83 @@
+import copy
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+class Paragraph(NamedTuple):
+    start: int
+    end: int
+    text: str
+    hash: str
+
+def split_paragraphs(content: str) -> List[Paragraph]:
+    """Split content on blank lines, keeping each paragraph's offsets"""
+    paragraphs = []
+    position = 0
+    
+    for match in PARAGRAPH_BREAK.finditer(content):
+        _append_paragraph(paragraphs, content, position, match.start())
+        position = match.end()
+    
+    _append_paragraph(paragraphs, content, position, len(content))
+    return paragraphs
+
+def _append_paragraph(paragraphs: List[Paragraph], content: str, start: int, end: int):
+    text = content[start:end]
+    stripped = text.strip()
+    if not stripped:
+        return
+    
+    # Trim surrounding whitespace so offsets point at the paragraph text itself
+    start += len(text) - len(text.lstrip())
+    end = start + len(stripped)
+    paragraph_hash = hashlib.sha256(stripped.encode("utf-8")).hexdigest()
+    paragraphs.append(Paragraph(start, end, stripped, paragraph_hash))
+
+def shift_suggestion(suggestion: Dict[str, Any], offset: int) -> Dict[str, Any]:
+    """Return a copy of a suggestion with its position moved by offset"""
+    shifted = copy.deepcopy(suggestion)
+    shifted['position'] = {
+        'start': suggestion['position']['start'] + offset,
+        'end': suggestion['position']['end'] + offset
+    }
+    return shifted
+
+class ParagraphStateStore:
+    """Per-document record of paragraph hashes and their suggestions from the last run"""
+
+    def __init__(self, max_documents: int = 1000):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, Dict[str, List[Dict[str, Any]]]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(document_id: str, writing_goal: str, language: str, model_name: str) -> str:
+        return f"{document_id}|{model_name}|{writing_goal}|{language}"
+
+    def get(self, key: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Return paragraph hash -> suggestions (positions relative to the paragraph)"""
+        state = self._documents.get(key)
+        if state is None:
+            return {}
+        
+        self._documents.move_to_end(key)
+        return state
+
+    def set(self, key: str, state: Dict[str, List[Dict[str, Any]]]):
+        if self.max_documents <= 0:
+            return
+        
+        self._documents[key] = state
+        self._documents.move_to_end(key)
+        
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._documents),
+            "max_documents": self.max_documents,
+            "paragraphs": sum(len(state) for state in self._documents.values())
+        }
\ No newline at end of file
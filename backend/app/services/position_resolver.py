@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+class PhraseMatcher:
+    """Aho-Corasick automaton that finds every occurrence of a set of phrases in one scan"""
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Phrases ending at each state, including those reached through fail links
+        self._output: List[List[str]] = [[]]
+        
+        for phrase in set(phrases):
+            if phrase:
+                self._add(phrase)
+        self._link()
+
+    def _add(self, phrase: str):
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(phrase)
+
+    def _link(self):
+        """Build fail links breadth-first so each state falls back to its longest proper suffix"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def scan(self, text: str, start: int = 0, end: Optional[int] = None) -> Dict[str, List[int]]:
+        """Return the start offsets of every phrase occurrence within text[start:end]"""
+        end = len(text) if end is None else end
+        occurrences: Dict[str, List[int]] = {}
+        state = 0
+        
+        for position in range(start, end):
+            char = text[position]
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            
+            for phrase in self._output[state]:
+                occurrences.setdefault(phrase, []).append(position + 1 - len(phrase))
+        
+        return occurrences
+
+def span_distance(start: int, end: int, anchors: List[Tuple[int, int]]) -> int:
+    """Characters between a span and the nearest anchor span (0 when they touch or overlap)"""
+    distance = None
+    for anchor_start, anchor_end in anchors:
+        if end <= anchor_start:
+            gap = anchor_start - end
+        elif start >= anchor_end:
+            gap = start - anchor_end
+        else:
+            gap = 0
+        distance = gap if distance is None else min(distance, gap)
+    return distance or 0
+
+class PositionResolver:
+    """Resolve suggestion texts to document offsets, preferring occurrences near their source"""
+
+    def __init__(self, content: str, scope: Optional[Tuple[int, int]] = None):
+        self.content = content
+        # Phrases are looked for in scope first and only searched across the whole document if missing there
+        self.scope = scope
+        self._occurrences: Dict[str, List[int]] = {}
+        self._claimed: Dict[str, Set[int]] = {}
+
+    def index(self, phrases: Iterable[str]):
+        """Find all occurrences of the phrases not indexed yet with a single scan"""
+        pending = {phrase for phrase in phrases if phrase and phrase not in self._occurrences}
+        if not pending:
+            return
+        
+        if self.scope is not None:
+            found = PhraseMatcher(pending).scan(self.content, *self.scope)
+            self._occurrences.update({phrase: found.get(phrase, []) for phrase in pending})
+            pending = {phrase for phrase in pending if not self._occurrences[phrase]}
+            if not pending:
+                return
+        
+        found = PhraseMatcher(pending).scan(self.content)
+        self._occurrences.update({phrase: found.get(phrase, []) for phrase in pending})
+
+    def resolve(self, phrase: str, anchors: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """Pick the occurrence of phrase closest to the anchor spans, or None if it does not occur"""
+        self.index([phrase])
+        occurrences = self._occurrences.get(phrase)
+        if not occurrences:
+            return None
+        
+        # Repeated suggestions for the same phrase take successive occurrences
+        # instead of all pointing at the first one
+        claimed = self._claimed.setdefault(phrase, set())
+        best = None
+        best_key = None
+        for start in occurrences:
+            key = (start in claimed, span_distance(start, start + len(phrase), anchors), start)
+            if best_key is None or key < best_key:
+                best, best_key = start, key
+        
+        claimed.add(best)
+        return best, best + len(phrase)
\ No newline at end of file
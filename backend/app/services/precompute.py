@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from databases import Database
+
+from app.services.job_queue import JobQueue, JobQueueFull
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class PrecomputeStore:
+    """Results computed ahead of time, keyed by document id, version and kind"""
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, document_id: str, version: int, kind: str) -> Optional[Dict[str, Any]]:
+        row = await self.database.fetch_one(
+            """
+            SELECT result FROM precomputed_results
+            WHERE document_id = :document_id AND version = :version AND kind = :kind
+            """,
+            {"document_id": document_id, "version": version, "kind": kind}
+        )
+        if row is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return json.loads(row["result"])
+
+    async def set(self, document_id: str, version: int, kind: str, result: Dict[str, Any]):
+        # Results for older versions of the document are no longer useful
+        await self.database.execute(
+            "DELETE FROM precomputed_results WHERE document_id = :document_id AND kind = :kind AND version <= :version",
+            {"document_id": document_id, "kind": kind, "version": version}
+        )
+        await self.database.execute(
+            """
+            INSERT INTO precomputed_results (document_id, version, kind, result, created_at)
+            VALUES (:document_id, :version, :kind, :result, :created_at)
+            """,
+            {
+                "document_id": document_id,
+                "version": version,
+                "kind": kind,
+                "result": json.dumps(result, default=str),
+                "created_at": datetime.utcnow()
+            }
+        )
+
+    async def delete(self, document_id: str):
+        await self.database.execute(
+            "DELETE FROM precomputed_results WHERE document_id = :document_id",
+            {"document_id": document_id}
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+class DocumentPrecomputer:
+    """Queue a precompute job once a document has stopped changing for debounce_seconds"""
+
+    def __init__(self, job_queue: JobQueue, job_type: str, enabled: bool = False, debounce_seconds: float = 5.0):
+        self.job_queue = job_queue
+        self.job_type = job_type
+        self.enabled = enabled
+        self.debounce_seconds = debounce_seconds
+        
+        self._timers: Dict[str, asyncio.Task] = {}
+        self.scheduled = 0
+        self.debounced = 0
+        self.queued = 0
+
+    def schedule(self, document_id: str, user_id: str, version: int):
+        """(Re)start the document's debounce timer; only the last version saved is computed"""
+        if not self.enabled:
+            return
+        
+        previous = self._timers.pop(document_id, None)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.debounced += 1
+        
+        self.scheduled += 1
+        self._timers[document_id] = asyncio.create_task(self._queue_after_delay(document_id, user_id, version))
+
+    def cancel(self, document_id: str):
+        timer = self._timers.pop(document_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    async def stop(self):
+        timers = list(self._timers.values())
+        self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        await asyncio.gather(*timers, return_exceptions=True)
+
+    async def _queue_after_delay(self, document_id: str, user_id: str, version: int):
+        await asyncio.sleep(self.debounce_seconds)
+        if self._timers.get(document_id) is asyncio.current_task():
+            del self._timers[document_id]
+        
+        try:
+            await self.job_queue.enqueue(self.job_type, user_id, {"document_id": document_id, "version": version})
+            self.queued += 1
+        except JobQueueFull:
+            # Precomputing is an optimisation; the panels still compute on demand
+            print(f"Skipped precompute for document {document_id}: job queue is full")
+        except Exception as e:
+            print(f"Failed to queue precompute for document {document_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "debounce_seconds": self.debounce_seconds,
+            "pending": len(self._timers),
+            "scheduled": self.scheduled,
+            "debounced": self.debounced,
+            "queued": self.queued
+        }
\ No newline at end of file
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional, TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+class RequestCancelled(Exception):
+    """The request's result will not be used, so its work was cancelled"""
+
+class RequestSuperseded(RequestCancelled):
+    """A newer request for the same key took over"""
+
+class ClientDisconnected(RequestCancelled):
+    """The client went away before the result was ready"""
+
+class _Claim:
+    def __init__(self, key: str):
+        self.key = key
+        self.superseded = asyncio.Event()
+
+class LatestRequestTracker:
+    """Cancel request work when its client disconnects or a newer request for the same key starts
+    
+    Keys name what a request computes, such as one user's suggestions for
+    one document. Only the latest request per key is allowed to finish; the
+    work of earlier ones, including any model call, is cancelled.
+    """
+
+    def __init__(self):
+        self._claims: Dict[str, _Claim] = {}
+        self.superseded = 0
+        self.disconnected = 0
+
+    async def run(self, work: Awaitable[T], request: Request, key: Optional[str] = None) -> T:
+        """Await work unless the client disconnects or the key is claimed again first"""
+        claim = self._claim(key) if key else None
+        task = asyncio.ensure_future(work)
+        watchers = [asyncio.ensure_future(self._wait_for_disconnect(request))]
+        if claim is not None:
+            watchers.append(asyncio.ensure_future(claim.superseded.wait()))
+        
+        try:
+            await asyncio.wait([task, *watchers], return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                return task.result()
+            if claim is not None and claim.superseded.is_set():
+                self.superseded += 1
+                raise RequestSuperseded(f"Superseded by a newer request for {key}")
+            self.disconnected += 1
+            raise ClientDisconnected("Client disconnected")
+        finally:
+            # Wait for cancelled work to unwind so its scheduler slot is free again
+            pending = [future for future in (task, *watchers) if not future.done()]
+            for future in pending:
+                future.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if claim is not None:
+                self._release(claim)
+
+    async def iterate(self, items: AsyncIterator[T], key: str) -> AsyncIterator[T]:
+        """Yield from items until a newer request claims key, then raise RequestSuperseded
+        
+        Client disconnects need no watcher here: the streaming response
+        cancels its generator when the client goes away.
+        """
+        claim = self._claim(key)
+        superseded = asyncio.ensure_future(claim.superseded.wait())
+        step = None
+        try:
+            while True:
+                step = asyncio.ensure_future(items.__anext__())
+                await asyncio.wait([step, superseded], return_when=asyncio.FIRST_COMPLETED)
+                if not step.done():
+                    self.superseded += 1
+                    raise RequestSuperseded(f"Superseded by a newer request for {key}")
+                try:
+                    item = step.result()
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            # Cleanup must not await: a disconnecting stream's cancel scope
+            # would interrupt it. Cancelling a pending step stops the generator;
+            # an idle one is closed in the background.
+            superseded.cancel()
+            if step is not None and not step.done():
+                step.cancel()
+            else:
+                asyncio.ensure_future(items.aclose())
+            self._release(claim)
+
+    def _claim(self, key: str) -> _Claim:
+        previous = self._claims.get(key)
+        if previous is not None:
+            previous.superseded.set()
+        claim = _Claim(key)
+        self._claims[key] = claim
+        return claim
+
+    def _release(self, claim: _Claim):
+        if self._claims.get(claim.key) is claim:
+            del self._claims[claim.key]
+
+    @staticmethod
+    async def _wait_for_disconnect(request: Request):
+        # The body has been read by now, so the next message is the disconnect
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._claims),
+            "superseded": self.superseded,
+            "disconnected": self.disconnected
+        }
\ No newline at end of file
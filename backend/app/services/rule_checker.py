@@ -0,0 +1,276 @@
+import re
+from typing import Any, Dict, List
+
+from app.models.suggestion import SuggestionType, SeverityLevel
+from app.services.analytics_service import AnalyticsService, SentenceTokens, Token
+
+COMMON_MISSPELLINGS = {
+    'accomodate': 'accommodate',
+    'acheive': 'achieve',
+    'acknowledgement': 'acknowledgment',
+    'adress': 'address',
+    'alot': 'a lot',
+    'amature': 'amateur',
+    'apparantly': 'apparently',
+    'arguement': 'argument',
+    'basicly': 'basically',
+    'begining': 'beginning',
+    'beleive': 'believe',
+    'buisness': 'business',
+    'calender': 'calendar',
+    'collegue': 'colleague',
+    'comming': 'coming',
+    'commited': 'committed',
+    'completly': 'completely',
+    'concious': 'conscious',
+    'definately': 'definitely',
+    'dissapoint': 'disappoint',
+    'embarass': 'embarrass',
+    'enviroment': 'environment',
+    'existance': 'existence',
+    'finaly': 'finally',
+    'foward': 'forward',
+    'freind': 'friend',
+    'goverment': 'government',
+    'grammer': 'grammar',
+    'guage': 'gauge',
+    'happend': 'happened',
+    'immediatly': 'immediately',
+    'independant': 'independent',
+    'knowlege': 'knowledge',
+    'liason': 'liaison',
+    'maintainance': 'maintenance',
+    'millenium': 'millennium',
+    'neccessary': 'necessary',
+    'noticable': 'noticeable',
+    'occassion': 'occasion',
+    'occured': 'occurred',
+    'occurence': 'occurrence',
+    'persistant': 'persistent',
+    'posession': 'possession',
+    'prefered': 'preferred',
+    'publically': 'publicly',
+    'recieve': 'receive',
+    'recomend': 'recommend',
+    'refered': 'referred',
+    'relevent': 'relevant',
+    'remeber': 'remember',
+    'responsability': 'responsibility',
+    'seperate': 'separate',
+    'succesful': 'successful',
+    'suprise': 'surprise',
+    'teh': 'the',
+    'tommorow': 'tomorrow',
+    'tounge': 'tongue',
+    'truely': 'truly',
+    'untill': 'until',
+    'wierd': 'weird',
+    'wich': 'which',
+    'writting': 'writing',
+}
+
+# Doubled words that are usually intentional ("had had", "that that")
+ALLOWED_REPEATS = {'had', 'that', 'bye'}
+
+BE_VERBS = {'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being'}
+
+IRREGULAR_PARTICIPLES = {
+    'awoken', 'beaten', 'become', 'begun', 'bent', 'bitten', 'blown', 'born', 'bought', 'broken',
+    'brought', 'built', 'caught', 'chosen', 'done', 'drawn', 'driven', 'eaten', 'fallen', 'felt',
+    'forbidden', 'forgiven', 'forgotten', 'found', 'frozen', 'given', 'gone', 'grown', 'held',
+    'hidden', 'kept', 'known', 'laid', 'led', 'left', 'lost', 'made', 'meant', 'met', 'paid',
+    'ridden', 'risen', 'run', 'said', 'seen', 'sent', 'set', 'shaken', 'shown', 'shut', 'sold',
+    'spent', 'spoken', 'stolen', 'struck', 'sung', 'taken', 'taught', 'thrown', 'told', 'torn',
+    'understood', 'won', 'worn', 'written',
+    # Short and -eed participles the suffix check leaves out
+    'bred', 'fed', 'fled', 'shed', 'sped', 'wed', 'agreed', 'decreed', 'disagreed', 'freed', 'guaranteed', 'refereed'
+}
+
+# -ly words that are not adverbs
+NON_ADVERBS = {'only', 'family', 'early', 'reply', 'apply', 'supply', 'italy', 'july', 'holy', 'ugly', 'belly', 'jelly', 'rally', 'ally', 'bully', 'lonely', 'friendly', 'likely', 'lovely', 'costly', 'elderly'}
+
+# -ed words that are not participles ("is sacred", "was naked")
+NON_PARTICIPLES = {'hundred', 'sacred', 'naked', 'wicked', 'kindred', 'rugged', 'ragged', 'crooked', 'wretched'}
+
+# A regular participle: a stem with a vowel, plus -ed after anything but another e,
+# so "need", "speed", "feed" and "red" are not taken for participles
+PARTICIPLE_SUFFIX = re.compile(r'[a-z]*[aeiouy][a-z]*(?<!e)ed$')
+
+class RuleChecker:
+    """Deterministic checks for mechanical issues that do not need the language model"""
+
+    def __init__(
+        self,
+        analytics_service: AnalyticsService,
+        max_sentence_words: int = 30,
+        max_adverbs_per_sentence: int = 2
+    ):
+        self.analytics_service = analytics_service
+        self.max_sentence_words = max_sentence_words
+        self.max_adverbs_per_sentence = max_adverbs_per_sentence
+
+    def check(self, content: str) -> List[Dict[str, Any]]:
+        """Return suggestions in the same shape as the LLM pass, ordered by position"""
+        suggestions = []
+        for sentence in self.analytics_service.tokenize(content):
+            words = [token for token in sentence.words if token.text.isalpha()]
+            suggestions.extend(self._check_repeated_words(content, words))
+            suggestions.extend(self._check_misspellings(content, words))
+            suggestions.extend(self._check_passive_voice(content, words))
+            suggestions.extend(self._check_sentence_length(content, sentence, words))
+            suggestions.extend(self._check_adverbs(content, words))
+        
+        suggestions.sort(key=lambda s: (s['position']['start'], s['position']['end']))
+        for i, suggestion in enumerate(suggestions):
+            suggestion['id'] = f"rule_{i}"
+        return suggestions
+
+    def _check_repeated_words(self, content: str, words: List[Token]) -> List[Dict[str, Any]]:
+        suggestions = []
+        i = 0
+        while i < len(words):
+            # A run of the same word ("the the the") is reported once
+            lowered = words[i].text.lower()
+            run_end = i
+            while run_end + 1 < len(words) and words[run_end + 1].text.lower() == lowered:
+                run_end += 1
+            
+            if run_end > i and lowered not in ALLOWED_REPEATS:
+                suggestions.append(self._suggestion(
+                    content,
+                    SuggestionType.GRAMMAR,
+                    words[i].start,
+                    words[run_end].end,
+                    words[i].text,
+                    f"The word '{words[i].text}' is repeated",
+                    SeverityLevel.ERROR,
+                    95.0
+                ))
+            i = run_end + 1
+        return suggestions
+
+    def _check_misspellings(self, content: str, words: List[Token]) -> List[Dict[str, Any]]:
+        suggestions = []
+        for word in words:
+            correction = COMMON_MISSPELLINGS.get(word.text.lower())
+            if correction is None:
+                continue
+            if word.text[0].isupper():
+                correction = correction[0].upper() + correction[1:]
+            suggestions.append(self._suggestion(
+                content,
+                SuggestionType.GRAMMAR,
+                word.start,
+                word.end,
+                correction,
+                f"'{word.text}' is a common misspelling of '{correction}'",
+                SeverityLevel.ERROR,
+                95.0
+            ))
+        return suggestions
+
+    def _check_passive_voice(self, content: str, words: List[Token]) -> List[Dict[str, Any]]:
+        suggestions = []
+        for i, word in enumerate(words):
+            if word.text.lower() not in BE_VERBS:
+                continue
+            
+            # Allow one adverb between the verb and the participle ("was quickly written")
+            following = words[i + 1:i + 3]
+            if len(following) == 2 and self._is_adverb(following[0]):
+                participle = following[1]
+            elif following:
+                participle = following[0]
+            else:
+                continue
+            
+            if not self._is_participle(participle):
+                continue
+            suggestions.append(self._suggestion(
+                content,
+                SuggestionType.STYLE,
+                word.start,
+                participle.end,
+                "Rewrite in the active voice",
+                "Passive voice can make sentences wordy and hide who performs the action",
+                SeverityLevel.INFO,
+                70.0
+            ))
+        return suggestions
+
+    def _check_sentence_length(self, content: str, sentence: SentenceTokens, words: List[Token]) -> List[Dict[str, Any]]:
+        if len(words) <= self.max_sentence_words:
+            return []
+        
+        severity = SeverityLevel.WARNING if len(words) > self.max_sentence_words * 1.5 else SeverityLevel.INFO
+        return [self._suggestion(
+            content,
+            SuggestionType.CLARITY,
+            sentence.start,
+            sentence.end,
+            "Split this sentence into shorter ones",
+            f"This sentence has {len(words)} words; sentences over {self.max_sentence_words} words are harder to follow",
+            severity,
+            85.0
+        )]
+
+    def _check_adverbs(self, content: str, words: List[Token]) -> List[Dict[str, Any]]:
+        adverbs = [word for word in words if self._is_adverb(word)]
+        if len(adverbs) <= self.max_adverbs_per_sentence:
+            return []
+        
+        return [
+            self._suggestion(
+                content,
+                SuggestionType.STYLE,
+                adverb.start,
+                adverb.end,
+                f"Consider removing '{adverb.text}' or using a stronger verb",
+                f"This sentence uses {len(adverbs)} adverbs; too many weaken the writing",
+                SeverityLevel.INFO,
+                60.0
+            )
+            for adverb in adverbs
+        ]
+
+    def _is_adverb(self, word: Token) -> bool:
+        # Same -ly heuristic as the adverb percentage in AnalyticsService
+        lowered = word.text.lower()
+        return lowered.endswith('ly') and len(lowered) > 3 and lowered not in NON_ADVERBS
+
+    def _is_participle(self, word: Token) -> bool:
+        lowered = word.text.lower()
+        if lowered in IRREGULAR_PARTICIPLES:
+            return True
+        return lowered not in NON_PARTICIPLES and bool(PARTICIPLE_SUFFIX.match(lowered))
+
+    def _suggestion(
+        self,
+        content: str,
+        suggestion_type: SuggestionType,
+        start: int,
+        end: int,
+        suggestion: str,
+        explanation: str,
+        severity: SeverityLevel,
+        confidence: float
+    ) -> Dict[str, Any]:
+        return {
+            'id': '',
+            'type': suggestion_type.value,
+            'text': content[start:end],
+            'suggestion': suggestion,
+            'explanation': explanation,
+            'position': {'start': start, 'end': end},
+            'severity': severity.value,
+            'confidence': confidence
+        }
+
+def merge_suggestions(rule_suggestions: List[Dict[str, Any]], llm_suggestions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combine both tiers in document order, dropping model suggestions for spans the rules already cover"""
+    covered = {(s['position']['start'], s['position']['end']) for s in rule_suggestions}
+    merged = rule_suggestions + [
+        s for s in llm_suggestions if (s['position']['start'], s['position']['end']) not in covered
+    ]
+    merged.sort(key=lambda s: (s['position']['start'], s['position']['end']))
+    return merged
\ No newline at end of file
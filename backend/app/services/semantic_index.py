@@ -0,0 +1,389 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+import numpy as np
+from databases import Database
+
+from app.services.paragraph_state import split_paragraphs
+
+Embedder = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+class RowInfo(NamedTuple):
+    document_id: str
+    user_id: str
+    start: int
+    end: int
+    hash: str
+
+class SemanticMatch(NamedTuple):
+    document_id: str
+    score: float
+    start: int
+    end: int
+
+class SemanticIndex:
+    """Paragraph embeddings in a memory-mapped float32 file, searched per user by cosine similarity
+    
+    Row i of the vector file holds the unit-length embedding of one paragraph;
+    which document, user and span each row belongs to is kept in the
+    paragraph_embeddings table and loaded at startup. Saved documents are
+    embedded by a single background worker, so repeated saves of a document
+    coalesce and only paragraphs whose text changed are sent to the model.
+    Rows of removed paragraphs are reused by later inserts.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        embed: Embedder,
+        model: str,
+        directory: str = "./semantic_index",
+        block_rows: int = 65536,
+        retry_seconds: float = 60.0
+    ):
+        self.database = database
+        self.embed = embed
+        self.model = model
+        self.enabled = bool(model)
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.block_rows = block_rows
+        self.retry_seconds = retry_seconds
+        
+        self._vectors: Optional[np.memmap] = None
+        self.dimensions: Optional[int] = None
+        self._rows: List[Optional[RowInfo]] = []
+        self._free: List[int] = []
+        self._document_rows: Dict[str, List[int]] = {}
+        self._document_versions: Dict[str, int] = {}
+        self._user_rows: Dict[str, Set[int]] = {}
+        self._user_arrays: Dict[str, np.ndarray] = {}
+        
+        # Documents waiting for the worker, in save order; a dict keeps each once
+        self._pending: Dict[str, None] = {}
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._retries: Dict[str, asyncio.TimerHandle] = {}
+        
+        self.paragraphs_embedded = 0
+        self.paragraphs_reused = 0
+        self.failures = 0
+        self.queries = 0
+        self.rows_scanned = 0
+
+    async def load(self):
+        """Open the vector file and queue every document whose embeddings are missing or stale"""
+        if not self.enabled:
+            return
+        
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._open_vectors():
+            # Vectors from another model, or a lost file, cannot be searched together with new ones
+            await self.database.execute("DELETE FROM paragraph_embeddings")
+        
+        query = """
+        SELECT e.row, e.document_id, e.user_id, e.version, e.start_offset, e.end_offset, e.content_hash,
+               d.version AS document_version
+        FROM paragraph_embeddings e LEFT JOIN documents d ON d.id = e.document_id
+        ORDER BY e.row
+        """
+        stale: Set[str] = set()
+        for row in await self.database.fetch_all(query):
+            info = RowInfo(row["document_id"], row["user_id"], row["start_offset"], row["end_offset"], row["content_hash"])
+            self._place(row["row"], info)
+            self._document_rows.setdefault(info.document_id, []).append(row["row"])
+            if row["document_version"] == row["version"]:
+                self._document_versions[info.document_id] = row["version"]
+            else:
+                stale.add(info.document_id)
+        self._free = [row for row, info in enumerate(self._rows) if info is None]
+        
+        missing = await self.database.fetch_all(
+            """
+            SELECT id FROM documents
+            WHERE content IS NOT NULL AND TRIM(content) != ''
+            AND id NOT IN (SELECT DISTINCT document_id FROM paragraph_embeddings)
+            """
+        )
+        stale.update(row["id"] for row in missing)
+        
+        for document_id in stale:
+            self.schedule(document_id)
+        print(f"Semantic index loaded: {len(self._document_rows)} documents ({len(stale)} queued for embedding)")
+
+    def start(self):
+        if self.enabled and self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._vectors is not None:
+            self._vectors.flush()
+
+    def schedule(self, document_id: str):
+        """Queue a saved or deleted document; the worker reads its latest stored content"""
+        if not self.enabled:
+            return
+        self._pending[document_id] = None
+        self._wakeup.set()
+
+    def search(self, user_id: str, vector: List[float], limit: int = 10, min_score: float = 0.0) -> List[SemanticMatch]:
+        """The user's documents ranked by their best matching paragraph"""
+        self.queries += 1
+        rows = self._user_array(user_id)
+        if not len(rows) or self._vectors is None:
+            return []
+        
+        query = self._normalize(np.asarray(vector, dtype=np.float32))
+        if len(query) != self.dimensions:
+            raise ValueError(f"Query has {len(query)} dimensions, index has {self.dimensions}")
+        scores = self._scores(rows, query)
+        self.rows_scanned += len(rows)
+        
+        # Take the best rows and widen the cut only if they repeat too few documents
+        candidates = min(len(rows), limit * 4)
+        while True:
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            
+            matches: Dict[str, SemanticMatch] = {}
+            for index in top.tolist():
+                score = float(scores[index])
+                if score < min_score or len(matches) == limit:
+                    break
+                info = self._rows[rows[index]]
+                if info.document_id not in matches:
+                    matches[info.document_id] = SemanticMatch(info.document_id, score, info.start, info.end)
+            
+            exhausted = candidates == len(rows) or float(scores[top[-1]]) < min_score
+            if len(matches) == limit or exhausted:
+                return list(matches.values())
+            candidates = min(len(rows), candidates * 4)
+
+    async def index_document(self, document_id: str, user_id: str, version: int, content: str):
+        """Embed the document's new or changed paragraphs and replace its rows
+        
+        Every embedding is fetched and checked before the index is touched, so
+        a failed call leaves the document's previous rows searchable.
+        """
+        paragraphs = split_paragraphs(content)
+        reusable: Dict[str, List[int]] = {}
+        for row in self._document_rows.get(document_id, []):
+            reusable.setdefault(self._rows[row].hash, []).append(row)
+        
+        texts = {}
+        for paragraph in paragraphs:
+            if paragraph.hash not in reusable:
+                texts.setdefault(paragraph.hash, paragraph.text)
+        embedded = dict(zip(texts, await self.embed(list(texts.values())))) if texts else {}
+        
+        # One vector per distinct paragraph; copies beyond the rows a paragraph
+        # already had get a new row holding the same vector
+        vectors: Dict[str, np.ndarray] = {}
+        dimensions = self.dimensions or (len(next(iter(embedded.values()))) if embedded else None)
+        for paragraph_hash, embedding in embedded.items():
+            vector = np.asarray(embedding, dtype=np.float32)
+            if len(vector) != dimensions:
+                raise ValueError(f"Embedding has {len(vector)} dimensions, index has {dimensions}")
+            vectors[paragraph_hash] = self._normalize(vector)
+        for paragraph_hash, existing in reusable.items():
+            vectors[paragraph_hash] = np.array(self._vectors[existing[0]])
+        
+        self.remove(document_id, release=False)
+        rows = []
+        for paragraph in paragraphs:
+            if reusable.get(paragraph.hash):
+                row = reusable[paragraph.hash].pop()
+                self.paragraphs_reused += 1
+            else:
+                vector = vectors[paragraph.hash]
+                row = self._allocate(len(vector))
+                self._vectors[row] = vector
+                if paragraph.hash in embedded:
+                    self.paragraphs_embedded += 1
+                else:
+                    self.paragraphs_reused += 1
+            self._place(row, RowInfo(document_id, user_id, paragraph.start, paragraph.end, paragraph.hash))
+            rows.append(row)
+        
+        # Rows of paragraphs that are gone become free once they are out of the table
+        released = [row for unused in reusable.values() for row in unused]
+        if rows:
+            self._document_rows[document_id] = rows
+        if self._vectors is not None:
+            self._vectors.flush()
+        
+        async with self.database.transaction():
+            await self.database.execute("DELETE FROM paragraph_embeddings WHERE document_id = :document_id", {"document_id": document_id})
+            if rows:
+                await self.database.execute_many(
+                    """
+                    INSERT INTO paragraph_embeddings (row, document_id, user_id, version, start_offset, end_offset, content_hash)
+                    VALUES (:row, :document_id, :user_id, :version, :start_offset, :end_offset, :content_hash)
+                    """,
+                    [
+                        {
+                            "row": row,
+                            "document_id": document_id,
+                            "user_id": user_id,
+                            "version": version,
+                            "start_offset": self._rows[row].start,
+                            "end_offset": self._rows[row].end,
+                            "content_hash": self._rows[row].hash
+                        }
+                        for row in rows
+                    ]
+                )
+        # Only a stored version counts as indexed, so a failed write is retried
+        self._document_versions[document_id] = version
+        self._free.extend(released)
+
+    async def remove_document(self, document_id: str):
+        self.remove(document_id)
+        await self.database.execute("DELETE FROM paragraph_embeddings WHERE document_id = :document_id", {"document_id": document_id})
+
+    def remove(self, document_id: str, release: bool = True):
+        self._document_versions.pop(document_id, None)
+        for row in self._document_rows.pop(document_id, []):
+            info = self._rows[row]
+            self._rows[row] = None
+            self._user_rows[info.user_id].discard(row)
+            self._user_arrays.pop(info.user_id, None)
+            if release:
+                self._free.append(row)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                document_id = next(iter(self._pending))
+                del self._pending[document_id]
+                try:
+                    await self._index_stored(document_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    print(f"Failed to embed document {document_id}: {e}")
+                    self._retry_later(document_id)
+
+    async def _index_stored(self, document_id: str):
+        row = await self.database.fetch_one(
+            "SELECT user_id, version, content FROM documents WHERE id = :id", {"id": document_id}
+        )
+        if row is None:
+            await self.remove_document(document_id)
+        elif self._document_versions.get(document_id) != row["version"]:
+            await self.index_document(document_id, row["user_id"], row["version"], row["content"] or "")
+
+    def _retry_later(self, document_id: str):
+        previous = self._retries.pop(document_id, None)
+        if previous is not None:
+            previous.cancel()
+        
+        def retry():
+            self._retries.pop(document_id, None)
+            self.schedule(document_id)
+        self._retries[document_id] = asyncio.get_running_loop().call_later(self.retry_seconds, retry)
+
+    def _scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each row with the query, reading the file in bounded blocks"""
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), self.block_rows):
+            block = rows[start:start + self.block_rows]
+            # Contiguous runs read straight from the map; scattered rows are gathered
+            if block[-1] - block[0] + 1 == len(block):
+                vectors = self._vectors[block[0]:block[-1] + 1]
+            else:
+                vectors = self._vectors[block]
+            scores[start:start + len(block)] = vectors @ query
+        return scores
+
+    def _user_array(self, user_id: str) -> np.ndarray:
+        rows = self._user_arrays.get(user_id)
+        if rows is None:
+            rows = np.array(sorted(self._user_rows.get(user_id, ())), dtype=np.int64)
+            self._user_arrays[user_id] = rows
+        return rows
+
+    def _place(self, row: int, info: RowInfo):
+        while len(self._rows) <= row:
+            self._rows.append(None)
+        self._rows[row] = info
+        self._user_rows.setdefault(info.user_id, set()).add(row)
+        self._user_arrays.pop(info.user_id, None)
+
+    def _allocate(self, dimensions: int) -> int:
+        if self.dimensions is None:
+            self.dimensions = dimensions
+        elif dimensions != self.dimensions:
+            raise ValueError(f"Embedding has {dimensions} dimensions, index has {self.dimensions}")
+        
+        if self._free:
+            return self._free.pop()
+        row = len(self._rows)
+        self._rows.append(None)
+        if self._vectors is None or row >= len(self._vectors):
+            self._grow(max(1024, row * 2))
+        return row
+
+    def _grow(self, capacity: int):
+        """Extend the vector file to capacity rows and map it again"""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self.vectors_path, "ab") as handle:
+            handle.truncate(capacity * self.dimensions * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+        with open(self.meta_path, "w") as handle:
+            json.dump({"model": self.model, "dimensions": self.dimensions, "capacity": capacity}, handle)
+
+    def _open_vectors(self) -> bool:
+        """Map an existing vector file written by the same model; False if there is none to use"""
+        try:
+            with open(self.meta_path) as handle:
+                meta = json.load(handle)
+            size = os.path.getsize(self.vectors_path)
+        except (OSError, ValueError):
+            meta, size = None, 0
+        
+        if not meta or meta.get("model") != self.model or size != meta["capacity"] * meta["dimensions"] * 4:
+            for path in (self.vectors_path, self.meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return False
+        
+        self.dimensions = meta["dimensions"]
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(meta["capacity"], self.dimensions))
+        return True
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "model": self.model or None,
+            "dimensions": self.dimensions,
+            "documents": len(self._document_rows),
+            "paragraphs": len(self._rows) - len(self._free),
+            "capacity": len(self._vectors) if self._vectors is not None else 0,
+            "pending": len(self._pending),
+            "paragraphs_embedded": self.paragraphs_embedded,
+            "paragraphs_reused": self.paragraphs_reused,
+            "failures": self.failures,
+            "queries": self.queries,
+            "rows_scanned": self.rows_scanned
+        }
\ No newline at end of file
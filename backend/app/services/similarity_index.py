@@ -0,0 +1,299 @@
+import asyncio
+import hashlib
+import re
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from databases import Database
+
+WORD = re.compile(r'\w+')
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+class Shingle(NamedTuple):
+    hash: int
+    start: int
+    end: int
+
+def shingle(content: str, size: int = 5) -> List[Shingle]:
+    """Hash every run of `size` consecutive words, keeping the character span it covers"""
+    words = [(match.group().lower(), match.start(), match.end()) for match in WORD.finditer(content)]
+    if not words:
+        return []
+    if len(words) < size:
+        size = len(words)
+    
+    shingles = []
+    for i in range(len(words) - size + 1):
+        text = " ".join(word for word, _, _ in words[i:i + size])
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest()
+        shingles.append(Shingle(int.from_bytes(digest, "little"), words[i][1], words[i + size - 1][2]))
+    return shingles
+
+def overlapping_spans(query: List[Shingle], other: List[Shingle], max_spans: int = 20) -> List[Dict[str, Dict[str, int]]]:
+    """Runs of shingles shared by both texts, as character spans in each"""
+    positions: Dict[int, List[int]] = {}
+    for index, item in enumerate(other):
+        positions.setdefault(item.hash, []).append(index)
+    
+    runs = []
+    current = None
+    for index, item in enumerate(query):
+        matches = positions.get(item.hash)
+        if not matches:
+            current = None
+            continue
+        
+        # Extend the run while both texts keep matching in step
+        if current is not None and current[3] + 1 in matches:
+            current[1] = index
+            current[3] += 1
+        else:
+            current = [index, index, matches[0], matches[0]]
+            runs.append(current)
+    
+    return [
+        {
+            "query": {"start": query[q_start].start, "end": query[q_end].end},
+            "document": {"start": other[d_start].start, "end": other[d_end].end}
+        }
+        for q_start, q_end, d_start, d_end in runs[:max_spans]
+    ]
+
+class SimilarityIndex:
+    """MinHash signatures of stored documents in an LSH index for near-duplicate lookups
+    
+    Each document is split into windows of shingles so copied passages are found
+    even inside much longer documents. Band keys live in one sorted NumPy array
+    searched with binary search, plus a small dict of recent inserts that is
+    merged in once it grows. Signatures are persisted in the document_signatures
+    table and the band keys are rebuilt from them at startup.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        num_perm: int = 64,
+        bands: int = 32,
+        shingle_size: int = 5,
+        window_shingles: int = 200,
+        merge_threshold: int = 50000,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        
+        self.database = database
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.window_shingles = window_shingles
+        self.merge_threshold = merge_threshold
+        
+        # Fixed seed so persisted signatures stay comparable across restarts
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._row_mix = generator.randint(1, (1 << 63) - 1, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salt = generator.randint(0, (1 << 63) - 1, size=bands, dtype=np.uint64)
+        
+        # One signature row per window; rows of removed documents are reused
+        # once their band keys have been merged away
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._owners: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._released: List[int] = []
+        self._document_slots: Dict[str, List[int]] = {}
+        
+        # Sorted band keys and the window slot each belongs to
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._slots = np.zeros(0, dtype=np.int64)
+        self._recent: Dict[int, List[int]] = {}
+        self._recent_entries = 0
+        
+        self.queries = 0
+        self.candidates_checked = 0
+
+    async def load(self, batch_size: int = 500):
+        """Load persisted signatures and index any document whose signature is missing or stale"""
+        query = """
+        SELECT d.id, d.version, s.version AS signature_version, s.signature
+        FROM documents d LEFT JOIN document_signatures s ON s.document_id = d.id
+        """
+        stale = []
+        for row in await self.database.fetch_all(query):
+            signature = self._decode(row["signature"]) if row["signature_version"] == row["version"] else None
+            if signature is None:
+                stale.append(row["id"])
+            else:
+                self._insert(row["id"], signature)
+        self._merge()
+        
+        for start in range(0, len(stale), batch_size):
+            ids = stale[start:start + batch_size]
+            params = {f"id_{i}": document_id for i, document_id in enumerate(ids)}
+            placeholders = ", ".join(f":{name}" for name in params)
+            rows = await self.database.fetch_all(
+                f"SELECT id, version, content FROM documents WHERE id IN ({placeholders})", params
+            )
+            for row in rows:
+                await self.index_document(row["id"], row["version"], row["content"] or "")
+        
+        print(f"Similarity index loaded: {len(self._document_slots)} documents ({len(stale)} re-indexed)")
+
+    async def index_document(self, document_id: str, version: int, content: str):
+        """Add or replace a document's signatures in the index and persist them"""
+        signature = await asyncio.to_thread(self.signature, content)
+        self.remove(document_id)
+        self._insert(document_id, signature)
+        
+        await self.database.execute("DELETE FROM document_signatures WHERE document_id = :document_id", {"document_id": document_id})
+        await self.database.execute(
+            """
+            INSERT INTO document_signatures (document_id, version, signature, updated_at)
+            VALUES (:document_id, :version, :signature, :updated_at)
+            """,
+            {
+                "document_id": document_id,
+                "version": version,
+                "signature": signature.tobytes(),
+                "updated_at": datetime.utcnow()
+            }
+        )
+
+    async def remove_document(self, document_id: str):
+        self.remove(document_id)
+        await self.database.execute("DELETE FROM document_signatures WHERE document_id = :document_id", {"document_id": document_id})
+
+    def signature(self, content: str) -> np.ndarray:
+        """MinHash signature for each window of the content, shape (windows, num_perm)"""
+        hashes = np.array([item.hash for item in shingle(content, self.shingle_size)], dtype=np.uint64)
+        if not len(hashes):
+            return np.zeros((0, self.num_perm), dtype=np.uint32)
+        
+        windows = []
+        for start in range(0, len(hashes), self.window_shingles):
+            window = hashes[start:start + self.window_shingles]
+            permuted = (np.outer(window, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+            windows.append(permuted.min(axis=0).astype(np.uint32))
+        return np.vstack(windows)
+
+    async def find_similar(self, content: str, exclude: Optional[str] = None, limit: int = 10, min_similarity: float = 0.1) -> List[Tuple[str, float]]:
+        """query() with the MinHash signature computed in a thread, off the event loop"""
+        signature = await asyncio.to_thread(self.signature, content)
+        return self.query_signature(signature, exclude, limit, min_similarity)
+
+    def query(self, content: str, exclude: Optional[str] = None, limit: int = 10, min_similarity: float = 0.1) -> List[Tuple[str, float]]:
+        """Documents sharing an LSH bucket with the content, with their estimated window similarity"""
+        return self.query_signature(self.signature(content), exclude, limit, min_similarity)
+
+    def query_signature(self, signature: np.ndarray, exclude: Optional[str] = None, limit: int = 10, min_similarity: float = 0.1) -> List[Tuple[str, float]]:
+        self.queries += 1
+        if not len(signature):
+            return []
+        
+        keys = self._band_keys(signature).ravel()
+        candidate_slots = set()
+        lefts = np.searchsorted(self._keys, keys, side="left")
+        rights = np.searchsorted(self._keys, keys, side="right")
+        for key, left, right in zip(keys.tolist(), lefts.tolist(), rights.tolist()):
+            candidate_slots.update(self._slots[left:right].tolist())
+            candidate_slots.update(self._recent.get(key, ()))
+        
+        # Estimate similarity from the signatures; only bucket mates are compared
+        best: Dict[str, float] = {}
+        for slot in candidate_slots:
+            document_id = self._owners[slot]
+            if document_id is None or document_id == exclude:
+                continue
+            self.candidates_checked += 1
+            similarity = float((signature == self._signatures[slot]).mean(axis=1).max())
+            if similarity >= min_similarity:
+                best[document_id] = max(best.get(document_id, 0.0), similarity)
+        
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def remove(self, document_id: str):
+        # Band keys of removed windows are dropped at the next merge and are
+        # skipped by queries until then
+        for slot in self._document_slots.pop(document_id, []):
+            self._owners[slot] = None
+            self._live[slot] = False
+            self._released.append(slot)
+
+    def _insert(self, document_id: str, signature: np.ndarray):
+        slots = []
+        for window in signature:
+            slot = self._allocate()
+            self._signatures[slot] = window
+            self._owners[slot] = document_id
+            self._live[slot] = True
+            slots.append(slot)
+        self._document_slots[document_id] = slots
+        
+        if not slots:
+            return
+        for slot, keys in zip(slots, self._band_keys(signature).tolist()):
+            for key in keys:
+                self._recent.setdefault(key, []).append(slot)
+        self._recent_entries += len(slots) * self.bands
+        
+        # Merge cost grows with the index, so let the buffer grow with it too
+        if self._recent_entries >= max(self.merge_threshold, len(self._keys) // 4):
+            self._merge()
+
+    def _merge(self):
+        """Fold recent inserts into the sorted arrays and drop keys of removed windows"""
+        recent_keys = [key for key, slots in self._recent.items() for _ in slots]
+        recent_slots = [slot for slots in self._recent.values() for slot in slots]
+        keys = np.concatenate([self._keys, np.array(recent_keys, dtype=np.uint64)])
+        slots = np.concatenate([self._slots, np.array(recent_slots, dtype=np.int64)])
+        
+        live = self._live[slots]
+        keys, slots = keys[live], slots[live]
+        
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._slots = slots[order]
+        self._recent = {}
+        self._recent_entries = 0
+        self._free.extend(self._released)
+        self._released = []
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        
+        slot = len(self._owners)
+        if slot >= len(self._signatures):
+            grown = np.zeros((len(self._signatures) * 2, self.num_perm), dtype=np.uint32)
+            grown[:slot] = self._signatures
+            self._signatures = grown
+            self._live = np.concatenate([self._live, np.zeros(slot, dtype=bool)])
+        self._owners.append(None)
+        return slot
+
+    def _band_keys(self, windows: np.ndarray) -> np.ndarray:
+        """One 64-bit key per (window, band), shape (windows, bands)"""
+        banded = windows.reshape(len(windows), self.bands, self.rows).astype(np.uint64)
+        return (banded * self._row_mix).sum(axis=2, dtype=np.uint64) ^ self._band_salt
+
+    def _decode(self, blob: Optional[bytes]) -> Optional[np.ndarray]:
+        if blob is None or len(blob) % (self.num_perm * 4):
+            return None
+        return np.frombuffer(blob, dtype=np.uint32).reshape(-1, self.num_perm).copy()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._document_slots),
+            "windows": len(self._owners) - len(self._free) - len(self._released),
+            "band_keys": len(self._keys) + self._recent_entries,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "queries": self.queries,
+            "candidates_checked": self.candidates_checked
+        }
\ No newline at end of file
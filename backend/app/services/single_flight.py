@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class _InFlightCall:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared execution"""
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() once per key at a time; concurrent callers share its result"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _InFlightCall(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executed += 1
+        else:
+            self.deduplicated += 1
+        
+        call.waiters += 1
+        try:
+            # Shield so one caller being cancelled does not cancel the shared work
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is waiting any more, so stop the generation and let
+                # the next caller start afresh
+                call.task.cancel()
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    def _forget(self, key: str, call: _InFlightCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        
+        # Retrieve the exception so an abandoned failure is not logged as unhandled
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "deduplicated": self.deduplicated
+        }
\ No newline at end of file
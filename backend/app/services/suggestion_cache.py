@@ -0,0 +1,67 @@
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class SuggestionCache:
+    """Content-addressed LRU cache with TTL for generated suggestions"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(content: str, writing_goal: str, language: str, model_name: str) -> str:
+        """Build a cache key from the content hash and generation settings"""
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return f"{model_name}|{writing_goal}|{language}|{content_hash}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on miss or expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        # Mark as most recently used
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting least recently used entries over the size cap"""
+        if self.max_entries <= 0:
+            return
+        
+        self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+# The app reads these at import time, so they are set before any app module is imported
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import pytest
+
+from app.database import Base, database, engine
+
+@pytest.fixture
+async def db():
+    """A connected database with freshly created, empty tables"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    await database.connect()
+    yield database
+    await database.disconnect()
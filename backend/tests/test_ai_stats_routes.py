@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.main import app
+from app.models.user import User
+from app.routers import ai_suggestions, auth
+from app.routers.auth import get_current_user
+
+WRITER = User(id="user-1", email="writer@example.com", full_name="Writer", created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+ADMIN = User(id="user-2", email="Ops@example.com", full_name="Ops", created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+
+SERVICE_GETTERS = [
+    "get_ollama_service", "get_llm_scheduler", "get_similarity_index", "get_job_queue", "get_precompute_store",
+    "get_document_precomputer", "get_semantic_index", "get_request_tracker", "get_analytics_cache", "get_analytics_pool"
+]
+
+class Counters:
+    """Any service: every stats method reports one counter"""
+
+    def get_stats(self):
+        return {"requests": 1}
+
+    def stats(self):
+        return {"requests": 1}
+
+class JobCounters:
+    async def stats(self):
+        return {"queued": 0}
+
+@pytest.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(auth, "ADMIN_EMAILS", {"ops@example.com"})
+    for name in SERVICE_GETTERS:
+        app.dependency_overrides[getattr(ai_suggestions, name)] = Counters
+    app.dependency_overrides[ai_suggestions.get_job_queue] = JobCounters
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+async def test_stats_are_hidden_from_other_users(client):
+    app.dependency_overrides[get_current_user] = lambda: WRITER
+
+    response = await client.get("/api/ai/stats")
+
+    assert response.status_code == 403
+
+async def test_admins_can_read_stats(client):
+    app.dependency_overrides[get_current_user] = lambda: ADMIN
+
+    response = await client.get("/api/ai/stats")
+
+    assert response.status_code == 200
+    assert response.json()["jobs"] == {"queued": 0}
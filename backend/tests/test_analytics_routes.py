@@ -0,0 +1,92 @@
+import json
+import uuid
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.main import app
+from app.models.user import User
+from app.routers.auth import get_current_user
+from app.services.analytics_cache import AnalyticsCache
+from app.services.analytics_pool import AnalyticsPool
+from app.services.analytics_service import AnalyticsService, ANALYTICS_VERSION
+
+USER = User(id="user-1", email="writer@example.com", full_name="Writer", created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+
+CONTENT = (
+    "The committee reviewed the proposal in detail. It approved the budget.\n\n"
+    "Implementation begins next quarter, subject to organizational availability and considerable deliberation."
+)
+
+@pytest.fixture
+async def client(db):
+    """A client for the app with its analytics services on the test database and USER signed in"""
+    app.state.analytics_cache = AnalyticsCache(db, ANALYTICS_VERSION)
+    app.state.analytics_pool = AnalyticsPool(AnalyticsService(), workers=0)
+    app.dependency_overrides[get_current_user] = lambda: USER
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+async def insert_document(db, content: str = CONTENT, user_id: str = USER.id) -> str:
+    document_id = str(uuid.uuid4())
+    await db.execute(
+        """
+        INSERT INTO documents (id, title, content, user_id, word_count, reading_time, version, collaborators, created_at, updated_at)
+        VALUES (:id, :title, :content, :user_id, :word_count, 1, 1, '[]', :now, :now)
+        """,
+        {"id": document_id, "title": "Proposal", "content": content, "user_id": user_id, "word_count": len(content.split()), "now": datetime.utcnow()}
+    )
+    return document_id
+
+async def test_readability_route(client, db):
+    document_id = await insert_document(db)
+
+    response = await client.get(f"/api/analytics/document/{document_id}/readability")
+
+    assert response.status_code == 200
+    body = response.json()
+    expected = AnalyticsService().readability(CONTENT)
+    assert body["readability_score"] == expected["readability_score"]
+    assert body["grade_level"] == expected["grade_level"]
+    assert body["reading_time"] == 1
+    assert body["recommendations"]
+
+async def test_readability_route_checks_access(client, db):
+    document_id = await insert_document(db, user_id="someone-else")
+
+    assert (await client.get(f"/api/analytics/document/{document_id}/readability")).status_code == 403
+    assert (await client.get("/api/analytics/document/missing/readability")).status_code == 404
+
+async def bulk_events(client, payload):
+    response = await client.post("/api/analytics/bulk", json=payload)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+async def test_bulk_reads_long_id_lists_in_batches(client, db):
+    owned = sorted([await insert_document(db, f"Document number {i}. It is short.") for i in range(5)])
+    # More ids than one query takes, most of them unknown
+    requested = [f"missing-{i:04d}" for i in range(1200)] + owned
+
+    events = await bulk_events(client, {"document_ids": requested, "batch_size": 2})
+
+    analytics = [event for event in events if event["event"] == "analytics"]
+    assert [event["document_id"] for event in analytics] == owned
+    missing = [event for event in events if event["event"] == "error"]
+    assert len(missing) == 1200
+    assert events[-1]["event"] == "done"
+    assert events[-1]["total_count"] == 5
+
+async def test_bulk_reading_time_is_the_same_for_stored_and_computed_analytics(client, db):
+    document_id = await insert_document(db, " ".join(["word"] * 450) + ".")
+    await db.execute("UPDATE documents SET reading_time = 2 WHERE id = :id", {"id": document_id})
+
+    computed = [event for event in await bulk_events(client, {}) if event["event"] == "analytics"]
+    # Storing analytics makes the next request serve them
+    await client.get(f"/api/analytics/document/{document_id}")
+    stored = [event for event in await bulk_events(client, {}) if event["event"] == "analytics"]
+
+    assert computed[0]["stored"] is False and stored[0]["stored"] is True
+    assert computed[0]["reading_time"] == stored[0]["reading_time"] == 2
+    assert computed[0]["readability_score"] == stored[0]["readability_score"]
@@ -0,0 +1,48 @@
+import pytest
+import textstat
+
+from app.services.analytics_service import AnalyticsService, legacy_round
+
+DOCUMENTS = [
+    "The cat sat on the mat. It was warm and quiet.",
+    (
+        "Quarterly revenue increased substantially, exceeding the organization's projections. "
+        "Management attributes the improvement to operational efficiencies.\n\n"
+        "However, considerable uncertainty remains. Analysts recommend caution!\n\n"
+        "Will the trend continue? Nobody knows for certain."
+    ),
+    (
+        "We went to the beach. The sun was out, so we swam for hours and ate ice cream on the pier.\n\n"
+        "Later it rained. Ok.\n\n"
+        "Singer-songwriters played late into the night, and the crowd didn't mind the weather at all."
+    ),
+]
+
+@pytest.fixture(scope="module")
+def service():
+    return AnalyticsService(paragraph_cache_size=0)
+
+@pytest.mark.parametrize("content", DOCUMENTS)
+def test_scores_from_paragraphs_match_textstat_on_the_whole_text(service, content):
+    stats = service.document_stats(content)
+
+    # Reading ease is reported on a 0-100 scale
+    assert service._calculate_readability(stats) == max(0, min(100, textstat.flesch_reading_ease(content)))
+    assert service._calculate_grade_level(stats) == textstat.flesch_kincaid_grade(content)
+
+def test_paragraph_without_end_punctuation_is_its_own_sentence(service):
+    # textstat runs the heading into the next sentence; paragraph stats count it alone
+    content = "Quarterly results and outlook\n\nRevenue rose sharply. Costs fell this year."
+    stats = service.document_stats(content)
+
+    assert stats.readability_sentences == 3
+    assert textstat.sentence_count(content) == 2
+
+@pytest.mark.parametrize("value, points, expected", [
+    (2.25, 1, 2.3),
+    (-2.25, 1, -2.3),
+    (66.405, 2, 66.41),
+    (7.0, 1, 7.0),
+])
+def test_legacy_round_rounds_half_away_from_zero(value, points, expected):
+    assert legacy_round(value, points) == pytest.approx(expected)
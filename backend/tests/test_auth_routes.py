@@ -0,0 +1,31 @@
+import httpx
+import pytest
+
+from app.main import app
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def register(client, email: str) -> str:
+    response = await client.post("/api/auth/register", json={"email": email, "password": "correct horse", "full_name": "Writer"})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+async def test_registered_user_can_authenticate(client):
+    token = await register(client, "writer@example.com")
+
+    response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["id"]
+    assert response.json()["email"] == "writer@example.com"
+
+async def test_registered_users_get_distinct_ids(client):
+    ids = set()
+    for email in ("first@example.com", "second@example.com"):
+        token = await register(client, email)
+        ids.add((await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})).json()["id"])
+
+    assert len(ids) == 2
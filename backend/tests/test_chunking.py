@@ -0,0 +1,98 @@
+import json
+import time
+
+from app.services.chunking import CHUNK_SEPARATOR, plan_chunks, split_segments
+from app.services.ollama_service import OllamaService
+
+def test_paragraphs_that_fit_are_one_segment_each():
+    content = "First paragraph.\n\n  Second paragraph.  \n\nThird."
+
+    segments = split_segments(content, 100)
+
+    assert [content[start:end] for start, end in segments] == ["First paragraph.", "Second paragraph.", "Third."]
+
+def test_long_paragraph_falls_back_to_sentences_then_words():
+    long_sentence = " ".join(["word"] * 30)
+    content = f"Short one. {long_sentence}. Another short one."
+
+    segments = split_segments(content, 40)
+
+    assert all(end - start <= 40 for start, end in segments)
+    texts = [content[start:end] for start, end in segments]
+    assert texts[0] == "Short one."
+    assert texts[-1] == "Another short one."
+    # The run-on sentence is cut at spaces and nothing is lost
+    assert " ".join(texts[1:-1]) == f"{long_sentence}."
+
+def test_split_segments_keeps_document_offsets_for_a_range():
+    content = "Intro.\n\nMiddle paragraph here.\n\nEnd."
+    start = content.index("Middle")
+
+    segments = split_segments(content, 100, start, start + len("Middle paragraph here."))
+
+    assert segments == [(start, start + len("Middle paragraph here."))]
+
+def test_contiguous_segments_share_a_piece_and_stay_a_slice_of_the_document():
+    content = "One.\n\nTwo.\n\nThree."
+    chunks = plan_chunks(content, split_segments(content, 100), 100)
+
+    assert len(chunks) == 1
+    assert chunks[0].text == content
+    assert chunks[0].pieces == [(0, 0, len(content))]
+
+def test_separate_segments_are_joined_with_a_separator_and_mapped_back():
+    content = "Alpha beta.\n\nGamma delta.\n\nEpsilon zeta."
+    first, _, third = split_segments(content, 100)
+
+    chunk, = plan_chunks(content, [first, third], 100)
+
+    assert chunk.text == "Alpha beta." + CHUNK_SEPARATOR + "Epsilon zeta."
+    start = chunk.text.index("zeta")
+    assert chunk.to_document_span(start, start + 4) == (content.index("zeta"), content.index("zeta") + 4)
+    # A span across the separator has no place in the document
+    assert chunk.to_document_span(0, len(chunk.text)) is None
+
+def test_chunks_respect_max_chars():
+    content = "\n\n".join(f"Paragraph number {i} is here." for i in range(10))
+
+    chunks = plan_chunks(content, split_segments(content, 60), 60)
+
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 60 for chunk in chunks)
+    covered = [span for chunk in chunks for span in chunk.document_spans()]
+    assert covered == sorted(covered)
+
+class PhrasePool:
+    """Suggests replacing "teh" wherever a chunk contains it"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, model, prompt, **kwargs):
+        self.prompts.append(prompt)
+        text = prompt.split('Text to analyze: "', 1)[1].split('"\nWriting goal', 1)[0]
+        suggestions = [
+            {"type": "grammar", "text": "teh", "suggestion": "the", "explanation": "Typo", "severity": "error", "confidence": 95}
+        ] * text.count("teh")
+        return {"response": json.dumps({"suggestions": suggestions})}
+
+async def test_chunk_suggestions_are_placed_at_their_own_occurrence_and_merged_in_order():
+    service = OllamaService()
+    service.pool = PhrasePool()
+    service.hedge_after = 0
+    # One paragraph per chunk
+    service.chunk_chars = 30
+    content = "\n\n".join([
+        "First we read teh report.",
+        "Nothing to fix here at all.",
+        "Then teh board met."
+    ])
+    segments = split_segments(content, service.chunk_chars)
+
+    suggestions = await service._suggest_segments(content, segments, "professional", "en-US", service.model_name, time.monotonic() + 10)
+
+    assert len(service.pool.prompts) == 3
+    first = content.index("teh")
+    second = content.index("teh", first + 1)
+    assert [(s["position"]["start"], s["position"]["end"]) for s in suggestions] == [(first, first + 3), (second, second + 3)]
+    assert all(content[s["position"]["start"]:s["position"]["end"]] == "teh" for s in suggestions)
@@ -0,0 +1,93 @@
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpen
+from app.services.ollama_service import LLMUnavailable, OllamaService
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+def fail(breaker, times):
+    for _ in range(times):
+        breaker.check()
+        breaker.record_failure()
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    fail(breaker, 2)
+    breaker.record_success()
+    fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 10
+    with pytest.raises(CircuitOpen) as rejected:
+        breaker.check()
+    assert rejected.value.retry_after == 20
+    assert breaker.stats()["rejected"] == 1
+
+def test_one_trial_after_reset_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    fail(breaker, 1)
+
+    clock.now += 30
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only the trial goes through
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 2
+
+    clock.now += 30
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+def test_lost_trial_is_replaced_after_another_reset(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    fail(breaker, 1)
+    clock.now += 30
+    breaker.check()
+
+    clock.now += 29
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    clock.now += 1
+    breaker.check()
+
+class FailingPool:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, model, prompt, **kwargs):
+        self.calls += 1
+        raise ConnectionError("connection refused")
+
+async def test_open_breaker_stops_model_calls():
+    service = OllamaService()
+    service.pool = FailingPool()
+    service.hedge_after = 0
+    service.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    for _ in range(3):
+        with pytest.raises(LLMUnavailable):
+            await service.improve_vocabulary("A short memo.")
+
+    assert service.pool.calls == 2
+    assert service.circuit_breaker.stats()["rejected"] == 1
@@ -0,0 +1,75 @@
+from app.services.chunking import plan_chunks
+from app.services.ollama_service import OllamaService, SUGGESTION_FOLLOW_UP_PROMPT, session_scopes
+
+PARAGRAPHS = [
+    "The first paragraph talks about the weather. It was sunny.",
+    "The second paragraph talks about lunch. It was late.",
+    "The third paragraph talks about the train. It was early."
+]
+
+class FakePool:
+    """Answers every call with no suggestions and a context naming the call"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, model, prompt, context=None, **kwargs):
+        self.calls.append({"prompt": prompt, "context": context})
+        number = len(self.calls)
+        return {"response": '{"suggestions": []}', "context": [number] * 200, "endpoint": "local"}
+
+    async def close(self):
+        pass
+
+def make_service() -> OllamaService:
+    service = OllamaService()
+    service.pool = FakePool()
+    service.hedge_after = 0
+    service.context_reuse = True
+    return service
+
+def test_chunks_starting_in_one_paragraph_get_distinct_scopes():
+    content = "\n\n".join(PARAGRAPHS)
+    first, second, third = [(content.index(paragraph), content.index(paragraph) + len(paragraph)) for paragraph in PARAGRAPHS]
+    sentence_end = content.index("sunny.") + len("sunny.")
+    segments = [(first[0], content.index("It was sunny.")), (content.index("It was sunny."), sentence_end), second, third]
+    chunks = plan_chunks(content, segments, 60)
+
+    scopes = session_scopes(content, chunks)
+    assert len(set(scopes)) == len(chunks)
+    assert scopes[-1] == "2.1"
+
+async def test_edited_paragraph_continues_its_own_session():
+    service = make_service()
+    # One paragraph per chunk
+    service.chunk_chars = 80
+    content = "\n\n".join(PARAGRAPHS)
+
+    await service.generate_suggestions(content, document_id="doc")
+    first_calls = service.pool.calls[:]
+    assert len(first_calls) == 3
+    assert all(call["context"] is None for call in first_calls)
+    # Concurrent chunks each keep their own session
+    assert service.context_sessions.stats()["sessions"] == 3
+
+    edited = "The second paragraph talks about dinner. It was late."
+    await service.generate_suggestions(content.replace(PARAGRAPHS[1], edited), document_id="doc")
+
+    assert len(service.pool.calls) == 4
+    follow_up = service.pool.calls[-1]
+    assert follow_up["prompt"] == SUGGESTION_FOLLOW_UP_PROMPT.format(content=edited, writing_goal="professional", language="en-US")
+    # The context is the one returned for the second paragraph's earlier call
+    second_paragraph_call = next(i for i, call in enumerate(first_calls, 1) if PARAGRAPHS[1] in call["prompt"])
+    assert follow_up["context"] == [second_paragraph_call] * 200
+    assert service.context_reuses == 1
+
+async def test_session_is_restarted_when_the_window_is_full():
+    service = make_service()
+    service.num_ctx = 300
+    content = PARAGRAPHS[0]
+
+    await service.generate_suggestions(content, document_id="doc")
+    await service.generate_suggestions(content.replace("sunny", "cloudy"), document_id="doc")
+
+    assert service.pool.calls[-1]["context"] is None
+    assert service.context_reuses == 0
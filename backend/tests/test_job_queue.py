@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.job_queue import JobQueue, JobQueueFull
+
+async def wait_for_status(queue: JobQueue, job_id: str, status: str, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        assert asyncio.get_running_loop().time() < deadline, f"job stayed {job['status']}"
+        await asyncio.sleep(0.01)
+
+async def test_job_runs_and_stores_result(db):
+    queue = JobQueue(db, workers=2, poll_interval=0.05)
+    queue.register("echo", lambda job: asyncio.sleep(0, result={"echo": job["payload"]["value"]}))
+    await queue.start()
+    try:
+        job_id = await queue.enqueue("echo", "user", {"value": 42})
+        job = await wait_for_status(queue, job_id, "succeeded")
+    finally:
+        await queue.stop()
+    
+    assert job["result"] == {"echo": 42}
+    assert job["attempts"] == 1
+
+async def test_failed_attempts_are_retried_until_max_attempts(db):
+    calls = []
+    
+    async def flaky(job):
+        calls.append(job["attempts"])
+        if len(calls) < 3:
+            raise RuntimeError("model unavailable")
+        return {"ok": True}
+    
+    queue = JobQueue(db, workers=1, backoff_seconds=0.01, poll_interval=0.05)
+    queue.register("flaky", flaky)
+    await queue.start()
+    try:
+        succeeded = await wait_for_status(queue, await queue.enqueue("flaky", "user", {}), "succeeded")
+        
+        calls.clear()
+        queue.register("flaky", lambda job: calls.append(job["attempts"]) or asyncio.sleep(0, result=1 / 0))
+        failed = await wait_for_status(queue, await queue.enqueue("flaky", "user", {}, max_attempts=2), "failed")
+    finally:
+        await queue.stop()
+    
+    assert succeeded["attempts"] == 3
+    assert failed["attempts"] == 2
+    assert "division by zero" in failed["error"]
+
+async def test_each_job_is_claimed_once_across_queues(db):
+    # Two queues on one table stand in for two server processes
+    first, second = JobQueue(db), JobQueue(db)
+    for queue in (first, second):
+        queue.register("noop", lambda job: asyncio.sleep(0))
+    job_ids = {await first.enqueue("noop", "user", {}) for _ in range(20)}
+    
+    claims = await asyncio.gather(*[queue._claim() for _ in range(15) for queue in (first, second)])
+    claimed = [job["id"] for job in claims if job is not None]
+    
+    assert sorted(claimed) == sorted(job_ids)
+    assert await first._claim() is None
+
+async def test_only_expired_leases_are_reclaimed(db):
+    queue = JobQueue(db, lease_seconds=30)
+    queue.register("noop", lambda job: asyncio.sleep(0))
+    live = await queue.enqueue("noop", "user", {})
+    stale = await queue.enqueue("noop", "user", {})
+    exhausted = await queue.enqueue("noop", "user", {}, max_attempts=1)
+    for _ in range(3):
+        await queue._claim()
+    
+    long_ago = datetime.utcnow() - timedelta(minutes=5)
+    await db.execute("UPDATE ai_jobs SET updated_at = :t WHERE id IN (:a, :b)", {"t": long_ago, "a": stale, "b": exhausted})
+    
+    assert await queue.reclaim_expired() == 2
+    assert (await queue.get(live))["status"] == "running"
+    assert (await queue.get(stale))["status"] == "queued"
+    assert (await queue.get(exhausted))["status"] == "failed"
+
+async def test_stop_queues_interrupted_jobs_again(db):
+    started = asyncio.Event()
+    
+    async def slow(job):
+        started.set()
+        await asyncio.sleep(60)
+    
+    queue = JobQueue(db, workers=1, poll_interval=0.05)
+    queue.register("slow", slow)
+    await queue.start()
+    job_id = await queue.enqueue("slow", "user", {})
+    await asyncio.wait_for(started.wait(), 5)
+    await queue.stop()
+    
+    assert (await queue.get(job_id))["status"] == "queued"
+
+async def test_finished_jobs_are_deleted_after_retention(db):
+    queue = JobQueue(db, retention_seconds=3600)
+    queue.register("noop", lambda job: asyncio.sleep(0))
+    old, recent, pending = [await queue.enqueue("noop", "user", {}) for _ in range(3)]
+    await db.execute(
+        "UPDATE ai_jobs SET status = 'succeeded', finished_at = :t WHERE id = :id",
+        {"t": datetime.utcnow() - timedelta(hours=2), "id": old}
+    )
+    await db.execute(
+        "UPDATE ai_jobs SET status = 'failed', finished_at = :t WHERE id = :id",
+        {"t": datetime.utcnow(), "id": recent}
+    )
+    
+    assert await queue.delete_finished() == 1
+    assert await queue.get(old) is None
+    assert await queue.get(recent) is not None
+    assert await queue.get(pending) is not None
+
+async def test_enqueue_rejects_when_backlog_is_full(db):
+    queue = JobQueue(db, max_pending=2)
+    queue.register("noop", lambda job: asyncio.sleep(0))
+    await queue.enqueue("noop", "user", {})
+    await queue.enqueue("noop", "user", {})
+    
+    with pytest.raises(JobQueueFull):
+        await queue.enqueue("noop", "user", {})
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.main import app
+from app.models.user import User
+from app.routers.auth import get_current_user
+from app.services.llm_scheduler import LLMScheduler, Priority, SchedulerOverloaded
+from app.services.ollama_service import OllamaService
+from app.services.request_tracker import LatestRequestTracker
+
+async def settle():
+    """Let queued tasks reach their await"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+async def queue_waiters(scheduler, order, requests):
+    """Queue (user_id, priority) requests that record their turn and release at once"""
+    async def run(user_id, priority):
+        async with scheduler.slot(user_id, priority):
+            order.append(user_id)
+    
+    tasks = []
+    for user_id, priority in requests:
+        tasks.append(asyncio.create_task(run(user_id, priority)))
+        await settle()
+    return tasks
+
+async def test_waiting_users_take_turns():
+    scheduler = LLMScheduler(max_concurrency=1)
+    held = await scheduler.acquire("holder")
+    order = []
+    tasks = await queue_waiters(scheduler, order, [
+        ("alice", Priority.INTERACTIVE), ("alice", Priority.INTERACTIVE), ("alice", Priority.INTERACTIVE),
+        ("bob", Priority.INTERACTIVE), ("bob", Priority.INTERACTIVE)
+    ])
+    
+    held.release()
+    await asyncio.gather(*tasks)
+    
+    assert order == ["alice", "bob", "alice", "bob", "alice"]
+    assert scheduler.stats()["queue_depth"] == 0
+
+async def test_interactive_requests_go_before_background_ones():
+    scheduler = LLMScheduler(max_concurrency=1)
+    held = await scheduler.acquire("holder")
+    order = []
+    tasks = await queue_waiters(scheduler, order, [("precompute", Priority.BACKGROUND), ("editor", Priority.INTERACTIVE)])
+    
+    held.release()
+    await asyncio.gather(*tasks)
+    
+    assert order == ["editor", "precompute"]
+
+async def test_requests_past_the_admission_limits_are_rejected():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=3, max_queued_per_user=2)
+    held = await scheduler.acquire("holder")
+    tasks = await queue_waiters(scheduler, [], [("alice", Priority.INTERACTIVE), ("alice", Priority.INTERACTIVE)])
+    
+    # alice has her two places; bob still gets the last one
+    with pytest.raises(SchedulerOverloaded):
+        await scheduler.acquire("alice")
+    tasks += await queue_waiters(scheduler, [], [("bob", Priority.INTERACTIVE)])
+    with pytest.raises(SchedulerOverloaded) as rejected:
+        await scheduler.acquire("carol")
+    
+    # Three queued and one more, one at a time at the default 1s per call
+    assert rejected.value.retry_after == 4
+    assert scheduler.stats()["rejected"] == 2
+    
+    held.release()
+    await asyncio.gather(*tasks)
+
+async def test_waiter_gives_up_at_its_deadline_and_leaves_the_queue():
+    scheduler = LLMScheduler(max_concurrency=1)
+    held = await scheduler.acquire("holder")
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.acquire("alice", deadline=time.monotonic() + 0.05)
+    
+    assert scheduler.stats()["timed_out"] == 1
+    assert scheduler.stats()["queue_depth"] == 0
+    held.release()
+    assert scheduler.stats()["active"] == 0
+
+USER = User(id="user-1", email="writer@example.com", full_name="Writer", created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+
+async def test_full_queue_is_a_429_with_retry_after():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=1)
+    app.state.llm_scheduler = scheduler
+    app.state.ollama_service = OllamaService()
+    app.state.request_tracker = LatestRequestTracker()
+    app.dependency_overrides[get_current_user] = lambda: USER
+    held = await scheduler.acquire("holder")
+    tasks = await queue_waiters(scheduler, [], [("someone-else", Priority.INTERACTIVE)])
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/api/ai/tone-analysis", json={"content": "A short memo."})
+    finally:
+        app.dependency_overrides.clear()
+        held.release()
+        await asyncio.gather(*tasks)
+    
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
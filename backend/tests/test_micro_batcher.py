@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.services.micro_batcher import MicroBatcher
+
+class Recorder:
+    """Processes a batch by upper-casing each item, remembering every batch"""
+
+    def __init__(self, hold: bool = False):
+        self.batches = []
+        self.cancelled = False
+        self.release = asyncio.Event()
+        if not hold:
+            self.release.set()
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return [ValueError(item) if item == "bad" else item.upper() for item in items]
+
+async def test_items_in_one_window_share_a_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, window_seconds=0.01)
+
+    results = await asyncio.gather(*[batcher.submit(item) for item in ["a", "b", "c"]])
+
+    assert results == ["A", "B", "C"]
+    assert recorder.batches == [["a", "b", "c"]]
+    assert batcher.stats()["average_batch_size"] == 3
+
+async def test_batches_are_cut_at_max_size_and_weight():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=2, window_seconds=0.01, max_batch_weight=10)
+
+    await asyncio.gather(*[batcher.submit(item, weight=4) for item in ["a", "b", "c", "d", "e"]])
+    assert recorder.batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    recorder.batches.clear()
+    await asyncio.gather(batcher.submit("f", weight=6), batcher.submit("g", weight=6))
+    assert recorder.batches == [["f"], ["g"]]
+
+async def test_each_item_gets_its_own_error():
+    batcher = MicroBatcher(Recorder(), window_seconds=0.01)
+
+    good, bad = await asyncio.gather(batcher.submit("ok"), batcher.submit("bad"), return_exceptions=True)
+
+    assert good == "OK"
+    assert isinstance(bad, ValueError)
+
+async def test_batch_failure_reaches_every_caller():
+    async def fail(items):
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher(fail, window_seconds=0.01)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+async def test_caller_that_gave_up_before_the_flush_is_left_out():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, window_seconds=0.05)
+    leaving = asyncio.create_task(batcher.submit("a"))
+    staying = asyncio.create_task(batcher.submit("b"))
+    await asyncio.sleep(0)
+
+    leaving.cancel()
+
+    assert await staying == "B"
+    assert recorder.batches == [["b"]]
+
+async def test_batch_is_cancelled_once_every_caller_gives_up():
+    recorder = Recorder(hold=True)
+    batcher = MicroBatcher(recorder, window_seconds=0.01)
+    callers = [asyncio.create_task(batcher.submit(item)) for item in ["a", "b"]]
+    while not recorder.batches:
+        await asyncio.sleep(0.005)
+
+    callers[0].cancel()
+    await asyncio.sleep(0)
+    assert not recorder.cancelled
+    callers[1].cancel()
+    await asyncio.sleep(0.01)
+
+    assert recorder.cancelled
+    assert batcher.stats()["abandoned"] == 1
+    for caller in callers:
+        with pytest.raises(asyncio.CancelledError):
+            await caller
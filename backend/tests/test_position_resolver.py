@@ -0,0 +1,53 @@
+from app.services.position_resolver import PhraseMatcher, PositionResolver, span_distance
+
+def test_matcher_finds_overlapping_and_nested_phrases():
+    occurrences = PhraseMatcher(["aa", "he", "she", "hers"]).scan("aaa ushers")
+
+    assert occurrences["aa"] == [0, 1]
+    assert occurrences["she"] == [5]
+    assert occurrences["he"] == [6]
+    assert occurrences["hers"] == [6]
+
+def test_matcher_scans_only_the_range():
+    assert PhraseMatcher(["cat"]).scan("cat cat cat", 2, 9) == {"cat": [4]}
+
+def test_span_distance():
+    assert span_distance(10, 12, [(0, 4), (15, 20)]) == 3
+    assert span_distance(3, 6, [(5, 8)]) == 0
+    assert span_distance(3, 6, []) == 0
+
+def test_repeated_phrase_takes_successive_occurrences():
+    content = "teh cat and teh dog and teh bird"
+    resolver = PositionResolver(content)
+
+    spans = [resolver.resolve("teh", []) for _ in range(4)]
+
+    assert spans[:3] == [(0, 3), (12, 15), (24, 27)]
+    # Once every occurrence is taken the best one is reused
+    assert spans[3] == (0, 3)
+
+def test_repeated_phrase_prefers_the_occurrence_near_its_anchor():
+    content = "teh start. Middle text here. teh end."
+    resolver = PositionResolver(content)
+    end = content.index("teh end")
+
+    assert resolver.resolve("teh", [(end, len(content))]) == (end, end + 3)
+    assert resolver.resolve("teh", [(end, len(content))]) == (0, 3)
+
+def test_overlapping_phrases_resolve_independently():
+    content = "the the report"
+    resolver = PositionResolver(content)
+    resolver.index(["the the", "the report"])
+
+    assert resolver.resolve("the the", []) == (0, 7)
+    assert resolver.resolve("the report", []) == (4, 14)
+    assert resolver.resolve("missing", []) is None
+
+def test_phrases_in_scope_win_over_earlier_occurrences():
+    content = "teh intro.\n\nteh body."
+    start = content.index("teh body")
+    resolver = PositionResolver(content, scope=(start, len(content)))
+
+    assert resolver.resolve("teh", []) == (start, start + 3)
+    # Phrases missing from the scope are found anywhere in the document
+    assert resolver.resolve("intro", []) == (4, 9)
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.ollama_service import LLMUnavailable, OllamaService
+
+class SlowPool:
+    """Answers every prompt after delay seconds"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.prompts = []
+
+    async def generate(self, model, prompt, **kwargs):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        return {"response": "Formal: 50, Confident: 50, Optimistic: 50, Analytical: 50"}
+
+@pytest.fixture
+def service():
+    service = OllamaService()
+    service.hedge_after = 0
+    service.llm_semaphore = asyncio.Semaphore(1)
+    return service
+
+async def test_tone_gives_up_waiting_for_a_model_slot_at_the_deadline(service):
+    service.pool = SlowPool(0)
+    await service.llm_semaphore.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        await service.analyze_tone("A short memo.", time.monotonic() + 0.2)
+
+    assert time.monotonic() - started < 1
+    assert service.pool.prompts == []
+
+async def test_vocabulary_waits_for_a_model_slot_until_the_deadline(service):
+    service.pool = SlowPool(0)
+    await service.llm_semaphore.acquire()
+
+    with pytest.raises(LLMUnavailable):
+        await service.improve_vocabulary("A short memo.", deadline=time.monotonic() + 0.2)
+
+    assert service.pool.prompts == []
+
+async def test_vocabulary_call_is_cut_at_the_deadline(service):
+    service.pool = SlowPool(5)
+
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        await service.improve_vocabulary("A short memo.", deadline=time.monotonic() + 0.2)
+
+    assert time.monotonic() - started < 1
+    # The request deadline is not a model failure
+    assert service.circuit_breaker.stats()["consecutive_failures"] == 0
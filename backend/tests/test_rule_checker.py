@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.analytics_service import AnalyticsService
+from app.services.rule_checker import RuleChecker
+
+@pytest.fixture(scope="module")
+def checker():
+    return RuleChecker(AnalyticsService())
+
+def passive_spans(checker, content):
+    return [s["text"] for s in checker.check(content) if s["suggestion"] == "Rewrite in the active voice"]
+
+@pytest.mark.parametrize("content, expected", [
+    ("The report was reviewed by the board.", ["was reviewed"]),
+    ("The report was quickly written.", ["was quickly written"]),
+    ("The terms were agreed last week.", ["were agreed"]),
+    ("The cattle are fed twice a day.", ["are fed"]),
+    ("The bill is paid.", ["is paid"]),
+])
+def test_passive_voice_is_reported(checker, content, expected):
+    assert passive_spans(checker, content) == expected
+
+@pytest.mark.parametrize("content", [
+    "The bigger issue is need.",
+    "Our main concern is speed.",
+    "The first item today is feed.",
+    "The old barn was red.",
+    "This ground is sacred.",
+    "The team is ready.",
+])
+def test_words_ending_in_ed_that_are_not_participles(checker, content):
+    assert passive_spans(checker, content) == []
@@ -0,0 +1,68 @@
+import hashlib
+
+import pytest
+
+from app.services.semantic_index import SemanticIndex
+
+class FakeEmbedder:
+    """Deterministic 8-dimensional embeddings, optionally failing every call"""
+
+    def __init__(self):
+        self.texts = []
+        self.fail = False
+
+    async def __call__(self, texts):
+        if self.fail:
+            raise RuntimeError("embedding model unavailable")
+        self.texts.extend(texts)
+        return [[float(byte) + 1 for byte in hashlib.sha256(text.encode()).digest()[:8]] for text in texts]
+
+@pytest.fixture
+def embedder():
+    return FakeEmbedder()
+
+@pytest.fixture
+def index(db, embedder, tmp_path):
+    return SemanticIndex(db, embedder, "fake-embed", directory=str(tmp_path))
+
+async def stored_rows(db, document_id):
+    rows = await db.fetch_all(
+        "SELECT row, start_offset FROM paragraph_embeddings WHERE document_id = :id ORDER BY start_offset",
+        {"id": document_id}
+    )
+    return [row["row"] for row in rows]
+
+async def test_growing_duplicate_paragraphs_reuse_their_vector(index, embedder, db):
+    await index.index_document("doc", "user", 1, "A\n\nB")
+    await index.index_document("doc", "user", 2, "A\n\nB\n\nX\n\nB")
+    await index.index_document("doc", "user", 3, "B\n\nA\n\nB\n\nX\n\nB\n\nB")
+
+    # Each distinct paragraph was embedded once
+    assert sorted(embedder.texts) == ["A", "B", "X"]
+    rows = await stored_rows(db, "doc")
+    assert len(rows) == len(set(rows)) == 6
+    assert index.stats()["documents"] == 1
+    assert index.stats()["paragraphs"] == 6
+
+    vector = (await embedder(["B"]))[0]
+    best = index.search("user", vector, limit=1)
+    assert best[0].document_id == "doc" and best[0].score == pytest.approx(1.0)
+
+async def test_shrinking_duplicates_frees_their_rows(index, db):
+    await index.index_document("doc", "user", 1, "A\n\nB\n\nB\n\nB")
+    await index.index_document("doc", "user", 2, "A\n\nB")
+
+    assert len(await stored_rows(db, "doc")) == 2
+    assert index.stats()["paragraphs"] == 2
+
+async def test_failed_embedding_keeps_the_previous_rows(index, embedder, db):
+    await index.index_document("doc", "user", 1, "A\n\nB")
+    embedder.fail = True
+
+    with pytest.raises(RuntimeError):
+        await index.index_document("doc", "user", 2, "A\n\nC")
+
+    assert len(await stored_rows(db, "doc")) == 2
+    assert index.stats()["documents"] == 1
+    assert index.stats()["paragraphs"] == 2
+    assert index.search("user", (await FakeEmbedder()(["A"]))[0], limit=1)[0].document_id == "doc"
@@ -0,0 +1,53 @@
+import json
+import time
+
+from app.services.chunking import split_segments
+from app.services.ollama_service import OllamaService
+
+class PhrasePool:
+    """Suggests replacing "teh" wherever a prompt's text contains it"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, model, prompt, **kwargs):
+        self.prompts.append(prompt)
+        text = prompt.split('Text to analyze: "', 1)[1].split('"\nWriting goal', 1)[0]
+        suggestions = [
+            {"type": "grammar", "text": "teh", "suggestion": "the", "explanation": "Typo", "severity": "error", "confidence": 95}
+        ] * text.count("teh")
+        return {"response": json.dumps({"suggestions": suggestions})}
+
+CONTENT = "We read teh report. It was long."
+
+async def suggest(service, content, shared_cache):
+    segments = split_segments(content, service.chunk_chars)
+    return await service._suggest_segments(content, segments, "professional", "en-US", service.model_name, time.monotonic() + 10, shared_cache=shared_cache)
+
+def make_service():
+    service = OllamaService()
+    service.pool = PhrasePool()
+    service.hedge_after = 0
+    return service
+
+async def test_opted_in_users_reuse_each_others_sentences():
+    service = make_service()
+    await suggest(service, CONTENT, shared_cache=True)
+
+    suggestions = await suggest(service, "Intro line here. " + CONTENT, shared_cache=True)
+
+    assert len(service.pool.prompts) == 2
+    assert "We read teh report." not in service.pool.prompts[1]
+    start = ("Intro line here. " + CONTENT).index("teh")
+    assert [(s["position"]["start"], s["position"]["end"]) for s in suggestions] == [(start, start + 3)]
+
+async def test_users_who_did_not_opt_in_neither_read_nor_fill_the_cache():
+    service = make_service()
+    await suggest(service, CONTENT, shared_cache=True)
+
+    await suggest(service, CONTENT, shared_cache=False)
+    assert len(service.pool.prompts) == 2
+    assert "We read teh report." in service.pool.prompts[1]
+
+    await suggest(service, "A private sentence.", shared_cache=False)
+    assert service.sentence_cache.stats()["entries"] == 2
@@ -0,0 +1,79 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from app.services.similarity_index import SimilarityIndex, overlapping_spans, shingle
+
+def prose(seed: int, words: int) -> str:
+    """Deterministic filler text; different seeds share almost no 5-word runs"""
+    generator = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(500)]
+    return " ".join(generator.choice(vocabulary) for _ in range(words))
+
+PASSAGE = prose(1, 150)
+
+@pytest.fixture
+def index(db):
+    return SimilarityIndex(db, window_shingles=100)
+
+async def test_copied_passage_is_found_inside_a_longer_document(index):
+    await index.index_document("copy", 1, prose(2, 300) + " " + PASSAGE + " " + prose(3, 300))
+    await index.index_document("unrelated", 1, prose(4, 400))
+
+    matches = await index.find_similar(PASSAGE)
+
+    assert [document_id for document_id, _ in matches] == ["copy"]
+    assert matches[0][1] > 0.5
+
+async def test_excluded_document_is_skipped(index):
+    await index.index_document("source", 1, PASSAGE)
+
+    assert await index.find_similar(PASSAGE, exclude="source") == []
+
+async def test_removed_document_is_no_longer_found(index, db):
+    await index.index_document("copy", 1, PASSAGE)
+    await index.remove_document("copy")
+
+    assert await index.find_similar(PASSAGE) == []
+    assert index.stats()["documents"] == 0
+    assert await db.fetch_one("SELECT 1 FROM document_signatures WHERE document_id = 'copy'") is None
+
+    # After a merge its windows are reused without bringing the old keys back
+    index._merge()
+    await index.index_document("other", 1, prose(5, 150))
+    assert await index.find_similar(PASSAGE) == []
+    assert index.stats()["windows"] == len(index.signature(prose(5, 150)))
+
+async def test_reindexing_replaces_the_old_version(index):
+    await index.index_document("doc", 1, PASSAGE)
+    await index.index_document("doc", 2, prose(6, 150))
+
+    assert await index.find_similar(PASSAGE) == []
+    assert [document_id for document_id, _ in await index.find_similar(prose(6, 150))] == ["doc"]
+
+async def test_persisted_signatures_are_loaded(index, db):
+    await db.execute(
+        """
+        INSERT INTO documents (id, title, content, user_id, word_count, reading_time, version, collaborators, created_at, updated_at)
+        VALUES ('copy', 'Copy', :content, 'user', 150, 1, 1, '[]', :now, :now)
+        """,
+        {"content": PASSAGE, "now": datetime.utcnow()}
+    )
+    await index.index_document("copy", 1, PASSAGE)
+
+    reloaded = SimilarityIndex(db, window_shingles=100)
+    await reloaded.load()
+
+    assert [document_id for document_id, _ in reloaded.query(PASSAGE)] == ["copy"]
+
+def test_overlapping_spans_locate_the_shared_run_in_both_texts():
+    before, after = prose(7, 40), prose(8, 40)
+    document = f"{before} {PASSAGE} {after}"
+
+    spans = overlapping_spans(shingle(PASSAGE), shingle(document))
+
+    assert spans == [{
+        "query": {"start": 0, "end": len(PASSAGE)},
+        "document": {"start": len(before) + 1, "end": len(before) + 1 + len(PASSAGE)}
+    }]
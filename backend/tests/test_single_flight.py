@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+class Work:
+    """A call that runs until released, counting how often it started"""
+
+    def __init__(self, result="done"):
+        self.result = result
+        self.started = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+async def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    work = Work()
+
+    callers = [asyncio.create_task(flight.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    work.release.set()
+
+    assert await asyncio.gather(*callers) == ["done"] * 3
+    assert work.started == 1
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "deduplicated": 2}
+
+async def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight()
+    work = Work()
+    work.release.set()
+
+    await asyncio.gather(flight.do("a", work), flight.do("b", work))
+    await flight.do("a", work)
+
+    assert work.started == 3
+
+async def test_failure_reaches_every_caller():
+    flight = SingleFlight()
+    work = Work(RuntimeError("model unavailable"))
+
+    callers = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+    await asyncio.sleep(0)
+    work.release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert work.started == 1
+
+async def test_one_caller_leaving_does_not_cancel_the_shared_work():
+    flight = SingleFlight()
+    work = Work()
+    leaving = asyncio.create_task(flight.do("key", work))
+    staying = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+
+    leaving.cancel()
+    await asyncio.sleep(0)
+    work.release.set()
+
+    assert await staying == "done"
+    assert not work.cancelled
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
+
+async def test_work_is_cancelled_when_every_caller_leaves():
+    flight = SingleFlight()
+    work = Work()
+    caller = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await asyncio.sleep(0)
+
+    assert work.cancelled
+    assert flight.stats()["in_flight"] == 0
+    # The next caller starts afresh
+    work.release.set()
+    assert await flight.do("key", work) == "done"
+    assert work.started == 2
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from app.services.ollama_service import JsonSuggestionStreamParser
+
+FIRST = {"type": "grammar", "text": "they was", "suggestion": "they were", "explanation": "Agreement", "severity": "error", "confidence": 90}
+SECOND = {"type": "style", "text": "a {quoted} \"brace\" ]", "suggestion": "a brace", "explanation": "Escapes \\ and [brackets]", "severity": "info", "confidence": 60}
+
+def feed_all(parser: JsonSuggestionStreamParser, pieces):
+    completed = []
+    for piece in pieces:
+        completed.append(parser.feed(piece))
+    return completed
+
+def test_objects_are_returned_as_their_closing_brace_arrives():
+    output = json.dumps({"suggestions": [FIRST, SECOND]})
+    first_end = output.index("}") + 1
+    parser = JsonSuggestionStreamParser()
+
+    completed = feed_all(parser, [output[:first_end - 1], output[first_end - 1:first_end], output[first_end:]])
+
+    assert completed == [[], [FIRST], [SECOND]]
+    assert parser.close() == []
+
+@pytest.mark.parametrize("size", [1, 3, 7])
+def test_chunk_boundaries_do_not_matter(size):
+    output = json.dumps({"suggestions": [FIRST, SECOND]})
+    parser = JsonSuggestionStreamParser()
+
+    completed = feed_all(parser, [output[i:i + size] for i in range(0, len(output), size)])
+
+    assert [suggestion for batch in completed for suggestion in batch] == [FIRST, SECOND]
+
+def test_braces_and_quotes_inside_strings_are_ignored():
+    parser = JsonSuggestionStreamParser()
+
+    assert parser.feed(json.dumps({"suggestions": [SECOND]})) == [SECOND]
+
+def test_bare_top_level_list():
+    parser = JsonSuggestionStreamParser()
+
+    assert parser.feed(json.dumps([FIRST, SECOND])) == [FIRST, SECOND]
+
+def test_close_returns_a_single_bare_suggestion():
+    parser = JsonSuggestionStreamParser()
+
+    assert parser.feed(json.dumps(FIRST)) == []
+    assert parser.close() == [FIRST]
+
+def test_malformed_objects_are_skipped():
+    parser = JsonSuggestionStreamParser()
+
+    completed = parser.feed('{"suggestions": [{"text": oops}, ' + json.dumps(FIRST) + ']}')
+
+    assert completed == [FIRST]
+    assert parser.close() == []
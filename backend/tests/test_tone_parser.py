@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.ollama_service import parse_tone_scores
+
+SCORES = "Formal: 75, Confident: 80, Optimistic: 65, Analytical: 90"
+EXPECTED = {"formal": 75.0, "confident": 80.0, "optimistic": 65.0, "analytical": 90.0}
+
+@pytest.mark.parametrize("answer", [
+    f"1: {SCORES}",
+    f"[1] {SCORES}",
+    f"1. {SCORES}",
+    f"[1]: {SCORES}",
+    SCORES,
+    f"Here are the scores:\n\n{SCORES}\n",
+])
+def test_single_text(answer):
+    assert parse_tone_scores(answer, 1) == [EXPECTED]
+
+def test_single_text_one_aspect_per_line():
+    answer = "Formal: 75\nConfident: 80\nOptimistic: 65\nAnalytical: 90"
+    assert parse_tone_scores(answer, 1) == [EXPECTED]
+
+def test_numbered_lines_go_to_their_text():
+    answer = "2: Formal: 10, Confident: 20\n[1] Formal: 30, Confident: 40\n3. Formal: 50"
+    assert parse_tone_scores(answer, 3) == [
+        {"formal": 30.0, "confident": 40.0},
+        {"formal": 10.0, "confident": 20.0},
+        {"formal": 50.0}
+    ]
+
+def test_bare_lines_fill_remaining_texts_in_order():
+    answer = "Formal: 10\n2: Formal: 20\nFormal: 30"
+    assert parse_tone_scores(answer, 3) == [{"formal": 10.0}, {"formal": 20.0}, {"formal": 30.0}]
+
+def test_missing_and_out_of_range_texts():
+    answer = "1: Formal: 10\n7: Formal: 70\nNo scores here"
+    assert parse_tone_scores(answer, 2) == [{"formal": 10.0}, None]
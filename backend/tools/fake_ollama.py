@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the Ollama HTTP API, for benchmarks and load tests
+
+Serves the endpoints WriteFlow uses (tags, pull, generate with or without
+streaming, embeddings) with configurable latency and tokens-per-second.
+Prompt processing can be given a speed too; tokens passed back as context
+count as already cached, like Ollama's prompt prefix cache.
+Completions are replayed from a recordings file when the prompt matches one,
+and otherwise synthesized in the shape each WriteFlow prompt expects.
+
+    python tools/fake_ollama.py --port 11435 --latency-ms 200 --tokens-per-second 40
+    OLLAMA_BASE_URL=http://localhost:11435 python run.py
+
+With --upstream, prompts missing from the recordings file are sent to a real
+Ollama server once and the completion is appended to the file, so later runs
+replay it without the model.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TOKEN = re.compile(r'\s*\S+|\s+')
+WORD = re.compile(r"[A-Za-z][A-Za-z']+")
+QUOTED_TEXT = re.compile(r'Text to analyze: "(.*)"\nWriting goal', re.DOTALL)
+TONE_TEXT = re.compile(r'^\[(\d+)\] "', re.MULTILINE)
+VOCABULARY_TEXT = re.compile(r'Original: "(.*)"\n', re.DOTALL)
+
+SUGGESTION_TYPES = ["style", "clarity", "vocabulary", "tone", "grammar"]
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+def tokenize(text: str) -> List[str]:
+    """Split a completion into the pieces streamed as individual tokens"""
+    return TOKEN.findall(text)
+
+def token_ids(tokens: List[str]) -> List[int]:
+    return [int(prompt_key(token)[:8], 16) % 32000 for token in tokens]
+
+class Recordings:
+    """Completions keyed by prompt hash, stored one JSON object per line"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.completions: Dict[str, str] = {}
+        self.replayed = 0
+        self.synthesized = 0
+        self.recorded = 0
+
+        if path:
+            try:
+                with open(path, encoding="utf-8") as recordings_file:
+                    for line in recordings_file:
+                        if line.strip():
+                            record = json.loads(line)
+                            key = record.get("prompt_sha256") or prompt_key(record["prompt"])
+                            self.completions[key] = record["response"]
+            except FileNotFoundError:
+                pass
+
+    def get(self, prompt: str) -> Optional[str]:
+        return self.completions.get(prompt_key(prompt))
+
+    def add(self, prompt: str, response: str):
+        key = prompt_key(prompt)
+        self.completions[key] = response
+        self.recorded += 1
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as recordings_file:
+                recordings_file.write(json.dumps({"prompt_sha256": key, "prompt": prompt, "response": response}) + "\n")
+
+def synthesize(prompt: str, format: str = "") -> str:
+    """A plausible completion for the WriteFlow prompt, derived from the text it contains"""
+    # Deterministic per prompt so repeated runs produce the same work
+    generator = random.Random(prompt_key(prompt))
+
+    if format == "json":
+        match = QUOTED_TEXT.search(prompt)
+        words = sorted(set(WORD.findall(match.group(1) if match else prompt)), key=len, reverse=True)
+        suggestions = []
+        for word in words[:max(1, min(8, len(words) // 25))]:
+            suggestions.append({
+                "type": generator.choice(SUGGESTION_TYPES),
+                "text": word,
+                "suggestion": word.lower(),
+                "explanation": "A shorter or more common word reads more easily.",
+                "severity": generator.choice(["info", "warning"]),
+                "confidence": generator.randint(55, 95)
+            })
+        return json.dumps({"suggestions": suggestions})
+
+    numbered = TONE_TEXT.findall(prompt)
+    if numbered:
+        return "\n".join(
+            f"{index}: Formal: {generator.randint(40, 90)}, Confident: {generator.randint(40, 90)}, "
+            f"Optimistic: {generator.randint(40, 90)}, Analytical: {generator.randint(40, 90)}"
+            for index in numbered
+        )
+
+    match = VOCABULARY_TEXT.search(prompt)
+    if match:
+        return match.group(1)
+
+    return " ".join(generator.choice(["The", "text", "reads", "clearly", "and", "well."]) for _ in range(40))
+
+class FakeOllama:
+    def __init__(
+        self,
+        models: List[str],
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        tokens_per_second: float = 0.0,
+        prompt_tokens_per_second: float = 0.0,
+        embedding_size: int = 768,
+        recordings: Optional[Recordings] = None,
+        upstream: Optional[str] = None
+    ):
+        self.models = models
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.embedding_size = embedding_size
+        self.recordings = recordings or Recordings()
+        self.upstream = upstream
+
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.tokens_generated = 0
+        self.prompt_tokens_evaluated = 0
+        self.prompt_tokens_cached = 0
+
+    async def completion(self, prompt: str, model: str, format: str, options: Dict[str, Any]) -> str:
+        response = self.recordings.get(prompt)
+        if response is not None:
+            self.recordings.replayed += 1
+            return response
+
+        if self.upstream:
+            async with httpx.AsyncClient(base_url=self.upstream, timeout=None) as client:
+                upstream_response = await client.post("/api/generate", json={
+                    "model": model, "prompt": prompt, "format": format, "options": options, "stream": False
+                })
+                upstream_response.raise_for_status()
+            response = upstream_response.json()["response"]
+            self.recordings.add(prompt, response)
+            return response
+
+        self.recordings.synthesized += 1
+        return synthesize(prompt, format)
+
+    async def first_token_delay(self, prompt_tokens: int = 0):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if self.prompt_tokens_per_second > 0:
+            delay += prompt_tokens / self.prompt_tokens_per_second * 1000
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    async def token_delay(self, tokens: int):
+        if self.tokens_per_second > 0 and tokens:
+            await asyncio.sleep(tokens / self.tokens_per_second)
+
+    def final_chunk(self, model: str, context: List[int], prompt_tokens: List[str], response: str, tokens: List[str], started: float) -> Dict[str, Any]:
+        duration = int((time.perf_counter() - started) * 1e9)
+        return {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": response,
+            "done": True,
+            "context": context + token_ids(prompt_tokens) + token_ids(tokens),
+            "total_duration": duration,
+            "load_duration": 0,
+            "prompt_eval_count": len(prompt_tokens),
+            "prompt_eval_duration": int(self.latency_ms * 1e6),
+            "eval_count": len(tokens),
+            "eval_duration": max(0, duration - int(self.latency_ms * 1e6))
+        }
+
+    async def generate(self, body: Dict[str, Any]):
+        model = body.get("model") or self.models[0]
+        prompt = body.get("prompt") or ""
+        started = time.perf_counter()
+
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            response = await self.completion(prompt, model, body.get("format") or "", body.get("options") or {})
+        except Exception:
+            self.active -= 1
+            raise
+        tokens = tokenize(response)
+        
+        # Context tokens are the cached prefix; only the new prompt is evaluated
+        context = list(body.get("context") or [])
+        prompt_tokens = tokenize(prompt)
+        self.prompt_tokens_cached += len(context)
+        self.prompt_tokens_evaluated += len(prompt_tokens)
+
+        # Ollama streams unless the request says otherwise
+        if body.get("stream", True):
+            return StreamingResponse(self._stream(model, context, prompt_tokens, tokens, started), media_type="application/x-ndjson")
+
+        try:
+            await self.first_token_delay(len(prompt_tokens))
+            await self.token_delay(len(tokens))
+        finally:
+            self.active -= 1
+        self.tokens_generated += len(tokens)
+        return JSONResponse(self.final_chunk(model, context, prompt_tokens, response, tokens, started))
+
+    async def _stream(self, model: str, context: List[int], prompt_tokens: List[str], tokens: List[str], started: float) -> AsyncIterator[bytes]:
+        try:
+            await self.first_token_delay(len(prompt_tokens))
+            for token in tokens:
+                await self.token_delay(1)
+                self.tokens_generated += 1
+                chunk = {
+                    "model": model,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": token,
+                    "done": False
+                }
+                yield (json.dumps(chunk) + "\n").encode("utf-8")
+            yield (json.dumps(self.final_chunk(model, context, prompt_tokens, "", tokens, started)) + "\n").encode("utf-8")
+        finally:
+            self.active -= 1
+
+    async def embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        await self.first_token_delay()
+        seed = int(prompt_key(body.get("prompt") or "")[:16], 16)
+        generator = random.Random(seed)
+        return {"embedding": [generator.gauss(0.0, 1.0) for _ in range(self.embedding_size)]}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "active": self.active,
+            "max_active": self.max_active,
+            "tokens_generated": self.tokens_generated,
+            "prompt_tokens_evaluated": self.prompt_tokens_evaluated,
+            "prompt_tokens_cached": self.prompt_tokens_cached,
+            "replayed": self.recordings.replayed,
+            "synthesized": self.recordings.synthesized,
+            "recorded": self.recordings.recorded
+        }
+
+def create_app(fake: FakeOllama) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    app.state.fake = fake
+
+    @app.get("/api/tags")
+    async def tags():
+        now = datetime.now(timezone.utc).isoformat()
+        return {"models": [{"name": name, "model": name, "modified_at": now, "size": 0, "digest": prompt_key(name)} for name in fake.models]}
+
+    @app.post("/api/pull")
+    async def pull(request: Request):
+        body = await request.json()
+        name = body.get("name") or body.get("model")
+        if name and name not in fake.models:
+            fake.models.append(name)
+        if body.get("stream", True):
+            return StreamingResponse(iter([json.dumps({"status": "success"}) + "\n"]), media_type="application/x-ndjson")
+        return {"status": "success"}
+
+    # LangChain's Ollama wrapper posts to /api/generate/ with a trailing slash
+    @app.post("/api/generate")
+    @app.post("/api/generate/")
+    async def generate(request: Request):
+        try:
+            return await fake.generate(await request.json())
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        return await fake.embeddings(await request.json())
+
+    @app.get("/fake/stats")
+    async def stats():
+        return fake.stats()
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Ollama HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", action="append", dest="models", help="Model name to advertise (repeatable, default: llama3)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before the first token")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random +/- variation of the first-token delay")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed; 0 returns completions at once")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0, help="Prompt processing speed; 0 makes it free")
+    parser.add_argument("--embedding-size", type=int, default=768)
+    parser.add_argument("--recordings", help="JSONL file of recorded completions to replay")
+    parser.add_argument("--upstream", help="Real Ollama URL used to record completions missing from --recordings")
+    args = parser.parse_args()
+
+    fake = FakeOllama(
+        models=args.models or ["llama3"],
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        embedding_size=args.embedding_size,
+        recordings=Recordings(args.recordings),
+        upstream=args.upstream
+    )
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
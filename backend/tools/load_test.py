@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the WriteFlow API
+
+Registers a set of users, gives each a few documents, then keeps a fixed
+number of concurrent clients sending a weighted mix of document, AI and
+analytics requests. Reports throughput and p50/p95/p99 latency per route.
+
+Run it against a server backed by tools/fake_ollama.py to measure the API's
+own overhead separately from model latency:
+
+    python tools/fake_ollama.py --port 11435 --latency-ms 300 --tokens-per-second 50
+    OLLAMA_BASE_URL=http://localhost:11435 python run.py
+    python tools/load_test.py --mix editing --concurrency 20 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+SENTENCES = [
+    "The quarterly report summarizes our progress across every product line.",
+    "We recieve feedback from customers each week and review it as a team.",
+    "It was decided by the committee that the launch would be postponed.",
+    "Our new onboarding flow really significantly reduces the time to first value.",
+    "Revenue grew steadily, although costs grew faster than we had planned.",
+    "The the engineering team shipped three major features this quarter.",
+    "Clear writing helps readers understand complex ideas quickly.",
+    "Several stakeholders requested a more detailed breakdown of expenses.",
+    "Next quarter we will focus on reliability, performance and documentation.",
+    "This paragraph exists to give the analytics and suggestion passes realistic prose to work through."
+]
+
+# Relative weights of each operation in a mix
+MIXES: Dict[str, Dict[str, int]] = {
+    # A writer editing: frequent saves and quick checks, occasional full passes
+    "editing": {
+        "documents.update": 30,
+        "ai.suggestions_quick": 20,
+        "ai.suggestions_stream": 10,
+        "analytics.document": 15,
+        "documents.get": 10,
+        "ai.suggestions_list": 10,
+        "ai.suggestions": 5
+    },
+    # A reviewer opening panels on finished documents
+    "review": {
+        "ai.suggestions": 20,
+        "ai.tone_analysis": 15,
+        "ai.plagiarism_check": 10,
+        "analytics.document": 20,
+        "analytics.readability": 10,
+        "analytics.keywords": 10,
+        "ai.vocabulary_enhancement": 5,
+        "documents.list": 10
+    },
+    # Everything, weighted towards the cheap routes
+    "mixed": {
+        "documents.list": 10,
+        "documents.get": 10,
+        "documents.update": 15,
+        "ai.suggestions": 8,
+        "ai.suggestions_quick": 10,
+        "ai.suggestions_stream": 5,
+        "ai.suggestions_list": 5,
+        "ai.tone_analysis": 5,
+        "ai.plagiarism_check": 5,
+        "ai.vocabulary_enhancement": 2,
+        "analytics.document": 10,
+        "analytics.readability": 5,
+        "analytics.keywords": 5,
+        "analytics.compare": 5
+    }
+}
+
+def make_text(generator: random.Random, words: int) -> str:
+    """Paragraphs of sample prose of roughly the given length"""
+    paragraphs = []
+    total = 0
+    while total < words:
+        paragraph = " ".join(generator.choice(SENTENCES) for _ in range(generator.randint(3, 6)))
+        paragraphs.append(paragraph)
+        total += len(paragraph.split())
+    return "\n\n".join(paragraphs)
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+class Session:
+    """A registered user, their auth header and their documents' current content"""
+
+    def __init__(self, headers: Dict[str, str], documents: Dict[str, str]):
+        self.headers = headers
+        self.documents = documents
+
+    def pick(self, generator: random.Random) -> Tuple[str, str]:
+        document_id = generator.choice(list(self.documents))
+        return document_id, self.documents[document_id]
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[int, int]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, route: str, status_code: int, seconds: float):
+        self.latencies.setdefault(route, []).append(seconds)
+        counts = self.statuses.setdefault(route, {})
+        counts[status_code] = counts.get(status_code, 0) + 1
+        if status_code >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def record_failure(self, route: str, seconds: float):
+        """A request that never got a response (connection error or timeout)"""
+        self.record(route, 0, seconds)
+        self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        routes = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors.get(route, 0),
+                "statuses": {str(code): count for code, count in sorted(self.statuses[route].items())},
+                "throughput": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1)
+            }
+
+        total = sum(route["requests"] for route in routes.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput": round(total / elapsed, 2) if elapsed else 0.0,
+            "routes": routes
+        }
+
+Operation = Callable[[httpx.AsyncClient, Session, random.Random], Awaitable[httpx.Response]]
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, int], document_words: int, seed: int):
+        self.client = client
+        self.mix = mix
+        self.document_words = document_words
+        self.generator = random.Random(seed)
+        self.results = Results()
+        self.operations: Dict[str, Operation] = {
+            "documents.list": self.list_documents,
+            "documents.get": self.get_document,
+            "documents.update": self.update_document,
+            "ai.suggestions": self.suggestions,
+            "ai.suggestions_quick": self.quick_suggestions,
+            "ai.suggestions_stream": self.stream_suggestions,
+            "ai.suggestions_list": self.list_suggestions,
+            "ai.tone_analysis": self.tone_analysis,
+            "ai.plagiarism_check": self.plagiarism_check,
+            "ai.vocabulary_enhancement": self.vocabulary_enhancement,
+            "analytics.document": self.document_analytics,
+            "analytics.readability": self.readability,
+            "analytics.keywords": self.keywords,
+            "analytics.compare": self.compare_versions
+        }
+        unknown = set(mix) - set(self.operations)
+        if unknown:
+            raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+
+    async def setup(self, users: int, documents_per_user: int) -> List[Session]:
+        """Register users and create their documents"""
+        run_id = uuid.uuid4().hex[:8]
+        sessions = []
+        for i in range(users):
+            response = await self.client.post("/api/auth/register", json={
+                "email": f"loadtest-{run_id}-{i}@example.com",
+                "password": "loadtest-password",
+                "full_name": f"Load Test {i}"
+            })
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            documents = {}
+            for j in range(documents_per_user):
+                content = make_text(self.generator, self.document_words)
+                response = await self.client.post("/api/documents/", headers=headers, json={
+                    "title": f"Load test document {j}",
+                    "content": content
+                })
+                response.raise_for_status()
+                documents[response.json()["id"]] = content
+            sessions.append(Session(headers, documents))
+        return sessions
+
+    async def run(self, sessions: List[Session], concurrency: int, duration: float, think_seconds: float) -> Dict[str, Any]:
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        deadline = time.perf_counter() + duration
+
+        async def worker(worker_id: int):
+            generator = random.Random(self.generator.random() + worker_id)
+            while time.perf_counter() < deadline:
+                name = generator.choices(names, weights)[0]
+                session = generator.choice(sessions)
+                await self.timed(name, self.operations[name], session, generator)
+                if think_seconds:
+                    await asyncio.sleep(generator.uniform(0, 2 * think_seconds))
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        return self.results.summary(time.perf_counter() - started)
+
+    async def timed(self, name: str, operation: Operation, session: Session, generator: random.Random):
+        started = time.perf_counter()
+        try:
+            response = await operation(self.client, session, generator)
+        except httpx.HTTPError:
+            self.results.record_failure(name, time.perf_counter() - started)
+            return
+        self.results.record(name, response.status_code, time.perf_counter() - started)
+
+    async def list_documents(self, client, session, generator):
+        return await client.get("/api/documents/", headers=session.headers)
+
+    async def get_document(self, client, session, generator):
+        document_id, _ = session.pick(generator)
+        return await client.get(f"/api/documents/{document_id}", headers=session.headers)
+
+    async def update_document(self, client, session, generator):
+        # Rewrite one paragraph, the way an editor autosave would
+        document_id, content = session.pick(generator)
+        paragraphs = content.split("\n\n")
+        paragraphs[generator.randrange(len(paragraphs))] = make_text(generator, 40)
+        content = "\n\n".join(paragraphs)
+        session.documents[document_id] = content
+        return await client.put(f"/api/documents/{document_id}", headers=session.headers, json={"content": content})
+
+    async def suggestions(self, client, session, generator):
+        document_id, content = session.pick(generator)
+        return await client.post("/api/ai/suggestions", headers=session.headers, json={"document_id": document_id, "content": content})
+
+    async def quick_suggestions(self, client, session, generator):
+        document_id, content = session.pick(generator)
+        return await client.post("/api/ai/suggestions/quick", headers=session.headers, json={"document_id": document_id, "content": content})
+
+    async def stream_suggestions(self, client, session, generator):
+        # The whole stream is read so the latency covers the full generation
+        document_id, content = session.pick(generator)
+        async with client.stream("POST", "/api/ai/suggestions/stream", headers=session.headers, json={"document_id": document_id, "content": content}) as response:
+            async for _ in response.aiter_lines():
+                pass
+        return response
+
+    async def list_suggestions(self, client, session, generator):
+        document_id, _ = session.pick(generator)
+        return await client.get(f"/api/ai/suggestions/{document_id}", headers=session.headers)
+
+    async def tone_analysis(self, client, session, generator):
+        _, content = session.pick(generator)
+        return await client.post("/api/ai/tone-analysis", headers=session.headers, json={"content": content})
+
+    async def plagiarism_check(self, client, session, generator):
+        document_id, content = session.pick(generator)
+        return await client.post("/api/ai/plagiarism-check", headers=session.headers, json={"content": content, "document_id": document_id})
+
+    async def vocabulary_enhancement(self, client, session, generator):
+        _, content = session.pick(generator)
+        return await client.post("/api/ai/vocabulary-enhancement", headers=session.headers, json={"text": content.split("\n\n")[0]})
+
+    async def document_analytics(self, client, session, generator):
+        document_id, _ = session.pick(generator)
+        return await client.get(f"/api/analytics/document/{document_id}", headers=session.headers)
+
+    async def readability(self, client, session, generator):
+        document_id, _ = session.pick(generator)
+        return await client.get(f"/api/analytics/document/{document_id}/readability", headers=session.headers)
+
+    async def keywords(self, client, session, generator):
+        document_id, _ = session.pick(generator)
+        return await client.get(f"/api/analytics/document/{document_id}/keywords", headers=session.headers)
+
+    async def compare_versions(self, client, session, generator):
+        document_id, content = session.pick(generator)
+        return await client.post(f"/api/analytics/document/{document_id}/compare", headers=session.headers, json={
+            "version1_content": content,
+            "version2_content": make_text(generator, self.document_words)
+        })
+
+def print_report(summary: Dict[str, Any]):
+    header = f"{'route':<28}{'reqs':>7}{'errs':>6}{'req/s':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, stats in summary["routes"].items():
+        print(
+            f"{route:<28}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput']:>9.2f}"
+            f"{stats['mean_ms']:>9.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+        )
+    print("-" * len(header))
+    print(f"{summary['requests']} requests, {summary['errors']} errors in {summary['elapsed_seconds']}s ({summary['throughput']} req/s); latencies in ms")
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency + 10, max_keepalive_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        load_test = LoadTest(client, MIXES[args.mix], args.document_words, args.seed)
+        sessions = await load_test.setup(args.users, args.documents_per_user)
+
+        if args.warmup:
+            await load_test.run(sessions, args.concurrency, args.warmup, args.think_ms / 1000)
+            load_test.results = Results()
+
+        summary = await load_test.run(sessions, args.concurrency, args.duration, args.think_ms / 1000)
+        summary["config"] = {
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "documents_per_user": args.documents_per_user,
+            "document_words": args.document_words
+        }
+
+        # Server-side counters help attribute latency (cache hits, queueing)
+        try:
+            response = await client.get("/api/ai/stats", headers=sessions[0].headers)
+            if response.status_code == 200:
+                summary["server_stats"] = response.json()
+        except httpx.HTTPError:
+            pass
+        return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the WriteFlow API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to measure")
+    parser.add_argument("--warmup", type=float, default=0.0, help="Seconds to run before measuring")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--documents-per-user", type=int, default=3)
+    parser.add_argument("--document-words", type=int, default=400)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Average pause between a client's requests")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main_async(args))
+    print_report(summary)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+if __name__ == "__main__":
+    main()